@@ -1,2 +1,24 @@
-# Adapters package for provider-specific integrations (OpenAI, Gemini)
-# Skeleton only; no external dependencies.
+# Adapters package for provider-specific integrations (OpenAI, Gemini, Qwen)
+# Stdlib only: adapters share a pooled http.client transport (see base.py, transport.py).
+from __future__ import annotations
+from typing import Any, Dict, Type
+
+from .base import BaseAdapter
+from .gemini import GeminiAdapter
+from .openai import OpenAIAdapter
+from .qwencoder import QwenCoderAdapter
+
+ADAPTERS: Dict[str, Type[BaseAdapter]] = {
+    "openai": OpenAIAdapter,
+    "gemini": GeminiAdapter,
+    "qwen": QwenCoderAdapter,
+}
+
+
+def get_adapter(provider: str, model: str, **kwargs: Any) -> BaseAdapter:
+    """Instantiate the adapter registered for provider."""
+    try:
+        cls = ADAPTERS[provider]
+    except KeyError:
+        raise ValueError(f"unknown provider: {provider!r}") from None
+    return cls(model, **kwargs)
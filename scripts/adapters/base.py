@@ -0,0 +1,453 @@
+"""
+Common adapter base (no external deps).
+
+Holds the provider-agnostic pieces shared by every adapter: tool alias
+resolution, tool_mode mapping, tool descriptors and the pooled HTTP transport.
+Subclasses describe their wire format through build_request/parse_response.
+
+A request may carry a PromptPrefix: the static, recipe-derived leading part of
+the prompt. Adapters send it as the provider's system instruction, ahead of
+the per-case text, and mark it for provider prompt caching where the API has
+a knob for it.
+
+Without a base URL (argument or <PROVIDER>_BASE_URL env var) run() echoes the
+prompt and astream() yields it back chunk by chunk, preserving dry-run
+semantics upstream.
+
+Requests follow the adapter's RequestPolicy (resilience.py): a deadline per
+call, retries with jittered exponential backoff, and hedging of streamed
+requests that are slower than usual to start.
+
+For offline batch jobs, batch_request() serializes one request as a line of a
+provider batch-job JSONL file and parse_batch_result() reads one line of the
+job's output back (OpenAI Batch API shape by default).
+"""
+from __future__ import annotations
+import asyncio
+import copy
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from .ratelimit import THROTTLE_STATUSES, RateLimiter, parse_retry_after
+from .resilience import (
+    REQUEST_ERRORS, DeadlineExceeded, LatencyWindow, RequestPolicy, RequestStats, get_window, is_transient, new_report,
+)
+from .tokens import estimate_tokens
+from .transport import ConnectionPool, TransportError, aiter_sse, decode_json, encode_json, get_pool
+
+_CHUNK_RE = re.compile(r"\s*\S+\s*")
+
+
+def split_chunks(text: str) -> List[str]:
+    """Split text into whitespace-delimited stream chunks that join back to text."""
+    return _CHUNK_RE.findall(text) or ([text] if text else [])
+
+
+@dataclass(frozen=True)
+class PromptPrefix:
+    """Static prompt prefix shared by many requests (e.g. one recipe + variant).
+    `key` is a content hash usable as a provider prompt-cache key; `tokens` is
+    the prefix's estimated size."""
+    text: str
+    key: str
+    tokens: int
+
+
+class BaseAdapter:
+    """Shared adapter behavior; subclasses set the class attributes below."""
+
+    provider = ""
+    # tool_mode (auto|required|none) -> provider tool policy
+    tool_modes: Dict[str, Dict[str, Any]] = {}
+    # env var holding the API key
+    api_key_env = ""
+    # Endpoint named in batch-job lines; None uses the request path
+    batch_url: Optional[str] = None
+
+    def __init__(
+        self,
+        model: str,
+        tool_aliases: Optional[Dict[str, str]] = None,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        temperature: Optional[float] = None,
+        pool_size: int = 8,
+        timeout: float = 60.0,
+        limiter: Optional[RateLimiter] = None,
+        policy: Optional[RequestPolicy] = None,
+    ) -> None:
+        self.model = model
+        self.tool_aliases = tool_aliases or {}
+        self.temperature = temperature
+        env_prefix = self.provider.upper()
+        self.base_url = base_url if base_url is not None else os.environ.get(f"{env_prefix}_BASE_URL")
+        self.api_key = api_key if api_key is not None else os.environ.get(self.api_key_env, "")
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.limiter = limiter
+        self.policy = policy if policy is not None else RequestPolicy()
+        self.request_stats = RequestStats()
+
+    @property
+    def pool(self) -> Optional[ConnectionPool]:
+        if not self.base_url:
+            return None
+        return get_pool(self.base_url, max_size=self.pool_size, timeout=self.timeout)
+
+    def tool_name(self, tool: str) -> str:
+        """Resolve a logical tool name, preferring a provider-scoped alias (e.g. fs.read@qwen)."""
+        return self.tool_aliases.get(f"{tool}@{self.provider}", self.tool_aliases.get(tool, tool))
+
+    def map_tool_mode(self, tool_mode: Optional[str]) -> Dict[str, Any]:
+        mode = tool_mode if tool_mode in self.tool_modes else "auto"
+        return copy.deepcopy(self.tool_modes[mode])
+
+    def build_tools(self, tools: List[str]) -> List[Dict[str, Any]]:
+        """Placeholder: return simple logical tool descriptors with mapped names."""
+        result: List[Dict[str, Any]] = []
+        for t in tools:
+            result.append({"name": self.tool_name(t), "schema": {"type": "object", "properties": {}}, "required": []})
+        return result
+
+    def build_request(
+        self, prompt: str, prefix: Optional[PromptPrefix] = None
+    ) -> Tuple[str, Dict[str, Any], Dict[str, str]]:
+        """Return (path, JSON payload, headers) for a completion request."""
+        raise NotImplementedError
+
+    def parse_response(self, data: Any) -> str:
+        """Extract completion text from a decoded JSON response."""
+        raise NotImplementedError
+
+    def build_stream_request(
+        self, prompt: str, prefix: Optional[PromptPrefix] = None
+    ) -> Tuple[str, Dict[str, Any], Dict[str, str]]:
+        """Return (path, JSON payload, headers) for a streaming (SSE) completion request."""
+        raise NotImplementedError
+
+    def parse_stream_event(self, data: Any) -> str:
+        """Extract the text delta from one decoded stream event."""
+        raise NotImplementedError
+
+    def batch_request(self, custom_id: str, prompt: str, prefix: Optional[PromptPrefix] = None) -> Dict[str, Any]:
+        """One batch-job input line. Credentials are never written; the job carries them."""
+        path, payload, _ = self.build_request(prompt, prefix)
+        return {"custom_id": custom_id, "method": "POST", "url": self.batch_url or path, "body": payload}
+
+    def parse_batch_result(self, record: Dict[str, Any]) -> Tuple[Optional[str], str, Optional[str]]:
+        """(custom_id, completion text, error message or None) from one batch-job output line."""
+        custom_id = record.get("custom_id")
+        error = record.get("error")
+        response = record.get("response") if isinstance(record.get("response"), dict) else {}
+        if error:
+            return custom_id, "", str(error.get("message", error) if isinstance(error, dict) else error)
+        status = response.get("status_code", 200)
+        if status != 200:
+            return custom_id, "", f"HTTP {status}"
+        return custom_id, self.parse_response(response.get("body")), None
+
+    def estimate_tokens(self, prompt: str, prefix: Optional[PromptPrefix] = None) -> int:
+        """Estimated request size for the tokens/min budget."""
+        return max(1, estimate_tokens(prompt) + (prefix.tokens if prefix is not None else 0))
+
+    def _fail_attempt(self, err: BaseException) -> None:
+        """Release the limiter slot of a failed attempt; a 429/503 also starts the limiter's cooldown."""
+        limiter = self.limiter
+        if limiter is None:
+            return
+        limiter.release(ok=False)
+        if isinstance(err, TransportError) and err.status in THROTTLE_STATUSES:
+            limiter.throttled(parse_retry_after(err.headers.get("retry-after")))
+
+    def _deadline(self) -> Optional[float]:
+        deadline_s = self.policy.deadline_s
+        return time.monotonic() + deadline_s if deadline_s else None
+
+    def _remaining(self, deadline: Optional[float]) -> Optional[float]:
+        """Seconds left before deadline (None: no deadline). Raises DeadlineExceeded once it has passed."""
+        if deadline is None:
+            return None
+        left = deadline - time.monotonic()
+        if left <= 0:
+            self.request_stats.count("deadline_exceeded")
+            raise DeadlineExceeded(f"{self.provider}/{self.model}: deadline of {self.policy.deadline_s}s exceeded")
+        return left
+
+    def _retry_delay(self, err: Exception, report: Dict[str, Any], deadline: Optional[float]) -> float:
+        """Seconds to wait before resending a failed request. Re-raises err when
+        it is not retryable or retries are used up, and raises DeadlineExceeded
+        when the wait would outlast the deadline.
+
+        With a rate limiter, 429/503 are retried up to limiter.max_retries and the
+        limiter's cooldown does the waiting; other transient failures get up to
+        policy.max_retries retries with jittered exponential backoff."""
+        limiter = self.limiter
+        throttled = isinstance(err, TransportError) and err.status in THROTTLE_STATUSES
+        if throttled and limiter is not None:
+            if report["throttled"] >= limiter.max_retries:
+                self.request_stats.count("failed")
+                raise err
+            report["throttled"] += 1
+            delay = 0.0
+        else:
+            transient_retries = report["retries"] - report["throttled"]
+            if not is_transient(err) or transient_retries >= self.policy.max_retries:
+                self.request_stats.count("failed")
+                raise err
+            retry_after = parse_retry_after(err.headers.get("retry-after"), 0.0) if isinstance(err, TransportError) else None
+            delay = self.policy.backoff(transient_retries, retry_after)
+        left = self._remaining(deadline)
+        if left is not None and delay >= left:
+            self.request_stats.count("deadline_exceeded")
+            raise DeadlineExceeded(f"{self.provider}/{self.model}: no time left to retry after {err}") from err
+        report["retries"] += 1
+        self.request_stats.count("retries")
+        return delay
+
+    def run(
+        self, prompt: str, prefix: Optional[PromptPrefix] = None, report: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """Blocking completion with retries. The deadline is checked between
+        attempts (an in-flight blocking read is bounded by the socket timeout);
+        hedging applies to astream() only."""
+        pool = self.pool
+        if pool is None:
+            return prompt
+        path, payload, headers = self.build_request(prompt, prefix)
+        report = new_report(report)
+        deadline = self._deadline()
+        self.request_stats.count("requests")
+        while True:
+            self._remaining(deadline)
+            if self.limiter is not None:
+                self.limiter.acquire(self.estimate_tokens(prompt, prefix))
+            try:
+                data = pool.post_json(path, payload, headers)
+            except BaseException as e:
+                self._fail_attempt(e)
+                if not isinstance(e, REQUEST_ERRORS):
+                    raise
+                time.sleep(self._retry_delay(e, report, deadline))
+                continue
+            if self.limiter is not None:
+                self.limiter.release(ok=True)
+            return self.parse_response(data)
+
+    async def _attempt(
+        self,
+        pool: ConnectionPool,
+        path: str,
+        body: bytes,
+        headers: Dict[str, str],
+        tokens: int,
+        on_sent: Optional[Callable[[float], None]] = None,
+    ) -> AsyncIterator[str]:
+        """One streamed request: holds a limiter slot and yields non-empty text chunks.
+        on_sent gets the loop time at which the slot was taken and the request sent."""
+        if self.limiter is not None:
+            await self.limiter.aacquire(tokens)
+        if on_sent is not None:
+            on_sent(asyncio.get_running_loop().time())
+        events = aiter_sse(pool, "POST", path, body, headers)
+        try:
+            async for data in events:
+                if data == "[DONE]":
+                    continue
+                text = self.parse_stream_event(decode_json(data.encode("utf-8")))
+                if text:
+                    yield text
+        except BaseException as e:
+            self._fail_attempt(e)
+            raise
+        else:
+            if self.limiter is not None:
+                self.limiter.release(ok=True)
+        finally:
+            await events.aclose()
+
+    def _hedge_after(self, window: LatencyWindow) -> Optional[float]:
+        """Seconds without a first chunk after which to send a hedge; None disables hedging."""
+        policy = self.policy
+        if not policy.hedge:
+            return None
+        quantile = window.quantile(policy.hedge_quantile, policy.hedge_min_samples)
+        return None if quantile is None else max(quantile, policy.hedge_min_delay_s)
+
+    async def _first_chunk(
+        self,
+        start: Callable[[Callable[[float], None]], AsyncIterator[str]],
+        report: Dict[str, Any],
+        deadline: Optional[float],
+    ) -> Tuple[AsyncIterator[str], Optional[str]]:
+        """Start an attempt and wait for its first chunk, sending a hedge if none
+        arrives within the hedge delay. Returns the winning stream and its first
+        chunk (None if it ended empty); the other attempt is cancelled.
+
+        The hedge delay and time-to-first-chunk are measured from when an attempt
+        is sent, not from when it starts queueing in the rate limiter, and no
+        hedge is sent while the limiter is cooling down after a throttle."""
+        loop = asyncio.get_running_loop()
+        window = get_window(self.provider, self.model)
+        hedge_after = self._hedge_after(window)
+        sent_at: Dict[AsyncIterator[str], float] = {}
+        primary_sent: "asyncio.Future[None]" = loop.create_future()
+        pending: Dict["asyncio.Future[Any]", AsyncIterator[str]] = {}
+
+        def launch() -> AsyncIterator[str]:
+            def on_sent(now: float) -> None:
+                sent_at[stream] = now
+                if not primary_sent.done():
+                    primary_sent.set_result(None)
+
+            stream = start(on_sent)
+            pending[asyncio.ensure_future(_next_chunk(stream))] = stream
+            return stream
+
+        primary = launch()
+        try:
+            while True:
+                timeout = self._remaining(deadline)
+                waiting: List["asyncio.Future[Any]"] = list(pending)
+                if hedge_after is not None:
+                    if primary in sent_at:
+                        wait = max(0.0, sent_at[primary] + hedge_after - loop.time())
+                        timeout = wait if timeout is None else min(timeout, wait)
+                    else:
+                        waiting.append(primary_sent)
+                done, _ = await asyncio.wait(waiting, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                finished = [task for task in done if task in pending]
+                if not finished:
+                    due = hedge_after is not None and primary in sent_at and loop.time() >= sent_at[primary] + hedge_after
+                    if due:
+                        hedge_after = None
+                        if self.limiter is None or not self.limiter.cooling_down():
+                            report["hedged"] = True
+                            self.request_stats.count("hedges")
+                            launch()
+                    continue
+                for task in finished:
+                    stream = pending.pop(task)
+                    if task.exception() is not None:
+                        if pending:  # the other attempt may still succeed
+                            continue
+                        raise task.exception()  # type: ignore[misc]
+                    now = loop.time()
+                    window.add(now - sent_at[stream])
+                    if stream is not primary:
+                        report["hedge_won"] = True
+                        self.request_stats.count("hedge_wins")
+                        # The primary's first chunk would have come later still
+                        if primary in sent_at:
+                            window.add(now - sent_at[primary])
+                    return stream, task.result()
+        finally:
+            if not primary_sent.done():
+                primary_sent.cancel()
+            for task, stream in pending.items():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                await stream.aclose()
+
+    async def astream(
+        self, prompt: str, prefix: Optional[PromptPrefix] = None, report: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """Yield completion text chunks as they arrive.
+
+        Failed requests are retried (see _retry_delay) only if nothing was
+        yielded yet. The policy deadline bounds the whole call, waits for chunks
+        included; with hedging on, a request still waiting for its first chunk
+        past the provider/model's observed p95 is duplicated and the slower
+        copy cancelled. Pass a dict as report to get this call's counts."""
+        pool = self.pool
+        if pool is None:
+            for chunk in split_chunks(prompt):
+                yield chunk
+            return
+        path, payload, headers = self.build_stream_request(prompt, prefix)
+        hdrs = {"Content-Type": "application/json", "Accept": "text/event-stream"}
+        hdrs.update(headers)
+        body = encode_json(payload)
+        tokens = self.estimate_tokens(prompt, prefix)
+        report = new_report(report)
+        deadline = self._deadline()
+        self.request_stats.count("requests")
+
+        def start(on_sent: Callable[[float], None]) -> AsyncIterator[str]:
+            return self._attempt(pool, path, body, hdrs, tokens, on_sent)
+
+        while True:
+            try:
+                stream, first = await self._first_chunk(start, report, deadline)
+            except DeadlineExceeded:
+                raise
+            except REQUEST_ERRORS as e:
+                await asyncio.sleep(self._retry_delay(e, report, deadline))
+                continue
+            break
+        try:
+            text = first
+            while text is not None:
+                yield text
+                try:
+                    text = await asyncio.wait_for(_next_chunk(stream), self._remaining(deadline))
+                except asyncio.TimeoutError:
+                    self.request_stats.count("deadline_exceeded")
+                    raise DeadlineExceeded(
+                        f"{self.provider}/{self.model}: deadline of {self.policy.deadline_s}s exceeded mid-stream"
+                    ) from None
+        finally:
+            await stream.aclose()
+
+
+async def _next_chunk(stream: AsyncIterator[str]) -> Optional[str]:
+    """Next chunk of stream, or None once it is exhausted."""
+    try:
+        return await stream.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+class ChatCompletionsAdapter(BaseAdapter):
+    """OpenAI-compatible /chat/completions wire format (OpenAI, Qwen compatible mode)."""
+
+    chat_path = "/v1/chat/completions"
+    # Request field that carries PromptPrefix.key, for APIs that route prompt-cache lookups by key
+    prompt_cache_key_field: Optional[str] = None
+
+    def system_message(self, prefix: PromptPrefix) -> Dict[str, Any]:
+        return {"role": "system", "content": prefix.text}
+
+    def build_request(
+        self, prompt: str, prefix: Optional[PromptPrefix] = None
+    ) -> Tuple[str, Dict[str, Any], Dict[str, str]]:
+        messages: List[Dict[str, Any]] = [self.system_message(prefix)] if prefix is not None else []
+        messages.append({"role": "user", "content": prompt})
+        payload: Dict[str, Any] = {"model": self.model, "messages": messages}
+        if prefix is not None and self.prompt_cache_key_field:
+            payload[self.prompt_cache_key_field] = prefix.key
+        if self.temperature is not None:
+            payload["temperature"] = self.temperature
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        return self.chat_path, payload, headers
+
+    def parse_response(self, data: Any) -> str:
+        try:
+            return data["choices"][0]["message"]["content"] or ""
+        except (KeyError, IndexError, TypeError):
+            return ""
+
+    def build_stream_request(
+        self, prompt: str, prefix: Optional[PromptPrefix] = None
+    ) -> Tuple[str, Dict[str, Any], Dict[str, str]]:
+        path, payload, headers = self.build_request(prompt, prefix)
+        payload["stream"] = True
+        return path, payload, headers
+
+    def parse_stream_event(self, data: Any) -> str:
+        try:
+            return data["choices"][0]["delta"].get("content") or ""
+        except (KeyError, IndexError, TypeError, AttributeError):
+            return ""
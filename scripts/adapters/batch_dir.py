@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+batch_dir: Directory-backed stand-in for a provider batch endpoint (no external deps).
+
+Mirrors the lifecycle of the OpenAI Batch API (and Gemini batch mode) on the
+local filesystem, so `bench-run.py --batch` / `--ingest` can be exercised end
+to end without a provider:
+
+  <root>/<batch id>/input.jsonl    submitted batch-job lines
+  <root>/<batch id>/batch.json     status: in_progress | completed
+  <root>/<batch id>/output.jsonl   one result line per input line (after process)
+
+submit() only queues a job. process() completes queued jobs by echoing each
+request's prompt in the provider's response shape, like stub_server does. It
+stands in for the provider working through the queue and can run at any later
+time.
+
+Usage:
+  python scripts/adapters/batch_dir.py process --root .cache/bench/batch-endpoint
+  python scripts/adapters/batch_dir.py status  --root .cache/bench/batch-endpoint
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+if __package__:
+    from .stub_server import prompt_from, reply
+else:  # run as a script
+    from stub_server import prompt_from, reply  # type: ignore
+
+DEFAULT_ROOT = os.path.join(".cache", "bench", "batch-endpoint")
+# Path the stub helpers recognise as a Gemini request
+_GEMINI_PATH = "/v1beta/models/batch:generateContent"
+
+
+def _write_json(path: str, data: Any) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def _result_line(line: Dict[str, Any], index: int) -> Dict[str, Any]:
+    """Output line for one input line, in the matching provider's batch output shape."""
+    if "key" in line:  # Gemini batch mode
+        request = line.get("request") if isinstance(line.get("request"), dict) else {}
+        return {"key": line["key"], "response": reply(_GEMINI_PATH, prompt_from(_GEMINI_PATH, request))}
+    body = line.get("body") if isinstance(line.get("body"), dict) else {}
+    url = str(line.get("url") or "/v1/chat/completions")
+    return {
+        "id": f"batch_req_{index}",
+        "custom_id": line.get("custom_id"),
+        "response": {"status_code": 200, "request_id": f"req_{index}", "body": reply(url, prompt_from(url, body))},
+        "error": None,
+    }
+
+
+class BatchDirectory:
+    """Submit, poll and collect batch jobs under a root directory."""
+
+    def __init__(self, root: str = DEFAULT_ROOT) -> None:
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _dir(self, batch_id: str) -> str:
+        return os.path.join(self.root, batch_id)
+
+    def submit(self, input_path: str, provider: str, model: Optional[str] = None) -> str:
+        """Queue a batch-job JSONL file; returns the batch id."""
+        with open(input_path, "rb") as f:
+            data = f.read()
+        batch_id = "batch_" + hashlib.sha256(data + f"{time.time_ns()}".encode("ascii")).hexdigest()[:16]
+        os.makedirs(self._dir(batch_id))
+        shutil.copyfile(input_path, os.path.join(self._dir(batch_id), "input.jsonl"))
+        total = sum(1 for line in data.splitlines() if line.strip())
+        _write_json(os.path.join(self._dir(batch_id), "batch.json"), {
+            "id": batch_id,
+            "provider": provider,
+            "model": model,
+            "status": "in_progress",
+            "created_at": int(time.time()),
+            "request_counts": {"total": total, "completed": 0, "failed": 0},
+            "output_file": None,
+        })
+        return batch_id
+
+    def status(self, batch_id: str) -> Dict[str, Any]:
+        try:
+            with open(os.path.join(self._dir(batch_id), "batch.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except OSError:
+            raise KeyError(f"unknown batch: {batch_id}") from None
+
+    def pending(self) -> List[str]:
+        ids = [d for d in sorted(os.listdir(self.root)) if os.path.isfile(os.path.join(self._dir(d), "batch.json"))]
+        return [b for b in ids if self.status(b).get("status") != "completed"]
+
+    def process(self, batch_id: str) -> Dict[str, Any]:
+        """Complete one queued job; returns its final status."""
+        info = self.status(batch_id)
+        if info.get("status") == "completed":
+            return info
+        out_path = os.path.join(self._dir(batch_id), "output.jsonl")
+        completed = failed = 0
+        with open(os.path.join(self._dir(batch_id), "input.jsonl"), "r", encoding="utf-8") as src, \
+                open(out_path, "w", encoding="utf-8") as out:
+            for index, raw in enumerate(src):
+                if not raw.strip():
+                    continue
+                try:
+                    line = json.loads(raw)
+                    result = _result_line(line, index)
+                    completed += 1
+                except (ValueError, AttributeError) as e:
+                    result = {"custom_id": None, "response": None, "error": {"message": f"line {index + 1}: {e}"}}
+                    failed += 1
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        info.update({
+            "status": "completed",
+            "completed_at": int(time.time()),
+            "request_counts": {"total": completed + failed, "completed": completed, "failed": failed},
+            "output_file": out_path,
+        })
+        _write_json(os.path.join(self._dir(batch_id), "batch.json"), info)
+        return info
+
+    def output_path(self, batch_id: str) -> Optional[str]:
+        """Output JSONL of a completed job, else None."""
+        info = self.status(batch_id)
+        return info.get("output_file") if info.get("status") == "completed" else None
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Local directory stand-in for a provider batch endpoint")
+    parser.add_argument("command", choices=["process", "status"])
+    parser.add_argument("--root", default=DEFAULT_ROOT, help=f"Endpoint directory (default: {DEFAULT_ROOT})")
+    parser.add_argument("--id", default=None, help="Only this batch id (default: all)")
+    args = parser.parse_args(argv)
+
+    endpoint = BatchDirectory(args.root)
+    if args.command == "process":
+        ids = [args.id] if args.id else endpoint.pending()
+        for batch_id in ids:
+            info = endpoint.process(batch_id)
+            print(json.dumps({"id": batch_id, "status": info["status"], "request_counts": info["request_counts"]}))
+        return 0
+    ids = [args.id] if args.id else sorted(os.listdir(endpoint.root))
+    for batch_id in ids:
+        try:
+            info = endpoint.status(batch_id)
+        except KeyError:
+            continue
+        print(json.dumps({"id": batch_id, "status": info["status"], "request_counts": info["request_counts"]}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
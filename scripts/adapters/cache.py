@@ -0,0 +1,159 @@
+"""
+Content-addressed provider response cache (stdlib only, SQLite-backed).
+
+Keys hash everything that can change a completion: recipe content, provider,
+model, the endpoint that answered (its base URL, or DRY_RUN for the local echo),
+variant, temperature and the case input text. Entries are evicted
+least-recently-used first once the store exceeds its size budget, and
+entries older than max_age_days are dropped.
+
+Modes:
+- off: no lookups, no writes
+- read: serve hits, never write
+- readwrite: serve hits and store misses
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, List, Optional
+
+MODES = ("off", "read", "readwrite")
+DEFAULT_PATH = os.path.join(".cache", "bench", "responses.sqlite")
+# Endpoint recorded for responses no provider produced (dry-run echo / simulation)
+DRY_RUN = "dry-run"
+
+
+def hash_file(path: Optional[str]) -> str:
+    """sha256 of a file's bytes; empty string if path is missing."""
+    if not path or not os.path.isfile(path):
+        return ""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_key(
+    recipe_sha: str,
+    provider: Optional[str],
+    model: Optional[str],
+    endpoint: str,
+    variant: Optional[str],
+    temperature: Optional[float],
+    input_text: str,
+    prefix_key: Optional[str] = None,
+) -> str:
+    parts: List[Any] = [recipe_sha, provider, model, endpoint, variant, temperature, input_text]
+    if prefix_key is not None:
+        # Only runs with an assembled prompt prefix carry it, so earlier keys stay valid
+        parts.append(prefix_key)
+    payload = json.dumps(parts, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Thread-safe SQLite response store with LRU/age eviction and hit/miss counters."""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_PATH,
+        mode: str = "readwrite",
+        max_bytes: int = 256 * 1024 * 1024,
+        max_age_days: Optional[float] = 30.0,
+    ) -> None:
+        if mode not in MODES:
+            raise ValueError(f"cache mode must be one of {MODES}, got {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if mode == "off":
+            return
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses(last_used)")
+
+    @property
+    def enabled(self) -> bool:
+        return self._db is not None
+
+    def get(self, key: str) -> Optional[str]:
+        if self._db is None:
+            return None
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and self._expired(row[1], now):
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if self.mode == "readwrite":
+                self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def put(self, key: str, value: str) -> None:
+        if self._db is None or self.mode != "readwrite":
+            return
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode("utf-8")), now, now),
+            )
+
+    def prune(self) -> int:
+        """Drop expired entries, then least-recently-used ones until under max_bytes.
+        Returns the number of entries removed."""
+        if self._db is None or self.mode != "readwrite":
+            return 0
+        removed = 0
+        with self._lock:
+            if self.max_age_days is not None:
+                cutoff = time.time() - self.max_age_days * 86400.0
+                removed += self._db.execute("DELETE FROM responses WHERE created_at < ?", (cutoff,)).rowcount
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                excess = total - self.max_bytes
+                freed = 0
+                doomed = []
+                for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY last_used ASC"):
+                    doomed.append((key,))
+                    freed += size
+                    if freed >= excess:
+                        break
+                self._db.executemany("DELETE FROM responses WHERE key = ?", doomed)
+                removed += len(doomed)
+        return removed
+
+    def close(self) -> None:
+        if self._db is None:
+            return
+        self.prune()
+        with self._lock:
+            self._db.close()
+            self._db = None
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.max_age_days is not None and created_at < now - self.max_age_days * 86400.0
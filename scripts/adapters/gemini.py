@@ -1,13 +1,15 @@
 """
-Gemini adapter skeleton (no external deps).
+Gemini adapter (no external deps).
 Maps provider-agnostic fields (tool_mode, tool_aliases) to Gemini config.
 """
 from __future__ import annotations
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
+from .base import BaseAdapter, PromptPrefix
 
-class GeminiAdapter:
-    """Skeleton adapter for future native function calling.
+
+class GeminiAdapter(BaseAdapter):
+    """Adapter for Gemini generateContent with native function calling.
 
     Notes:
     - tool_mode (auto|required|none) -> Gemini function_calling_config.mode:
@@ -15,25 +17,57 @@ class GeminiAdapter:
       - required -> ANY (always call a function; restrict via allowed_function_names)
       - none -> NONE
     - tool_aliases: map logical tool names to Gemini function names.
+    - A PromptPrefix is sent as systemInstruction, which Gemini's implicit
+      context caching reuses across requests that share it.
+    - Set base_url (or GEMINI_BASE_URL) to enable the transport; API key from GEMINI_API_KEY.
     """
 
-    def __init__(self, model: str, tool_aliases: Optional[Dict[str, str]] = None) -> None:
-        self.model = model
-        self.tool_aliases = tool_aliases or {}
-
-    def map_tool_mode(self, tool_mode: Optional[str]) -> Dict[str, Any]:
-        mode = "AUTO"
-        if tool_mode == "required":
-            mode = "ANY"
-        elif tool_mode == "none":
-            mode = "NONE"
-        return {"function_calling_config": {"mode": mode}}
+    provider = "gemini"
+    api_key_env = "GEMINI_API_KEY"
+    tool_modes: Dict[str, Dict[str, Any]] = {
+        "auto": {"function_calling_config": {"mode": "AUTO"}},
+        "required": {"function_calling_config": {"mode": "ANY"}},
+        "none": {"function_calling_config": {"mode": "NONE"}},
+    }
 
     def allowed_function_names(self, tools: List[str]) -> List[str]:
-        return [self.tool_aliases.get(t, t) for t in tools]
+        return [self.tool_name(t) for t in tools]
+
+    def build_request(
+        self, prompt: str, prefix: Optional[PromptPrefix] = None
+    ) -> Tuple[str, Dict[str, Any], Dict[str, str]]:
+        payload: Dict[str, Any] = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+        if prefix is not None:
+            payload["systemInstruction"] = {"parts": [{"text": prefix.text}]}
+        if self.temperature is not None:
+            payload["generationConfig"] = {"temperature": self.temperature}
+        headers = {"x-goog-api-key": self.api_key} if self.api_key else {}
+        return f"/v1beta/models/{self.model}:generateContent", payload, headers
+
+    def build_stream_request(
+        self, prompt: str, prefix: Optional[PromptPrefix] = None
+    ) -> Tuple[str, Dict[str, Any], Dict[str, str]]:
+        _, payload, headers = self.build_request(prompt, prefix)
+        return f"/v1beta/models/{self.model}:streamGenerateContent?alt=sse", payload, headers
+
+    def parse_stream_event(self, data: Any) -> str:
+        return self.parse_response(data)
+
+    def batch_request(self, custom_id: str, prompt: str, prefix: Optional[PromptPrefix] = None) -> Dict[str, Any]:
+        """Gemini batch mode line: {"key", "request"}; the model is named by the job."""
+        _, payload, _ = self.build_request(prompt, prefix)
+        return {"key": custom_id, "request": payload}
+
+    def parse_batch_result(self, record: Dict[str, Any]) -> Tuple[Optional[str], str, Optional[str]]:
+        key = record.get("key")
+        error = record.get("error") or record.get("status")
+        if error and not record.get("response"):
+            return key, "", str(error.get("message", error) if isinstance(error, dict) else error)
+        return key, self.parse_response(record.get("response")), None
 
-    def run(self, prompt: str) -> str:
-        """Placeholder for model invocation.
-        Returns prompt echo to preserve dry-run semantics upstream.
-        """
-        return prompt
+    def parse_response(self, data: Any) -> str:
+        try:
+            parts = data["candidates"][0]["content"]["parts"]
+        except (KeyError, IndexError, TypeError):
+            return ""
+        return "".join(p.get("text", "") for p in parts if isinstance(p, dict))
@@ -1,42 +1,39 @@
 """
-QwenCoder adapter skeleton (no external deps).
+QwenCoder adapter (no external deps).
 Maps provider-agnostic fields (tool_mode, tool_aliases) to Qwen tool/config.
 
-Note: Placeholder only; actual SDK integration to be added later.
+Talks to the OpenAI-compatible endpoint (e.g. DashScope compatible mode).
 """
 from __future__ import annotations
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict
 
+from .base import ChatCompletionsAdapter, PromptPrefix
 
-class QwenCoderAdapter:
-    """Skeleton adapter for future native tool/function calling with Qwen/QwenCoder.
+
+class QwenCoderAdapter(ChatCompletionsAdapter):
+    """Adapter for native tool/function calling with Qwen/QwenCoder.
 
     tool_mode (auto|required|none) mapping (placeholder):
       - auto -> {"mode": "auto"}
       - required -> {"mode": "required"}
       - none -> {"mode": "none"}
     tool_aliases: logical tool name -> provider-specific function name.
+    A PromptPrefix is sent as a system text block marked cache_control ephemeral
+    (DashScope explicit context cache).
+    Set base_url (or QWEN_BASE_URL) to enable the transport; API key from DASHSCOPE_API_KEY.
     """
 
-    def __init__(self, model: str, tool_aliases: Optional[Dict[str, str]] = None) -> None:
-        self.model = model
-        self.tool_aliases = tool_aliases or {}
-
-    def map_tool_mode(self, tool_mode: Optional[str]) -> Dict[str, Any]:
-        if tool_mode == "required":
-            return {"mode": "required"}
-        if tool_mode == "none":
-            return {"mode": "none"}
-        return {"mode": "auto"}
-
-    def build_tools(self, tools: List[str]) -> List[Dict[str, Any]]:
-        """Placeholder: return simple logical tool descriptors with mapped names."""
-        result: List[Dict[str, Any]] = []
-        for t in tools:
-            name = self.tool_aliases.get(t, t)
-            result.append({"name": name, "schema": {"type": "object", "properties": {}}, "required": []})
-        return result
-
-    def run(self, prompt: str) -> str:
-        """Placeholder for model invocation. Echo to preserve dry-run semantics."""
-        return prompt
+    provider = "qwen"
+    api_key_env = "DASHSCOPE_API_KEY"
+    chat_path = "/compatible-mode/v1/chat/completions"
+    # DashScope batch jobs use the OpenAI-style endpoint name
+    batch_url = "/v1/chat/completions"
+    tool_modes: Dict[str, Dict[str, Any]] = {
+        "auto": {"mode": "auto"},
+        "required": {"mode": "required"},
+        "none": {"mode": "none"},
+    }
+
+    def system_message(self, prefix: PromptPrefix) -> Dict[str, Any]:
+        block = {"type": "text", "text": prefix.text, "cache_control": {"type": "ephemeral"}}
+        return {"role": "system", "content": [block]}
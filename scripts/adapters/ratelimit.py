@@ -0,0 +1,182 @@
+"""
+Per-provider/model rate limiting with adaptive (AIMD) concurrency. Stdlib only.
+
+Each (provider, model) gets one RateLimiter, shared process-wide through
+get_limiter() so every eval worker draws from the same budget:
+- token buckets for requests/min and tokens/min (unlimited when unset)
+- a concurrency window that grows by ~1 per window of successful requests
+  (additive increase) and halves on 429/503 (multiplicative decrease)
+- a cooldown honoring Retry-After before anyone sends again
+"""
+from __future__ import annotations
+import asyncio
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional, Tuple
+
+THROTTLE_STATUSES = (429, 503)
+
+
+def parse_retry_after(value: Optional[str], default: float = 1.0) -> float:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date)."""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+class TokenBucket:
+    """Refills at rate_per_min/60 units per second up to capacity (one minute's worth by default)."""
+
+    def __init__(self, rate_per_min: float, capacity: Optional[float] = None) -> None:
+        self.rate = rate_per_min / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_min
+        self._level = self.capacity
+        self._stamp = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self._level = min(self.capacity, self._level + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` is available (0 if it is now). Not thread-safe; callers lock."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self._level >= amount:
+            return 0.0
+        return (amount - self._level) / self.rate
+
+    def take(self, amount: float) -> None:
+        self._level -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """Shared request/token budget and AIMD concurrency window for one provider/model."""
+
+    def __init__(
+        self,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        max_concurrency: int = 8,
+        min_concurrency: int = 1,
+        max_retries: int = 5,
+    ) -> None:
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.max_retries = max_retries
+        self.limit = float(self.max_concurrency)
+        # Lowest window reached; the window grows back after throttles
+        self.min_limit = self.limit
+        self.in_flight = 0
+        self._cooldown_until = 0.0
+        self._lock = threading.Lock()
+        # stats
+        self.throttle_events = 0
+        self.wait_s = 0.0
+        self.completed = 0
+        self._first_start: Optional[float] = None
+        self._last_end: Optional[float] = None
+
+    def _try_acquire(self, tokens: float) -> float:
+        """Take a slot and budget if available; otherwise return seconds to wait."""
+        now = time.monotonic()
+        with self._lock:
+            if now < self._cooldown_until:
+                return self._cooldown_until - now
+            if self.in_flight >= int(self.limit):
+                return 0.005
+            waits = [0.0]
+            if self.requests is not None:
+                waits.append(self.requests.wait_time(1, now))
+            if self.tokens is not None:
+                waits.append(self.tokens.wait_time(tokens, now))
+            wait = max(waits)
+            if wait > 0:
+                return wait
+            if self.requests is not None:
+                self.requests.take(1)
+            if self.tokens is not None:
+                self.tokens.take(tokens)
+            self.in_flight += 1
+            if self._first_start is None:
+                self._first_start = now
+            return 0.0
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait <= 0:
+                return
+            self._add_wait(wait)
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: float = 1.0) -> None:
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait <= 0:
+                return
+            self._add_wait(wait)
+            await asyncio.sleep(wait)
+
+    def release(self, ok: bool = True) -> None:
+        """Free a slot. Successful requests grow the window by 1/limit (≈ +1 per full window)."""
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            if ok:
+                self.completed += 1
+                self._last_end = time.monotonic()
+                self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+
+    def throttled(self, retry_after: float) -> None:
+        """Record a 429/503: halve the window and pause everyone for retry_after seconds."""
+        with self._lock:
+            self.throttle_events += 1
+            self.limit = max(float(self.min_concurrency), self.limit / 2.0)
+            self.min_limit = min(self.min_limit, self.limit)
+            self._cooldown_until = max(self._cooldown_until, time.monotonic() + retry_after)
+
+    def cooling_down(self) -> bool:
+        """True while a throttle's Retry-After pause is in effect."""
+        with self._lock:
+            return time.monotonic() < self._cooldown_until
+
+    def _add_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.wait_s += seconds
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed = (self._last_end - self._first_start) if self._first_start and self._last_end else 0.0
+            return {
+                "throttle_events": self.throttle_events,
+                "wait_ms": round(self.wait_s * 1000.0, 2),
+                "concurrency_limit": round(self.limit, 2),
+                "min_concurrency_limit": round(self.min_limit, 2),
+                "completed": self.completed,
+                "sustained_rps": round(self.completed / elapsed, 2) if elapsed > 0 else None,
+            }
+
+
+_LIMITERS: Dict[Tuple[str, str], Tuple[Dict[str, Any], RateLimiter]] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def get_limiter(provider: str, model: str, **kwargs: Any) -> RateLimiter:
+    """Process-wide limiter for (provider, model). Calls with the same kwargs share one
+    limiter; different kwargs (e.g. a new --rpm in a long-lived server) start a fresh one."""
+    key = (provider, model)
+    with _LIMITERS_LOCK:
+        entry = _LIMITERS.get(key)
+        if entry is None or entry[0] != kwargs:
+            entry = (dict(kwargs), RateLimiter(**kwargs))
+            _LIMITERS[key] = entry
+        return entry[1]
@@ -0,0 +1,150 @@
+"""
+Request deadlines, retries and hedging for the provider adapters. Stdlib only.
+
+RequestPolicy configures, per adapter:
+- deadline_s: wall-clock budget for one logical request, covering every retry
+  and hedge. A request that runs out of time raises DeadlineExceeded;
+- retries on transient failures (connection errors, timeouts, 408/5xx, and
+  429 when no rate limiter handles throttling), with exponential backoff and
+  full jitter: sleep uniform(0, min(backoff_max_s, backoff_base_s * 2**n)),
+  never shorter than a Retry-After header;
+- hedging: when a streamed request has produced no chunk by the observed
+  hedge_quantile (p95) of time-to-first-chunk for its provider/model, a
+  duplicate request is sent. The first to stream wins and the other is
+  cancelled and its connection closed.
+
+Time-to-first-chunk samples are kept in a rolling window per (provider, model),
+shared process-wide like the rate limiters. Hedging waits for
+hedge_min_samples samples before it starts.
+"""
+from __future__ import annotations
+import http.client
+import random
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from .transport import TransportError
+
+# Statuses worth retrying: request timeout, throttling and server-side failures
+RETRY_STATUSES = (408, 429, 500, 502, 503, 504)
+# Samples of time-to-first-chunk kept per provider/model
+WINDOW_SIZE = 256
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's deadline passed before a response completed."""
+
+
+@dataclass
+class RequestPolicy:
+    deadline_s: Optional[float] = None
+    max_retries: int = 2
+    backoff_base_s: float = 0.25
+    backoff_max_s: float = 8.0
+    hedge: bool = False
+    hedge_quantile: float = 0.95
+    hedge_min_samples: int = 20
+    # Never hedge sooner than this, however fast the provider has been
+    hedge_min_delay_s: float = 0.05
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Results-file summary of the policy."""
+        return {
+            "deadline_s": self.deadline_s,
+            "max_retries": self.max_retries,
+            "hedge": self.hedge,
+            "hedge_quantile": self.hedge_quantile if self.hedge else None,
+        }
+
+    def backoff(self, retry: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to sleep before retry number `retry` (0-based)."""
+        delay = random.uniform(0.0, min(self.backoff_max_s, self.backoff_base_s * (2 ** retry)))
+        return max(delay, retry_after or 0.0)
+
+
+def is_transient(err: BaseException) -> bool:
+    """Whether a failed request may succeed if sent again."""
+    if isinstance(err, TransportError):
+        return err.status in RETRY_STATUSES
+    return isinstance(err, (OSError, http.client.HTTPException)) and not isinstance(err, DeadlineExceeded)
+
+
+# Errors a caller should treat as "this request failed" (after retries), not as bugs
+REQUEST_ERRORS: Tuple[type, ...] = (TransportError, OSError, http.client.HTTPException)
+
+
+def new_report(report: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Fill in (or create) the per-call report an adapter updates: retries
+    (all resends), throttled (those after a 429/503), hedged and hedge_won."""
+    report = report if report is not None else {}
+    for key, zero in (("retries", 0), ("throttled", 0), ("hedged", False), ("hedge_won", False)):
+        report.setdefault(key, zero)
+    return report
+
+
+class LatencyWindow:
+    """Rolling window of recent latencies (seconds) with quantile lookup."""
+
+    def __init__(self, size: int = WINDOW_SIZE) -> None:
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def quantile(self, q: float, min_samples: int = 1) -> Optional[float]:
+        """Nearest-rank quantile, or None with fewer than min_samples samples."""
+        with self._lock:
+            if len(self._samples) < max(1, min_samples):
+                return None
+            ordered = sorted(self._samples)
+        rank = min(len(ordered) - 1, max(0, int(q * len(ordered) + 0.999999) - 1))
+        return ordered[rank]
+
+
+_WINDOWS: Dict[Tuple[str, str], LatencyWindow] = {}
+_WINDOWS_LOCK = threading.Lock()
+
+
+def get_window(provider: str, model: str) -> LatencyWindow:
+    """Process-wide time-to-first-chunk window for provider/model."""
+    key = (provider, model)
+    with _WINDOWS_LOCK:
+        window = _WINDOWS.get(key)
+        if window is None:
+            window = _WINDOWS[key] = LatencyWindow()
+        return window
+
+
+class RequestStats:
+    """Per-adapter counters of retries, hedges and deadline misses."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.deadline_exceeded = 0
+        self.failed = 0
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def as_dict(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "deadline_exceeded": self.deadline_exceeded,
+                "failed": self.failed,
+            }
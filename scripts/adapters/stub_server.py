@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+stub_server: Local stand-in for the OpenAI, Gemini and Qwen HTTP APIs.
+Echoes the prompt back in each provider's response shape (plain or SSE
+streaming), speaks HTTP/1.1 keep-alive and counts connections so connection
+reuse can be checked. With a requests-per-second limit it answers excess
+requests with 429 + Retry-After, like a provider under load. System prompts
+(prompt prefixes) are remembered, and repeats are counted as prefix_hits, the
+way a provider's prompt cache would serve them. To exercise retries and
+hedging, every Nth request can fail with a 500 (--fail-every) or stall before
+answering (--stall-every, --stall-ms), like a provider's tail latency.
+
+Usage:
+  python scripts/adapters/stub_server.py --port 8765
+  python scripts/adapters/stub_server.py --port 8765 --rps 20 --retry-after 0.5
+  python scripts/adapters/stub_server.py --port 8765 --stall-every 10 --stall-ms 2000 --fail-every 7
+  OPENAI_BASE_URL=http://127.0.0.1:8765 python scripts/bench-run.py --task sample-task --provider openai --model gpt-5
+
+In-process:
+  with StubServer() as srv:
+      OpenAIAdapter("gpt-5", base_url=srv.url).run("hi")
+      srv.stats()  # {"connections": 1, "requests": 1}
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import json
+import re
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Set
+
+
+def _is_gemini(path: str) -> bool:
+    return path.split("?", 1)[0].endswith(("generateContent", "GenerateContent"))
+
+
+def prompt_from(path: str, body: Dict[str, Any]) -> str:
+    """Last user message of an OpenAI-style or Gemini request body ("" if absent)."""
+    if _is_gemini(path):
+        try:
+            return "".join(p.get("text", "") for p in body["contents"][-1]["parts"])
+        except (KeyError, IndexError, TypeError):
+            return ""
+    try:
+        return str(body["messages"][-1]["content"])
+    except (KeyError, IndexError, TypeError):
+        return ""
+
+
+def _prefix_from(path: str, body: Dict[str, Any]) -> Optional[str]:
+    """System instruction text of a request, if any."""
+    if _is_gemini(path):
+        try:
+            return "".join(p.get("text", "") for p in body["systemInstruction"]["parts"])
+        except (KeyError, TypeError):
+            return None
+    messages = body.get("messages") if isinstance(body.get("messages"), list) else []
+    for m in messages:
+        if isinstance(m, dict) and m.get("role") == "system":
+            content = m.get("content")
+            if isinstance(content, list):
+                return "".join(b.get("text", "") for b in content if isinstance(b, dict))
+            return str(content)
+    return None
+
+
+def reply(path: str, text: str) -> Dict[str, Any]:
+    """Non-streaming response body carrying `text`, in the shape the API at `path` returns."""
+    if _is_gemini(path):
+        return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}]}
+    return {"choices": [{"index": 0, "message": {"role": "assistant", "content": text}}]}
+
+
+def _stream_events(path: str, text: str) -> List[str]:
+    chunks = re.findall(r"\s*\S+\s*", text)
+    if _is_gemini(path):
+        return [json.dumps(reply(path, c)) for c in chunks]
+    events = [json.dumps({"choices": [{"index": 0, "delta": {"content": c}}]}) for c in chunks]
+    return events + ["[DONE]"]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_Server"
+
+    def setup(self) -> None:
+        super().setup()
+        self.server.count("connections")
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        pass
+
+    def _send_json(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        if self.path == "/stats":
+            self._send_json(200, self.server.stats())
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        n = self.server.count("requests")
+        if not self.server.admit():
+            self.server.count("throttled")
+            self._send_json(429, {"error": "rate limited"}, {"Retry-After": self.server.retry_after})
+            return
+        try:
+            body = json.loads(raw.decode("utf-8")) if raw else {}
+        except ValueError:
+            self._send_json(400, {"error": "invalid JSON"})
+            return
+        if self.server.fail_every and n % self.server.fail_every == 0:
+            self.server.count("failed")
+            self._send_json(500, {"error": "injected failure"})
+            return
+        if self.server.stall_every and n % self.server.stall_every == 0:
+            self.server.count("stalled")
+            time.sleep(self.server.stall_s)
+        prefix = _prefix_from(self.path, body)
+        if prefix is not None:
+            self.server.count("prefix_hits" if self.server.seen_prefix(prefix) else "prefix_misses")
+        text = prompt_from(self.path, body)
+        if body.get("stream") or "streamGenerateContent" in self.path:
+            self._send_sse(_stream_events(self.path, text))
+        else:
+            self._send_json(200, reply(self.path, text))
+
+    def _send_sse(self, events: List[str]) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for data in events:
+            payload = f"data: {data}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(payload):x}\r\n".encode("ascii") + payload + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        addr: Any,
+        rps: Optional[float] = None,
+        retry_after: str = "1",
+        fail_every: int = 0,
+        stall_every: int = 0,
+        stall_s: float = 0.0,
+    ) -> None:
+        super().__init__(addr, _Handler)
+        self._counters: Dict[str, int] = {"connections": 0, "requests": 0, "throttled": 0}
+        self._lock = threading.Lock()
+        self.rps = rps
+        self.retry_after = retry_after
+        self.fail_every = fail_every
+        self.stall_every = stall_every
+        self.stall_s = stall_s
+        self._recent: "deque[float]" = deque()
+        self._prefixes: Set[str] = set()
+
+    def handle_error(self, request: Any, client_address: Any) -> None:
+        # Clients that hang up mid-response (cancelled hedges, deadlines) are expected
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            self.count("client_aborts")
+            return
+        super().handle_error(request, client_address)
+
+    def admit(self) -> bool:
+        """Sliding one-second window: False once more than rps requests arrived in it."""
+        if not self.rps:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            while self._recent and now - self._recent[0] > 1.0:
+                self._recent.popleft()
+            if len(self._recent) >= self.rps:
+                return False
+            self._recent.append(now)
+            return True
+
+    def seen_prefix(self, text: str) -> bool:
+        """Whether this prefix was sent before; remembers it either way."""
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        with self._lock:
+            seen = digest in self._prefixes
+            self._prefixes.add(digest)
+        return seen
+
+    def count(self, name: str) -> int:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + 1
+            return self._counters[name]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counters)
+
+
+class StubServer:
+    """Run the stub on a background thread; port 0 picks a free port."""
+
+    def __init__(
+        self, host: str = "127.0.0.1", port: int = 0, rps: Optional[float] = None, retry_after: str = "1", **faults: Any
+    ) -> None:
+        """faults: fail_every, stall_every and stall_s, as for _Server."""
+        self._server = _Server((host, port), rps=rps, retry_after=retry_after, **faults)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def stats(self) -> Dict[str, int]:
+        return self._server.stats()
+
+    def start(self) -> "StubServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description="Local stub for provider HTTP APIs")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--rps", type=float, default=None, help="Answer 429 beyond this many requests per second")
+    p.add_argument("--retry-after", default="1", help="Retry-After header value sent with 429s")
+    p.add_argument("--fail-every", type=int, default=0, help="Answer every Nth request with a 500")
+    p.add_argument("--stall-every", type=int, default=0, help="Delay every Nth request by --stall-ms before answering")
+    p.add_argument("--stall-ms", type=float, default=1000.0, help="Delay for --stall-every (default: 1000)")
+    args = p.parse_args(argv)
+    server = _Server(
+        (args.host, args.port), rps=args.rps, retry_after=args.retry_after,
+        fail_every=args.fail_every, stall_every=args.stall_every, stall_s=args.stall_ms / 1000.0,
+    )
+    print(json.dumps({"url": f"http://{args.host}:{server.server_address[1]}"}), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,31 @@
+"""
+Local prompt token estimates (no external deps).
+
+A single regex pass splits text the way BPE pre-tokenizers do (letter runs,
+digit runs, punctuation, line breaks) and charges each piece what a typical
+BPE vocabulary does: one token per common word with long words split, one
+token per 3 digits, one per punctuation mark. That lands far closer to provider
+counts than characters/4 on code and markup, at regex speed and with no
+vocabulary files.
+"""
+from __future__ import annotations
+import re
+
+_PIECE_RE = re.compile(r"[^\W\d_]+|\d+|\n+|[^\w\s]|_")
+# Letters an ASCII word can have before it costs an extra token
+WORD_CHARS = 9
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimated BPE token count of text (0 for empty text)."""
+    total = 0
+    for piece in _PIECE_RE.findall(text):
+        c = piece[0]
+        if c.isdigit():
+            total += (len(piece) + 2) // 3
+        elif c.isalpha():
+            # Non-ASCII scripts (CJK, Cyrillic, ...) tokenize at a few characters per token
+            total += 1 + len(piece) // WORD_CHARS if piece.isascii() else (len(piece) + 1) // 2
+        else:
+            total += 1
+    return total
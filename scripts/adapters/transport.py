@@ -0,0 +1,276 @@
+"""
+Keep-alive HTTP transport shared by the provider adapters (stdlib only).
+
+One ConnectionPool per base URL holds idle http.client connections so TCP/TLS
+setup is paid once and reused across cases and worker threads. Pools are
+shared process-wide through get_pool().
+"""
+from __future__ import annotations
+import asyncio
+import http.client
+import json
+import socket
+import ssl
+import threading
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+# Errors raised when a pooled (idle) connection was closed by the server;
+# the request is retried once on a fresh connection.
+_STALE_ERRORS = (http.client.RemoteDisconnected, http.client.CannotSendRequest, BrokenPipeError, ConnectionResetError)
+
+
+class TransportError(Exception):
+    """Non-2xx HTTP response. Carries status, headers and the raw body."""
+
+    def __init__(self, status: int, headers: Dict[str, str], body: bytes) -> None:
+        self.status = status
+        self.headers = headers
+        self.body = body
+        preview = body[:200].decode("utf-8", errors="replace")
+        super().__init__(f"HTTP {status}: {preview}")
+
+
+def encode_json(payload: Any) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def decode_json(body: bytes) -> Any:
+    return json.loads(body.decode("utf-8")) if body else {}
+
+
+class ConnectionPool:
+    """Thread-safe pool of keep-alive connections to a single scheme://host:port.
+
+    max_size bounds concurrent connections (callers block when all are busy);
+    timeout applies to connect and to each socket read.
+    """
+
+    def __init__(self, base_url: str, max_size: int = 8, timeout: float = 60.0) -> None:
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"unsupported base URL: {base_url!r}")
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.base_path = parts.path.rstrip("/")
+        self.max_size = max_size
+        self.timeout = timeout
+        self.created = 0
+        self._idle: Deque[http.client.HTTPConnection] = deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._ssl_context = ssl.create_default_context() if self.scheme == "https" else None
+
+    def _connect(self) -> http.client.HTTPConnection:
+        with self._lock:
+            self.created += 1
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout, context=self._ssl_context)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _checkout(self) -> Tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        return self._connect(), False
+
+    def _checkin(self, conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            self._idle.append(conn)
+
+    def open(
+        self,
+        method: str,
+        path: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+        on_connection: Optional[Callable[[http.client.HTTPConnection], None]] = None,
+    ) -> Tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+        """Send a request and return (connection, response) with the body unread.
+        The caller must read the response and hand both to release().
+        on_connection sees each connection before it is used, so another thread
+        can abort() it."""
+        self._slots.acquire()
+        conn: Optional[http.client.HTTPConnection] = None
+        try:
+            conn, reused = self._checkout()
+            url = self.base_path + path
+            try:
+                if on_connection is not None:
+                    on_connection(conn)
+                conn.request(method, url, body=body, headers=headers or {})
+                resp = conn.getresponse()
+            except _STALE_ERRORS:
+                conn.close()
+                if not reused:
+                    raise
+                conn = self._connect()
+                if on_connection is not None:
+                    on_connection(conn)
+                conn.request(method, url, body=body, headers=headers or {})
+                resp = conn.getresponse()
+            return conn, resp
+        except BaseException:
+            # A timed-out or failed request leaves the connection unusable
+            if conn is not None:
+                conn.close()
+            self._slots.release()
+            raise
+
+    @staticmethod
+    def abort(conn: http.client.HTTPConnection) -> None:
+        """Unblock a thread reading from conn by shutting its socket down; the
+        reader then fails and release() closes the connection."""
+        sock = conn.sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def release(self, conn: http.client.HTTPConnection, resp: http.client.HTTPResponse, reuse: bool = True) -> None:
+        """Return a connection to the pool once its response has been fully read."""
+        try:
+            if reuse and not resp.will_close and resp.isclosed():
+                self._checkin(conn)
+            else:
+                conn.close()
+        finally:
+            self._slots.release()
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Tuple[int, Dict[str, str], bytes]:
+        """Send a request and return (status, headers, body). Raises TransportError on non-2xx."""
+        conn, resp = self.open(method, path, body, headers)
+        ok = False
+        try:
+            data = resp.read()
+            ok = True
+        finally:
+            self.release(conn, resp, reuse=ok)
+        resp_headers = {k.lower(): v for k, v in resp.getheaders()}
+        if not 200 <= resp.status < 300:
+            raise TransportError(resp.status, resp_headers, data)
+        return resp.status, resp_headers, data
+
+    def post_json(self, path: str, payload: Any, headers: Optional[Dict[str, str]] = None) -> Any:
+        hdrs = {"Content-Type": "application/json", "Accept": "application/json"}
+        hdrs.update(headers or {})
+        _, _, data = self.request("POST", path, encode_json(payload), hdrs)
+        return decode_json(data)
+
+    def close(self) -> None:
+        with self._lock:
+            while self._idle:
+                self._idle.pop().close()
+
+
+async def aiter_sse(
+    pool: ConnectionPool,
+    method: str,
+    path: str,
+    body: Optional[bytes] = None,
+    headers: Optional[Dict[str, str]] = None,
+) -> AsyncIterator[str]:
+    """Send a request and yield the `data:` payloads of a server-sent-event stream.
+
+    The blocking read runs on a helper thread and hands each event to the event
+    loop as soon as it arrives. The connection goes back to the pool when the
+    stream is read to the end; abandoned streams (e.g. a cancelled hedge) abort
+    their connection, so the helper thread does not wait out the socket timeout.
+    """
+    loop = asyncio.get_running_loop()
+    queue: "asyncio.Queue[Any]" = asyncio.Queue()
+    done = object()
+    stop = threading.Event()
+    # The connection in use, while the reader owns it; guarded by `lock`
+    current: Dict[str, http.client.HTTPConnection] = {}
+    lock = threading.Lock()
+
+    def track(conn: http.client.HTTPConnection) -> None:
+        with lock:
+            if stop.is_set():
+                raise ConnectionAbortedError("stream abandoned")
+            current["conn"] = conn
+
+    def put(item: Any) -> None:
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:  # loop already closed; consumer went away
+            pass
+
+    def reader() -> None:
+        try:
+            conn, resp = pool.open(method, path, body, headers, on_connection=track)
+        except BaseException as e:
+            with lock:
+                current.pop("conn", None)
+            put(e)
+            put(done)
+            return
+        complete = False
+        try:
+            if not 200 <= resp.status < 300:
+                data = resp.read()
+                complete = True
+                raise TransportError(resp.status, {k.lower(): v for k, v in resp.getheaders()}, data)
+            for raw in iter(resp.readline, b""):
+                if stop.is_set():
+                    break
+                line = raw.decode("utf-8").rstrip("\r\n")
+                if line.startswith("data:"):
+                    put(line[5:].strip())
+            else:
+                complete = True
+        except BaseException as e:
+            put(e)
+        finally:
+            with lock:
+                current.pop("conn", None)
+            pool.release(conn, resp, reuse=complete)
+            put(done)
+
+    threading.Thread(target=reader, daemon=True).start()
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        with lock:
+            stop.set()
+            conn = current.get("conn")
+            if conn is not None:
+                pool.abort(conn)
+
+
+_POOLS: Dict[Tuple[str, int, float], ConnectionPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(base_url: str, max_size: int = 8, timeout: float = 60.0) -> ConnectionPool:
+    """Process-wide pool for base_url; adapters with the same settings share connections."""
+    key = (base_url.rstrip("/"), max_size, timeout)
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = ConnectionPool(base_url, max_size=max_size, timeout=timeout)
+            _POOLS[key] = pool
+        return pool
+
+
+def close_pools() -> None:
+    with _POOLS_LOCK:
+        for pool in _POOLS.values():
+            pool.close()
+        _POOLS.clear()
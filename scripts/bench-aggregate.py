@@ -1,21 +1,68 @@
 #!/usr/bin/env python3
 """
-bench-aggregate: Scan bench/**/results/*.json and update recipes.lock.json
-with the most recent metrics per (bench_id, provider, model, variant).
+bench-aggregate: Scan bench/**/results/*.json(l), record every run in the
+bench history store and export recipes.lock.json with the most recent metrics
+per (bench_id, provider, model, variant).
 Stdlib only; best-effort git SHA detection.
+
+The history store (history_store.py, bench/history.sqlite) is append-only and
+records each run with its git SHA and timestamp: runs are kept after their
+results files are gone, and the lockfile is derived from it. Runs are
+attributed to the git_sha bench-run recorded, or to HEAD when they are first
+recorded for results without one; later HEADs never record them again.
+--export-only rewrites the lockfile from the store without scanning results.
+
+--compare <baseline results or lockfile> checks results (--candidate, default
+the newest results file) for statistically significant regressions in
+accuracy and latency (regression.py), writes a JSON diff report (--report) and
+exits 1 when any are found, or 2 when no candidate run has a baseline to
+compare with.
+
+Latency percentiles (p50/p90/p95/p99/max) come from per-case latency_ms across
+all runs of a key, merged through fixed-memory sketches (latency_sketch.py).
+
+Results ingested from offline batch jobs (mode "batch") contribute accuracy
+and tokens but no latency.
+
+Phase timings (bench-run's phases_ms) are rolled up per key: the latest run's
+invocation and run phases, and its per-case phase averages.
+
+Multi-role runs (topology multi, provider "multi") also record each role's
+mean latency and the share of cases it was on the critical path.
+
+Extracted metrics are kept in a SQLite index (.cache/bench/aggregate-index.sqlite)
+so only new or changed results files are parsed; --rebuild forces a full rescan.
+
+Results of `bench-run.py --shard i/n` are combined with
+`--merge <shard files...> --output <file>` into one logical run (summed totals,
+wall clock of the slowest shard). Unmerged shard blocks are left out of the
+lockfile so nothing is counted twice.
 """
 from __future__ import annotations
+import argparse
+import hashlib
 import json
 import os
+import sqlite3
 import sys
-from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, fields
 from datetime import datetime, timezone
 from glob import glob
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 import subprocess
 
+from history_store import HISTORY_PATH, HistoryStore
+from latency_sketch import LatencySketch
+from regression import CaseSample, RunSample, Thresholds, compare_runs
+
 LOCK_PATH = "recipes.lock.json"
 RESULTS_GLOB = os.path.join("bench", "**", "results", "*.json")
+RESULTS_GLOB_JSONL = os.path.join("bench", "**", "results", "*.jsonl")
+INDEX_PATH = os.path.join(".cache", "bench", "aggregate-index.sqlite")
+INDEX_VERSION = 7
+# Below this many new/changed files, parsing in-process beats pool startup
+PARALLEL_MIN_FILES = 8
 
 
 def read_json(path: str) -> Any:
@@ -55,6 +102,73 @@ class Metric:
     avg_latency_ms: float
     tool_calls: int
     ended_at: float
+    # Streaming metrics; None for results written before they were recorded
+    avg_ttft_ms: Optional[float] = None
+    tokens_per_sec: Optional[float] = None
+    # Serialized LatencySketch of the run's per-case latency_ms
+    latency_sketch: Optional[Dict[str, Any]] = None
+    # Run-level phases_ms and per-case phase means; None before phases were recorded
+    phases_ms: Optional[Dict[str, float]] = None
+    case_phases_ms: Optional[Dict[str, float]] = None
+    # "batch" for results of offline batch jobs, which carry no latency
+    mode: Optional[str] = None
+    # Commit bench-run ran at; None for results written before it was recorded
+    git_sha: Optional[str] = None
+    # Multi-role runs: per-role mean latency and critical-path share; None otherwise
+    roles: Optional[Dict[str, Dict[str, float]]] = None
+
+
+_METRIC_FIELDS = {f.name for f in fields(Metric)}
+
+
+def metric_from_dict(d: Dict[str, Any]) -> Metric:
+    """Metric from its stored JSON, ignoring fields this version does not know."""
+    return Metric(**{k: v for k, v in d.items() if k in _METRIC_FIELDS})
+
+
+def _opt_float(v: Any) -> Optional[float]:
+    return float(v) if isinstance(v, (int, float)) else None
+
+
+def _phase_dict(v: Any) -> Optional[Dict[str, float]]:
+    if not isinstance(v, dict):
+        return None
+    return {str(k): float(ms) for k, ms in v.items() if isinstance(ms, (int, float))}
+
+
+def case_phase_means(totals: Dict[str, Any]) -> Optional[Dict[str, float]]:
+    """Mean milliseconds per case for each per-case phase, from totals.sum_phases_ms."""
+    sums = _phase_dict(totals.get("sum_phases_ms"))
+    cases = int(totals.get("cases", 0))
+    if not sums or not cases:
+        return None
+    return {k: round(ms / cases, 3) for k, ms in sums.items()}
+
+
+def role_means(totals: Dict[str, Any]) -> Optional[Dict[str, Dict[str, float]]]:
+    """Per-role mean latency and critical-path share of a multi-role run, from
+    totals.sum_role_latency_ms, role_cases and critical_path_cases."""
+    sums = _phase_dict(totals.get("sum_role_latency_ms"))
+    counts = totals.get("role_cases") if isinstance(totals.get("role_cases"), dict) else {}
+    critical = totals.get("critical_path_cases") if isinstance(totals.get("critical_path_cases"), dict) else {}
+    cases = int(totals.get("cases", 0))
+    if not sums or not cases:
+        return None
+    return {
+        name: {
+            "avg_latency_ms": round(ms / int(counts[name]), 2) if counts.get(name) else 0.0,
+            "critical_path_share": round(int(critical.get(name, 0)) / cases, 4),
+        }
+        for name, ms in sums.items()
+    }
+
+
+def _sum_counts(blocks: List[Dict[str, Any]], key: str) -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    for b in blocks:
+        for k, v in (_phase_dict((b.get("totals") or {}).get(key)) or {}).items():
+            out[k] = out.get(k, 0.0) + v
+    return out
 
 
 def variant_key(variants: Optional[List[str]]) -> str:
@@ -63,14 +177,81 @@ def variant_key(variants: Optional[List[str]]) -> str:
     return "+".join(variants)
 
 
-def aggregate_latest(results_paths: List[str]) -> Dict[str, Any]:
-    # metrics[bench_id][provider][model][variant] = Metric (latest)
-    metrics: Dict[str, Dict[str, Dict[str, Dict[str, Metric]]]] = {}
+def iter_runs(data: Any) -> List[Dict[str, Any]]:
+    """Return the run blocks in a results file.
+    Matrix results ({"matrix": true, "runs": [...]}) hold one block per
+    provider/model/variant; plain results are a single block."""
+    if not isinstance(data, dict):
+        return []
+    runs = data.get("runs")
+    if isinstance(runs, list):
+        return [r for r in runs if isinstance(r, dict)]
+    return [data]
 
-    for p in results_paths:
-        try:
-            data = read_json(p)
-        except Exception:
+
+def read_jsonl_runs(path: str, keep_cases: bool = False) -> List[Dict[str, Any]]:
+    """Return the summary blocks of a streamed (JSONL) results file.
+    The last summary line per run wins, so resumed runs report their final totals;
+    runs that never wrote a summary (crashed, not yet resumed) are skipped.
+    Case latencies are folded into a per-run sketch (`latency_sketch`) as lines are read.
+    With keep_cases, each block also gets its case lines as `cases` (last line per id)."""
+    summaries: Dict[str, Dict[str, Any]] = {}
+    sketches: Dict[str, LatencySketch] = {}
+    case_lines: Dict[str, Dict[Any, Dict[str, Any]]] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except Exception:
+                continue
+            if not isinstance(rec, dict):
+                continue
+            if rec.get("type") == "summary":
+                summaries[str(rec.get("run"))] = rec
+            elif rec.get("type") == "case" and isinstance(rec.get("latency_ms"), (int, float)):
+                sketches.setdefault(str(rec.get("run")), LatencySketch()).add(rec["latency_ms"])
+                if keep_cases:
+                    case_lines.setdefault(str(rec.get("run")), {})[rec.get("id")] = rec
+    for run, rec in summaries.items():
+        rec["latency_sketch"] = sketches.get(run, LatencySketch())
+        if keep_cases:
+            rec["cases"] = list(case_lines.get(run, {}).values())
+    return list(summaries.values())
+
+
+def run_sketch(data: Dict[str, Any]) -> LatencySketch:
+    """Latency sketch of a run block: prebuilt for JSONL runs, else built from its cases."""
+    sk = data.get("latency_sketch")
+    if isinstance(sk, LatencySketch):
+        return sk
+    if isinstance(sk, dict):
+        return LatencySketch.from_dict(sk)
+    return LatencySketch().extend(
+        c["latency_ms"] for c in data.get("cases") or []
+        if isinstance(c, dict) and isinstance(c.get("latency_ms"), (int, float))
+    )
+
+
+def load_runs(path: str, keep_cases: bool = False) -> List[Dict[str, Any]]:
+    """Return the run blocks of a results file in either JSON or JSONL format."""
+    if path.lower().endswith(".jsonl"):
+        return read_jsonl_runs(path, keep_cases)
+    return iter_runs(read_json(path))
+
+
+# (bench_id, provider, model, variant key, metric) for one run block
+MetricRow = Tuple[str, str, str, str, Metric]
+
+
+def extract_metrics(path: str) -> List[MetricRow]:
+    """Parse one results file into metric rows; unreadable files yield none."""
+    try:
+        runs = load_runs(path)
+    except Exception:
+        return []
+    rows: List[MetricRow] = []
+    for data in runs:
+        if is_unmerged_shard(data):
             continue
         bench_id = data.get("bench_id") or "unknown"
         provider = data.get("provider") or "unknown"
@@ -78,13 +259,210 @@ def aggregate_latest(results_paths: List[str]) -> Dict[str, Any]:
         variants = data.get("variants")
         vkey = variant_key(variants if isinstance(variants, list) else None)
         totals = data.get("totals", {})
+        batch = data.get("mode") == "batch"
         m = Metric(
             accuracy=float(totals.get("accuracy", 0.0)),
             avg_latency_ms=float(totals.get("avg_latency_ms", 0.0)),
             tool_calls=int(totals.get("tool_calls", 0)),
             ended_at=parse_ts(data.get("ended_at") or ""),
+            avg_ttft_ms=None if batch else _opt_float(totals.get("avg_ttft_ms")),
+            tokens_per_sec=None if batch else _opt_float(totals.get("tokens_per_sec")),
+            latency_sketch=None if batch else run_sketch(data).to_dict(),
+            phases_ms=_phase_dict(data.get("phases_ms")),
+            case_phases_ms=case_phase_means(totals),
+            mode="batch" if batch else None,
+            git_sha=data.get("git_sha") if isinstance(data.get("git_sha"), str) else None,
+            roles=role_means(totals),
         )
+        rows.append((bench_id, provider, model, vkey, m))
+    return rows
+
+
+def is_unmerged_shard(data: Dict[str, Any]) -> bool:
+    shard = data.get("shard")
+    return isinstance(shard, dict) and not shard.get("merged")
+
+
+def merge_totals(blocks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Totals of one logical run from its shards' totals (sums, re-derived averages;
+    wall clock is the slowest shard since shards run side by side)."""
+    cases = passed = prompt_tokens = prefix_tokens = output_tokens = tool_calls = cache_hits = cache_misses = 0
+    retries = throttled = hedged = hedge_wins = errors = 0
+    sum_latency = sum_ttft = wall = 0.0
+    concurrency = 1
+    sum_phases: Dict[str, float] = {}
+    for b in blocks:
+        t = b.get("totals") or {}
+        n = int(t.get("cases", 0))
+        cases += n
+        passed += int(t.get("passed", 0))
+        prompt_tokens += int(t.get("prompt_tokens", 0))
+        prefix_tokens += int(t.get("prefix_tokens", 0))
+        output_tokens += int(t.get("output_tokens", 0))
+        tool_calls += int(t.get("tool_calls", 0))
+        cache_hits += int(t.get("cache_hits", 0))
+        cache_misses += int(t.get("cache_misses", 0))
+        retries += int(t.get("retries", 0))
+        throttled += int(t.get("throttled", 0))
+        hedged += int(t.get("hedged", 0))
+        hedge_wins += int(t.get("hedge_wins", 0))
+        errors += int(t.get("errors", 0))
+        sum_latency += float(t.get("sum_latency_ms", float(t.get("avg_latency_ms", 0.0)) * n))
+        sum_ttft += float(t.get("sum_ttft_ms", float(t.get("avg_ttft_ms", t.get("avg_latency_ms", 0.0))) * n))
+        wall = max(wall, float(t.get("wall_clock_ms", 0.0)))
+        concurrency = max(concurrency, int(t.get("concurrency", 1)))
+        for k, ms in (_phase_dict(t.get("sum_phases_ms")) or {}).items():
+            sum_phases[k] = sum_phases.get(k, 0.0) + ms
+    out: Dict[str, Any] = {
+        "cases": cases,
+        "passed": passed,
+        "accuracy": round(passed / cases, 4) if cases else 0.0,
+        "avg_latency_ms": round(sum_latency / cases, 2) if cases else 0.0,
+        "avg_ttft_ms": round(sum_ttft / cases, 2) if cases else 0.0,
+        "tokens_per_sec": round(output_tokens / (sum_latency / 1000.0), 2) if sum_latency > 0 else 0.0,
+        "prompt_tokens": prompt_tokens,
+        "prefix_tokens": prefix_tokens,
+        "output_tokens": output_tokens,
+        "sum_latency_ms": round(sum_latency, 2),
+        "sum_ttft_ms": round(sum_ttft, 2),
+        "wall_clock_ms": round(wall, 2),
+        "concurrency": concurrency,
+        "tool_calls": tool_calls,
+        "cache_hits": cache_hits,
+        "cache_misses": cache_misses,
+        "retries": retries,
+        "throttled": throttled,
+        "hedged": hedged,
+        "hedge_wins": hedge_wins,
+        "errors": errors,
+        "sum_phases_ms": {k: round(v, 2) for k, v in sum_phases.items()},
+    }
+    role_latency = _sum_counts(blocks, "sum_role_latency_ms")
+    if role_latency:
+        out["sum_role_latency_ms"] = {k: round(v, 2) for k, v in role_latency.items()}
+        out["role_cases"] = {k: int(v) for k, v in _sum_counts(blocks, "role_cases").items()}
+        out["critical_path_cases"] = {k: int(v) for k, v in _sum_counts(blocks, "critical_path_cases").items()}
+    return out
+
+
+def merge_phases(blocks: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Run-level phases of one logical run: the slowest shard's time per phase."""
+    out: Dict[str, float] = {}
+    for b in blocks:
+        for k, ms in (_phase_dict(b.get("phases_ms")) or {}).items():
+            out[k] = max(out.get(k, 0.0), ms)
+    return out
+
+
+def merge_request_stats(blocks: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Summed adapter retry/hedge counters of one logical run; the policy is the first shard's."""
+    stats = [b["requests"] for b in blocks if isinstance(b.get("requests"), dict)]
+    if not stats:
+        return None
+    out: Dict[str, Any] = {}
+    for st in stats:
+        for k, v in st.items():
+            if isinstance(v, int) and not isinstance(v, bool):
+                out[k] = out.get(k, 0) + v
+    out["policy"] = stats[0].get("policy")
+    return out
 
+
+def merge_shards(paths: List[str], allow_partial: bool = False) -> Dict[str, Any]:
+    """Combine `bench-run --shard` results of one shard group into one results document:
+    a single run block, or a matrix document with one block per provider/model/variant.
+    Raises ValueError on mixed groups, duplicate shards or (unless allow_partial) missing ones."""
+    by_run: Dict[Tuple[str, str, str, str], List[Dict[str, Any]]] = {}
+    groups = set()
+    for p in paths:
+        for data in load_runs(p):
+            shard = data.get("shard")
+            if not isinstance(shard, dict) or shard.get("merged"):
+                raise ValueError(f"{p}: not an unmerged shard result (run bench-run.py with --shard)")
+            groups.add((shard.get("group"), shard.get("count")))
+            variants = data.get("variants")
+            key = (
+                str(data.get("bench_id") or "unknown"),
+                str(data.get("provider") or "unknown"),
+                str(data.get("model") or "unknown"),
+                variant_key(variants if isinstance(variants, list) else None),
+            )
+            by_run.setdefault(key, []).append(data)
+    if not by_run:
+        raise ValueError("no shard results to merge")
+    if len(groups) != 1:
+        raise ValueError(f"shards from different runs: {sorted(map(str, groups))}")
+    group, count = groups.pop()
+
+    runs: List[Dict[str, Any]] = []
+    for key, blocks in by_run.items():
+        indices = [int(b["shard"].get("index", 0)) for b in blocks]
+        dupes = sorted({i for i in indices if indices.count(i) > 1})
+        if dupes:
+            raise ValueError(f"{'|'.join(key)}: shard(s) {dupes} given more than once")
+        missing = sorted(set(range(1, int(count) + 1)) - set(indices))
+        if missing and not allow_partial:
+            raise ValueError(f"{'|'.join(key)}: missing shard(s) {missing} of {count}")
+        blocks.sort(key=lambda b: int(b["shard"].get("index", 0)))
+        first = blocks[0]
+        requests = merge_request_stats(blocks)
+        merged: Dict[str, Any] = {
+            "bench_id": first.get("bench_id"),
+            "provider": first.get("provider"),
+            "model": first.get("model"),
+            "variants": first.get("variants"),
+            "started_at": min(str(b.get("started_at") or "") for b in blocks),
+            "ended_at": max(str(b.get("ended_at") or "") for b in blocks),
+            "totals": merge_totals(blocks),
+            "phases_ms": merge_phases(blocks),
+            **({"prompt_prefix": first["prompt_prefix"]} if first.get("prompt_prefix") else {}),
+            **({"mode": first["mode"]} if first.get("mode") else {}),
+            **({"git_sha": first["git_sha"]} if first.get("git_sha") else {}),
+            **({"topology": first["topology"]} if first.get("topology") else {}),
+            **({"requests": requests} if requests else {}),
+            "shard": {
+                "group": group,
+                "count": count,
+                "merged": sorted(indices),
+                "missing": missing,
+                "strategy": first["shard"].get("strategy"),
+            },
+        }
+        if all(isinstance(b.get("cases"), list) for b in blocks):
+            merged["cases"] = [c for b in blocks for c in b["cases"]]
+        else:
+            sketch = LatencySketch()
+            for b in blocks:
+                sketch.merge(run_sketch(b))
+            merged["latency_sketch"] = sketch.to_dict()
+        runs.append(merged)
+
+    if len(runs) == 1:
+        return runs[0]
+    return {
+        "bench_id": runs[0].get("bench_id"),
+        "matrix": True,
+        "started_at": min(r["started_at"] for r in runs),
+        "ended_at": max(r["ended_at"] for r in runs),
+        "runs": runs,
+    }
+
+
+def latest_metrics(rows: Iterable[MetricRow]) -> Dict[str, Any]:
+    """Keep the most recent metric per (bench_id, provider, model, variant) and
+    return the lockfile `metrics` dict. Latency percentiles merge every run of a key."""
+    # metrics[bench_id][provider][model][variant] = Metric (latest)
+    metrics: Dict[str, Dict[str, Dict[str, Dict[str, Metric]]]] = {}
+    sketches: Dict[Tuple[str, str, str, str], LatencySketch] = {}
+
+    for bench_id, provider, model, vkey, m in rows:
+        if m.latency_sketch:
+            run_sk = LatencySketch.from_dict(m.latency_sketch)
+            key = (bench_id, provider, model, vkey)
+            if key in sketches:
+                sketches[key].merge(run_sk)
+            else:
+                sketches[key] = run_sk
         metrics.setdefault(bench_id, {}).setdefault(provider, {}).setdefault(model, {})
         cur = metrics[bench_id][provider][model].get(vkey)
         if cur is None or m.ended_at >= cur.ended_at:
@@ -99,33 +477,370 @@ def aggregate_latest(results_paths: List[str]) -> Dict[str, Any]:
             for model, variants in models.items():
                 out[bench_id][provider].setdefault(model, {"variants": {}})
                 for vkey, metric in variants.items():
-                    out[bench_id][provider][model]["variants"][vkey] = {
-                        "accuracy": round(metric.accuracy, 4),
-                        "avg_latency_ms": round(metric.avg_latency_ms, 2),
-                        "tool_calls": metric.tool_calls,
-                    }
+                    entry: Dict[str, Any] = {"accuracy": round(metric.accuracy, 4)}
+                    if metric.mode == "batch":
+                        entry["mode"] = "batch"
+                    else:
+                        entry["avg_latency_ms"] = round(metric.avg_latency_ms, 2)
+                    entry["tool_calls"] = metric.tool_calls
+                    if metric.avg_ttft_ms is not None:
+                        entry["avg_ttft_ms"] = round(metric.avg_ttft_ms, 2)
+                    if metric.tokens_per_sec is not None:
+                        entry["tokens_per_sec"] = round(metric.tokens_per_sec, 2)
+                    if metric.phases_ms or metric.case_phases_ms:
+                        entry["phases_ms"] = {
+                            "run": metric.phases_ms or {},
+                            "per_case": metric.case_phases_ms or {},
+                        }
+                    if metric.roles:
+                        entry["roles"] = metric.roles
+                    sk = sketches.get((bench_id, provider, model, vkey))
+                    if sk is not None and sk.count:
+                        entry["latency_ms"] = sk.summary()
+                    out[bench_id][provider][model]["variants"][vkey] = entry
     return out
 
 
-def main() -> int:
-    paths = sorted(glob(RESULTS_GLOB, recursive=True))
-    if not paths:
-        print("No results found; nothing to aggregate", file=sys.stderr)
+def aggregate_latest(results_paths: List[str]) -> Dict[str, Any]:
+    return latest_metrics(row for p in results_paths for row in extract_metrics(p))
+
+
+RunKey = Tuple[str, str, str, str]
+
+
+def _run_key(data: Dict[str, Any]) -> RunKey:
+    variants = data.get("variants")
+    return (
+        data.get("bench_id") or "unknown",
+        data.get("provider") or "unknown",
+        data.get("model") or "unknown",
+        variant_key(variants if isinstance(variants, list) else None),
+    )
+
+
+def is_lockfile(data: Any) -> bool:
+    return isinstance(data, dict) and isinstance(data.get("metrics"), dict) and "release" in data
+
+
+def lock_samples(lock: Dict[str, Any]) -> Dict[RunKey, RunSample]:
+    """Summary-only baselines from the entries of a recipes.lock.json."""
+    out: Dict[RunKey, RunSample] = {}
+    for bench_id, providers in lock["metrics"].items():
+        for provider, models in (providers or {}).items():
+            for model, entry in (models or {}).items():
+                for vkey, m in ((entry or {}).get("variants") or {}).items():
+                    if not isinstance(m, dict):
+                        continue
+                    batch = m.get("mode") == "batch"
+                    pct = m.get("latency_ms") if isinstance(m.get("latency_ms"), dict) else {}
+                    out[(bench_id, provider, model, vkey)] = RunSample(
+                        summary={
+                            "accuracy": _opt_float(m.get("accuracy")),
+                            "latency_mean": None if batch else _opt_float(m.get("avg_latency_ms")),
+                            "latency_p95": None if batch else _opt_float(pct.get("p95")),
+                        },
+                        mode="batch" if batch else None,
+                    )
+    return out
+
+
+def results_samples(path: str) -> Dict[RunKey, RunSample]:
+    """Per-case samples of every (merged or unsharded) run in a results file, or the
+    summary-only entries of a lockfile."""
+    if not path.lower().endswith(".jsonl"):
+        data = read_json(path)
+        if is_lockfile(data):
+            return lock_samples(data)
+        runs = iter_runs(data)
+    else:
+        runs = load_runs(path, keep_cases=True)
+    out: Dict[RunKey, RunSample] = {}
+    for data in runs:
+        if is_unmerged_shard(data):
+            continue
+        batch = data.get("mode") == "batch"
+        cases: Dict[str, CaseSample] = {}
+        for c in data.get("cases") or []:
+            if not isinstance(c, dict):
+                continue
+            latency = None if batch else _opt_float(c.get("latency_ms"))
+            cases[str(c.get("id"))] = (latency, bool(c.get("passed")))
+        totals = data.get("totals") or {}
+        out[_run_key(data)] = RunSample(
+            cases=cases,
+            summary={
+                "accuracy": _opt_float(totals.get("accuracy")),
+                "latency_mean": None if batch else _opt_float(totals.get("avg_latency_ms")),
+                "latency_p95": None,
+            },
+            mode="batch" if batch else None,
+        )
+    return out
+
+
+def latest_results_file() -> Optional[str]:
+    paths = glob(RESULTS_GLOB, recursive=True) + glob(RESULTS_GLOB_JSONL, recursive=True)
+    return max(paths, key=os.path.getmtime) if paths else None
+
+
+def run_compare(args: argparse.Namespace) -> int:
+    """--compare: gate candidate results on a baseline. Exit 1 on regressions, 2 on unusable input
+    (including no candidate run matching a baseline run)."""
+    latest = None if args.candidate else latest_results_file()
+    candidates = args.candidate or ([latest] if latest else [])
+    if not candidates:
+        print("bench-aggregate: --compare: no candidate results found", file=sys.stderr)
+        return 2
+    try:
+        baseline = results_samples(args.compare)
+        cand: Dict[RunKey, RunSample] = {}
+        for path in candidates:
+            cand.update(results_samples(path))
+    except (OSError, ValueError) as e:
+        print(f"bench-aggregate: --compare: {e}", file=sys.stderr)
+        return 2
+    report = compare_runs(
+        cand, baseline,
+        Thresholds(
+            max_latency_regression=args.max_latency_regression,
+            min_latency_delta_ms=args.min_latency_delta_ms,
+            max_accuracy_drop=args.max_accuracy_drop,
+        ),
+        resamples=args.bootstrap,
+        confidence=args.confidence,
+        seed=args.seed,
+    )
+    report = {"baseline": args.compare, "candidates": candidates, **report}
+    unmatched = ["/".join([r["bench_id"], r["provider"], r["model"], r["variant"]])
+                 for r in report["runs"] if r["status"] == "no_baseline"]
+    if unmatched:
+        print(f"bench-aggregate: --compare: no baseline for {', '.join(unmatched)}", file=sys.stderr)
+    if args.report:
+        parent = os.path.dirname(args.report)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        write_json(args.report, report)
+    for r in report["runs"]:
+        if r["status"] != "regression":
+            continue
+        name = "/".join([r["bench_id"], r["provider"], r["model"], r["variant"]])
+        for m in r["metrics"]:
+            if m["regression"]:
+                print(
+                    f"bench-aggregate: regression: {name} {m['metric']} {m['baseline']} -> {m['candidate']}"
+                    f" (delta {m['delta']}, {int(args.confidence * 100)}% CI {m['delta_ci']})",
+                    file=sys.stderr,
+                )
+    print(json.dumps({
+        "compare": args.compare,
+        "report": args.report,
+        "compared": report["compared"],
+        "regressions": report["regressions"],
+    }, ensure_ascii=False))
+    if report["regressions"]:
+        return 1
+    if not report["compared"]:
+        # Nothing was checked; a gate that cannot fail must not pass silently
+        print("bench-aggregate: --compare: no candidate run matches a baseline run", file=sys.stderr)
+        return 2
+    return 0
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ResultsIndex:
+    """Persistent SQLite index of results files and their extracted metric rows.
+
+    Files are keyed by path and revalidated by (mtime, size); when those change
+    the content hash decides whether the file is re-parsed. Bump INDEX_VERSION
+    whenever extract_metrics changes so stale rows are rebuilt.
+    """
+
+    def __init__(self, path: str = INDEX_PATH) -> None:
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.executescript(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS files ("
+            " path TEXT PRIMARY KEY, mtime REAL NOT NULL, size INTEGER NOT NULL, sha TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS metrics ("
+            " path TEXT NOT NULL, bench_id TEXT NOT NULL, provider TEXT NOT NULL,"
+            " model TEXT NOT NULL, variant TEXT NOT NULL, metric TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS metrics_path ON metrics(path);"
+        )
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is None or row[0] != str(INDEX_VERSION):
+            self.clear()
+
+    def clear(self) -> None:
+        with self.db:
+            self.db.execute("DELETE FROM files")
+            self.db.execute("DELETE FROM metrics")
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (str(INDEX_VERSION),))
+
+    def refresh(self, paths: List[str], workers: Optional[int] = None) -> Dict[str, int]:
+        """Bring the index in line with `paths`; only new or changed files are parsed.
+        Returns counts of parsed, unchanged and removed files."""
+        known = {p: (mtime, size, sha) for p, mtime, size, sha in self.db.execute("SELECT path, mtime, size, sha FROM files")}
+        stale: List[Tuple[str, float, int, str]] = []
+        touched: List[Tuple[float, int, str]] = []
+        for p in paths:
+            st = os.stat(p)
+            prev = known.get(p)
+            if prev is not None and prev[0] == st.st_mtime and prev[1] == st.st_size:
+                continue
+            sha = file_sha256(p)
+            if prev is not None and prev[2] == sha:
+                touched.append((st.st_mtime, st.st_size, p))
+            else:
+                stale.append((p, st.st_mtime, st.st_size, sha))
+        current = set(paths)
+        removed = [p for p in known if p not in current]
+
+        parsed = parse_many([p for p, _, _, _ in stale], workers)
+
+        with self.db:
+            self.db.executemany("UPDATE files SET mtime = ?, size = ? WHERE path = ?", touched)
+            for p in removed:
+                self.db.execute("DELETE FROM files WHERE path = ?", (p,))
+                self.db.execute("DELETE FROM metrics WHERE path = ?", (p,))
+            for (p, mtime, size, sha), rows in zip(stale, parsed):
+                self.db.execute("DELETE FROM metrics WHERE path = ?", (p,))
+                self.db.executemany(
+                    "INSERT INTO metrics (path, bench_id, provider, model, variant, metric) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(p, b, pr, mo, v, json.dumps(asdict(m))) for b, pr, mo, v, m in rows],
+                )
+                self.db.execute(
+                    "INSERT OR REPLACE INTO files (path, mtime, size, sha) VALUES (?, ?, ?, ?)",
+                    (p, mtime, size, sha),
+                )
+        return {"parsed": len(stale), "unchanged": len(paths) - len(stale), "removed": len(removed)}
+
+    def rows(self) -> Iterator[MetricRow]:
+        for b, pr, mo, v, metric in self.db.execute(
+            "SELECT bench_id, provider, model, variant, metric FROM metrics ORDER BY path"
+        ):
+            yield b, pr, mo, v, metric_from_dict(json.loads(metric))
+
+    def close(self) -> None:
+        self.db.close()
+
+
+def parse_many(paths: List[str], workers: Optional[int] = None) -> List[List[MetricRow]]:
+    """extract_metrics over paths, fanned out to a process pool when there are enough files."""
+    if workers == 1 or len(paths) < PARALLEL_MIN_FILES:
+        return [extract_metrics(p) for p in paths]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(extract_metrics, paths, chunksize=16))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Aggregate bench results into recipes.lock.json")
+    parser.add_argument("--rebuild", action="store_true", help="Ignore the index and re-parse every results file")
+    parser.add_argument("--index", default=INDEX_PATH, help=f"Results index location (default: {INDEX_PATH})")
+    parser.add_argument("--workers", type=int, default=None, help="Processes used to parse new/changed files")
+    parser.add_argument("--merge", nargs="+", default=None, metavar="FILE",
+                        help="Merge bench-run --shard results (JSON or JSONL) into one run written to --output, then exit")
+    parser.add_argument("--output", default=None, help="Merged results file for --merge")
+    parser.add_argument("--allow-partial", action="store_true", help="With --merge, accept missing shards")
+    parser.add_argument("--compare", default=None, metavar="BASELINE",
+                        help="Compare results against a baseline results file or lockfile and exit 1 on significant regressions")
+    parser.add_argument("--candidate", nargs="+", default=None, metavar="FILE",
+                        help="Results to check with --compare (default: the newest results file)")
+    parser.add_argument("--report", default=None, help="Write the --compare diff report (JSON) here")
+    parser.add_argument("--max-latency-regression", type=float, default=0.10,
+                        help="Relative latency increase tolerated by --compare (default: 0.10)")
+    parser.add_argument("--min-latency-delta-ms", type=float, default=5.0,
+                        help="Latency increases below this many ms never fail --compare (default: 5)")
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.02,
+                        help="Absolute accuracy drop tolerated by --compare (default: 0.02)")
+    parser.add_argument("--confidence", type=float, default=0.95, help="Bootstrap confidence level (default: 0.95)")
+    parser.add_argument("--bootstrap", type=int, default=2000, help="Bootstrap resamples (default: 2000)")
+    parser.add_argument("--seed", type=int, default=0, help="Bootstrap random seed (default: 0)")
+    parser.add_argument("--history", default=HISTORY_PATH, help=f"Bench history store (default: {HISTORY_PATH})")
+    parser.add_argument("--export-only", action="store_true",
+                        help="Rewrite the lockfile from the history store without scanning results files")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        if not 0 < args.confidence < 1 or args.bootstrap < 1:
+            parser.error("--confidence must be in (0, 1) and --bootstrap positive")
+        return run_compare(args)
+
+    if args.merge:
+        if not args.output:
+            parser.error("--merge requires --output")
+        try:
+            merged = merge_shards(args.merge, allow_partial=args.allow_partial)
+        except (OSError, ValueError) as e:
+            print(f"bench-aggregate: merge failed: {e}", file=sys.stderr)
+            return 1
+        parent = os.path.dirname(args.output)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        write_json(args.output, merged)
+        runs = iter_runs(merged)
+        print(json.dumps({
+            "output": args.output,
+            "runs": [{
+                "provider": r.get("provider"),
+                "model": r.get("model"),
+                "variants": r.get("variants"),
+                "accuracy": r["totals"]["accuracy"],
+                "cases": r["totals"]["cases"],
+                "shards": r["shard"]["merged"],
+            } for r in runs],
+        }, ensure_ascii=False))
         return 0
 
-    agg = aggregate_latest(paths)
+    head = try_git_sha()
+    try:
+        history = HistoryStore(args.history)
+    except (sqlite3.Error, ValueError) as e:
+        print(f"bench-aggregate: cannot open history store: {e}", file=sys.stderr)
+        return 1
+    try:
+        stats: Dict[str, int] = {}
+        if not args.export_only:
+            paths = sorted(glob(RESULTS_GLOB, recursive=True) + glob(RESULTS_GLOB_JSONL, recursive=True))
+            if not paths:
+                print("No results found; nothing to aggregate", file=sys.stderr)
+                return 0
+            index = ResultsIndex(args.index)
+            try:
+                if args.rebuild:
+                    index.clear()
+                stats = index.refresh(paths, workers=args.workers)
+                stats["recorded"] = history.append(
+                    (b, pr, mo, v, m.git_sha or head, asdict(m)) for b, pr, mo, v, m in index.rows()
+                )
+            finally:
+                index.close()
+        agg = latest_metrics(
+            (b, pr, mo, v, metric_from_dict(metric)) for b, pr, mo, v, metric in history.rows()
+        )
+    finally:
+        history.close()
 
     lock = {
         "version": "0.1.0",
         "release": {
-            "sha": try_git_sha(),
+            "sha": head,
             "date": datetime.now(timezone.utc).date().isoformat(),
         },
         "metrics": agg,
     }
 
     write_json(LOCK_PATH, lock)
-    print(json.dumps({"lockfile": LOCK_PATH, "bench_count": len(agg)}, ensure_ascii=False))
+    print(json.dumps({"lockfile": LOCK_PATH, "history": args.history, "bench_count": len(agg), **stats}, ensure_ascii=False))
     return 0
 
 
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+bench-history: Query the bench history store (bench/history.sqlite) that
+bench-aggregate.py appends every run to. Stdlib only.
+
+Usage (examples):
+  # p95 latency of ai-engineer on gemini over the last 50 commits
+  python scripts/bench-history.py series ai-engineer --provider gemini --metric p95_ms --commits 50
+
+  # Accuracy of the 20 latest runs, as JSON
+  python scripts/bench-history.py series ai-engineer --metric accuracy --last 20 --format json
+
+  # Commits with recorded runs, and every run at one commit
+  python scripts/bench-history.py commits --limit 10
+  python scripts/bench-history.py show 1a2b3c4
+"""
+from __future__ import annotations
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from history_store import HISTORY_PATH, SERIES_METRICS, HistoryStore
+
+
+def _iso(ts: Optional[float]) -> str:
+    if not ts:
+        return ""
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat(timespec="seconds")
+
+
+def _cell(v: Any) -> str:
+    if v is None:
+        return "-"
+    if isinstance(v, float):
+        return f"{v:.4g}" if abs(v) < 1 else f"{v:.2f}"
+    return str(v)
+
+
+def print_rows(rows: List[Dict[str, Any]], fmt: str) -> None:
+    """Rows as an aligned table, JSON Lines or CSV on stdout."""
+    if fmt == "json":
+        for r in rows:
+            print(json.dumps(r, ensure_ascii=False))
+        return
+    if not rows:
+        return
+    columns = list(rows[0])
+    if fmt == "csv":
+        writer = csv.DictWriter(sys.stdout, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+        return
+    cells = [[_cell(r[c]) for c in columns] for r in rows]
+    widths = [max(len(c), *(len(row[i]) for row in cells)) for i, c in enumerate(columns)]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)).rstrip())
+    for row in cells:
+        print("  ".join(v.ljust(w) for v, w in zip(row, widths)).rstrip())
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Query the bench history store")
+    parser.add_argument("--history", default=HISTORY_PATH, help=f"History store (default: {HISTORY_PATH})")
+    parser.add_argument("--format", default="table", choices=["table", "json", "csv"], help="Output format (default: table)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_series = sub.add_parser("series", help="One metric of a bench over time, oldest first")
+    p_series.add_argument("bench_id")
+    p_series.add_argument("--metric", default="p95_ms", choices=list(SERIES_METRICS), help="Metric column (default: p95_ms)")
+    p_series.add_argument("--provider", default=None)
+    p_series.add_argument("--model", default=None)
+    p_series.add_argument("--variant", default=None, help="Variant key, e.g. default or v1+v2")
+    window = p_series.add_mutually_exclusive_group()
+    window.add_argument("--commits", type=int, default=None, help="Only runs of the N most recent commits")
+    window.add_argument("--last", type=int, default=None, help="Only the N most recent runs")
+
+    p_commits = sub.add_parser("commits", help="Commits with recorded runs, most recent first")
+    p_commits.add_argument("--limit", type=int, default=None)
+
+    p_show = sub.add_parser("show", help="Every run recorded at a commit")
+    p_show.add_argument("sha", help="Commit SHA or a prefix of it")
+
+    args = parser.parse_args(argv)
+    if not os.path.isfile(args.history):
+        print(f"bench-history: no history store at {args.history}; run bench-aggregate.py first", file=sys.stderr)
+        return 1
+    try:
+        store = HistoryStore(args.history)
+    except (sqlite3.Error, ValueError) as e:
+        print(f"bench-history: cannot open {args.history}: {e}", file=sys.stderr)
+        return 1
+    try:
+        if args.command == "series":
+            rows = store.series(
+                args.bench_id, args.metric, args.provider, args.model, args.variant,
+                commits=args.commits, last=args.last,
+            )
+            for r in rows:
+                r["ended_at"] = _iso(r["ended_at"])
+        elif args.command == "commits":
+            rows = store.commits(args.limit)
+            for r in rows:
+                r["first_ended_at"] = _iso(r["first_ended_at"])
+                r["last_ended_at"] = _iso(r["last_ended_at"])
+        else:
+            rows = store.runs_at(args.sha)
+            for r in rows:
+                r["ended_at"] = _iso(r["ended_at"])
+    finally:
+        store.close()
+
+    if args.format == "table":
+        for r in rows:
+            if isinstance(r.get("git_sha"), str):
+                r["git_sha"] = r["git_sha"][:12]
+    print_rows(rows, args.format)
+    if not rows:
+        print("bench-history: no matching runs", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,7 +1,12 @@
 #!/usr/bin/env python3
 """
 bench-run: Evaluate a recipe over micro-bench cases and write metrics.
-Standard library only. Dry-run friendly (no provider calls yet).
+Standard library only. Each provider adapter echoes the prompt back (dry run)
+unless <PROVIDER>_BASE_URL is set; then it makes real provider calls
+over pooled keep-alive connections, streaming, retried and rate-limited.
+Runs are online by default; --batch instead writes provider batch-job files (and
+submits them with --batch-dir), and --ingest scores their results later. --matrix sweeps a recipe's providers/models/variants,
+and topology: multi recipes run their roles as a dependency DAG.
 
 Usage (examples):
   # POML recipe (canonical)
@@ -10,26 +15,85 @@ Usage (examples):
   # Legacy Markdown recipe (with YAML frontmatter)
   python scripts/bench-run.py --task sample-task --cases all --recipe engineering/ai-engineer.md --provider openai --model gpt-5
 
+  # Sweep all providers/models/variants declared by the recipe in one process
+  python scripts/bench-run.py --task sample-task --cases all --recipe poml/engineering/ai-engineer.poml --matrix
+
+  # Reuse cached responses for unchanged recipe/case/provider combinations
+  python scripts/bench-run.py --task sample-task --cases all --recipe poml/engineering/ai-engineer.poml --cache readwrite
+
+  # Evaluate up to 8 cases in parallel
+  python scripts/bench-run.py --task sample-task --cases all --recipe poml/engineering/ai-engineer.poml --concurrency 8
+
+  # Multi-role recipe (topology: multi): run its roles as a dependency DAG, independent roles concurrently
+  python scripts/bench-run.py --task sample-task --cases all --recipe bench/sample-task/recipes/multi-role.md
+
+  # Bound each provider request to 30s and hedge requests slower than the observed p95
+  python scripts/bench-run.py --task sample-task --cases all --provider openai --model gpt-5 --deadline 30 --hedge
+
+  # Stream one JSON line per case; resume it after a crash
+  python scripts/bench-run.py --task sample-task --cases all --recipe poml/engineering/ai-engineer.poml --format jsonl --output bench/sample-task/results/run.jsonl
+  python scripts/bench-run.py --task sample-task --cases all --recipe poml/engineering/ai-engineer.poml --resume bench/sample-task/results/run.jsonl
+
+  # Write batch-job files now, score the results once the batch completes
+  python scripts/bench-run.py --task sample-task --cases all --provider openai --model gpt-5 --batch
+  python scripts/bench-run.py --ingest bench/sample-task/batches/<timestamp>/manifest.json
+
+  # Keep recipes, cases, schema and connection pools warm across invocations
+  python scripts/bench-run.py serve --socket .cache/bench/bench-run.sock &
+  BENCH_RUN_SOCKET=.cache/bench/bench-run.sock python scripts/bench-run.py --task sample-task --recipe poml/engineering/ai-engineer.poml
+
 Outputs:
-  bench/<task>/results/<timestamp>.json
+  bench/<task>/results/<timestamp>.json (or .jsonl with --format jsonl)
 """
 
 from __future__ import annotations
 import argparse
+import asyncio
+import hashlib
+import io
 import json
 import os
+import re
+import signal
+import socket
+import socketserver
+import subprocess
 import sys
+import threading
 import time
+import traceback
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stderr, redirect_stdout
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
-import re
 from glob import glob
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from adapters import get_adapter
+from adapters.base import split_chunks
+from adapters.batch_dir import BatchDirectory
+from adapters.cache import DEFAULT_PATH as CACHE_PATH, DRY_RUN as CACHE_DRY_RUN, MODES as CACHE_MODES, ResponseCache, cache_key, hash_file
+from adapters.ratelimit import get_limiter
+from adapters.resilience import REQUEST_ERRORS, RequestPolicy
+from adapters.transport import close_pools
+from case_store import CaseStore, matches, pack_path as case_pack_path, parse_selector
+from profiling import PROFILE_MODES, PhaseTimer, Profiler
+from prompt_assembly import Prompt, assemble, describe as describe_prefix, get_prefix
+from recipe_loader import load_recipe
+from recipe_schema import SCHEMA_PATH, SchemaError, get_validator
+from scoring import PARALLEL_MIN_BATCH as SCORE_BATCH, ScoringEngine
+from topology import RoleFailed, TopologyExecutor, parse_roles, role_summary
 
-# Optional YAML parsing if PyYAML is available; otherwise fall back
-try:
-    import yaml  # type: ignore
-except Exception:  # pragma: no cover
-    yaml = None  # type: ignore
+
+# Client/daemon mode: bench-run.py forwards to `bench-run.py serve` when this is set
+SOCKET_ENV = "BENCH_RUN_SOCKET"
+DEFAULT_SOCKET = os.path.join(".cache", "bench", "bench-run.sock")
+# Caller environment forwarded to the daemon, so adapters see the caller's endpoints and keys
+FORWARD_ENV_SUFFIXES = ("_BASE_URL", "_API_KEY")
+# Offline batch jobs (--batch / --ingest) live under bench/<task>/batches/<timestamp>/
+BATCH_MANIFEST = "manifest.json"
+BATCH_MANIFEST_VERSION = 1
 
 
 def read_json(path: str) -> Any:
@@ -37,6 +101,18 @@ def read_json(path: str) -> Any:
         return json.load(f)
 
 
+_JSON_MEMO: Dict[Tuple[str, int, int], Any] = {}
+
+
+def read_json_cached(path: str) -> Any:
+    """read_json memoized by (path, mtime, size); callers must not mutate the result."""
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    if key not in _JSON_MEMO:
+        _JSON_MEMO[key] = read_json(path)
+    return _JSON_MEMO[key]
+
+
 def write_json(path: str, data: Any) -> None:
     os.makedirs(os.path.dirname(path), exist_ok=True)
     with open(path, "w", encoding="utf-8") as f:
@@ -50,80 +126,20 @@ def parse_yaml_frontmatter(md_path: Optional[str]) -> Dict[str, Any]:
     if md_path is None or not os.path.isfile(md_path):
         return {}
     try:
-        with open(md_path, "r", encoding="utf-8") as f:
-            content = f.read()
-        # Normalize Windows CRLF to LF
-        content = content.replace("\r\n", "\n")
-        lines = content.split("\n")
-        if not lines or lines[0].strip() != "---":
-            return {}
-        # find closing '---'
-        end_idx = None
-        for i in range(1, len(lines)):
-            if lines[i].strip() == "---":
-                end_idx = i
-                break
-        if end_idx is None:
-            return {}
-        header_text = "\n".join(lines[1:end_idx])
-        if yaml is None:
-            return {}
-        data = yaml.safe_load(header_text)
-        return data if isinstance(data, dict) else {}
+        return load_recipe(md_path).header
     except Exception:
         return {}
 
 
 def parse_poml_lets(poml_path: Optional[str]) -> Dict[str, Any]:
     """Parse minimal <let name="…">…</let> blocks from a .poml file.
-    Returns a header-like dict with keys: topology, bench_id, tools, roles.
-    Providers dict is converted into roles[] with {name, provider, model}.
-    Tools are parsed from JSON array in <let name="tools">.</n+    """
+    Returns a header-like dict with keys: topology, bench_id, tool_mode, tools,
+    roles, prompt_variants (see recipe_loader.poml_header).
+    """
     if poml_path is None or not os.path.isfile(poml_path):
         return {}
     try:
-        with open(poml_path, "r", encoding="utf-8") as f:
-            content = f.read()
-        # Normalize newlines
-        content = content.replace("\r\n", "\n")
-        lets: Dict[str, Any] = {}
-        # Use proper escapes in raw string: \s and \S should not be double-escaped
-        for m in re.finditer(r"<let\s+name=\"([^\"]+)\">([\s\S]*?)</let>", content, flags=re.MULTILINE):
-            key = m.group(1).strip()
-            raw = m.group(2).strip()
-            # Try JSON parse for arrays/objects; fallback to raw text
-            val: Any
-            try:
-                val = json.loads(raw)
-            except Exception:
-                val = raw
-            lets[key] = val
-
-        header: Dict[str, Any] = {}
-        if isinstance(lets.get("topology"), str):
-            header["topology"] = lets["topology"]
-        if isinstance(lets.get("bench_id"), str):
-            header["bench_id"] = lets["bench_id"]
-        # tools can be list or comma string
-        tools = lets.get("tools")
-        if isinstance(tools, list):
-            header["tools"] = tools
-        elif isinstance(tools, str) and tools:
-            header["tools"] = [t.strip() for t in tools.split(",") if t.strip()]
-        # providers -> roles
-        providers = lets.get("providers")
-        roles: List[Dict[str, Any]] = []
-        if isinstance(providers, dict):
-            for prov, cfg in providers.items():
-                model = cfg.get("model") if isinstance(cfg, dict) else None
-                roles.append({
-                    "name": prov,
-                    "provider": prov,
-                    "model": model,
-                })
-        if roles:
-            header["roles"] = roles
-        return header
+        return load_recipe(poml_path).header
     except Exception:
         return {}
 
@@ -189,33 +205,35 @@ def validate_header_min(header: Dict[str, Any]) -> Dict[str, Any]:
         provider = r.get("provider")
         if provider not in {"openai", "gemini", "qwen"}:
             errors.append(f"header.roles[{idx}].provider: must be one of ['openai','gemini','qwen']")
+        deps = r.get("depends_on")
+        if deps is not None and not (isinstance(deps, list) and all(isinstance(d, str) for d in deps)):
+            errors.append(f"header.roles[{idx}].depends_on: must be an array of role names")
 
     return {"ok": len(errors) == 0, "errors": errors}
 
 
 def try_validate_with_schema(header: Dict[str, Any]) -> Optional[str]:
-    """Best-effort schema validation if jsonschema + yaml are available.
+    """Validate against schema/recipe.schema.yaml with the cached compiled validator.
     Returns a note string if validation could not run or found issues; otherwise None.
     """
     try:
-        import jsonschema  # type: ignore
-    except Exception:
-        return "schema: jsonschema not installed, skipping strict validation"
-
-    if yaml is None:
-        return "schema: PyYAML not installed, skipping strict validation"
+        errors = get_validator(SCHEMA_PATH)(header)
+    except SchemaError as e:
+        return f"schema: {e}, skipping strict validation"
+    if errors:
+        return "schema: validation errors:\n" + "\n".join(f"- {e}" for e in errors)
+    return None
 
-    schema_path = os.path.join("schema", "recipe.schema.yaml")
-    if not os.path.isfile(schema_path):
-        return f"schema: not found at {schema_path}, skipping"
 
+def git_head() -> Optional[str]:
+    """Commit the working tree is at, recorded with results so history is keyed by it; None outside git."""
     try:
-        with open(schema_path, "r", encoding="utf-8") as f:
-            schema_obj = yaml.safe_load(f)
-        jsonschema.validate(instance=header, schema=schema_obj)
+        out = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, encoding="utf-8", timeout=5, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
         return None
-    except Exception as e:
-        return f"schema: validation error: {e}"
+    return out or None
 
 
 def simulate_model_response(user_input: str) -> str:
@@ -223,122 +241,1102 @@ def simulate_model_response(user_input: str) -> str:
     return user_input
 
 
-def eval_case(case: Dict[str, Any]) -> Dict[str, Any]:
-    start = time.perf_counter()
-    input_text = _to_text(case.get("input", ""))
-    response = simulate_model_response(input_text)
-    latency_ms = (time.perf_counter() - start) * 1000.0
+def stream_response(
+    adapter: Any, prompt: Prompt, request: Optional[Dict[str, Any]] = None
+) -> Tuple[str, Optional[float], int]:
+    """Consume adapter.astream() for an assembled prompt; the adapter records
+    retries and hedging in `request`.
+    Returns (text, perf_counter() at the first chunk or None, chunk count)."""
+    async def consume() -> Tuple[str, Optional[float], int]:
+        parts: List[str] = []
+        first: Optional[float] = None
+        async for chunk in adapter.astream(prompt.user, prompt.prefix, request):
+            if first is None:
+                first = time.perf_counter()
+            parts.append(chunk)
+        return "".join(parts), first, len(parts)
+
+    return asyncio.run(consume())
+
+
+def generate(
+    prompt: Prompt,
+    target: Optional[Dict[str, Any]] = None,
+    cache: Optional[ResponseCache] = None,
+    phases: Optional[PhaseTimer] = None,
+    request: Optional[Dict[str, Any]] = None,
+) -> Tuple[str, Optional[bool], Optional[float], int]:
+    """Produce a response for an assembled prompt by streaming from the target's
+    adapter (or the dry-run simulator, which echoes the case text), going through
+    the response cache when enabled. Cache entries are keyed by the endpoint
+    too, so dry-run echoes are never served as a real provider's responses.
+
+    Returns (response, cache_hit, first_chunk_at, chunks): cache_hit is None if
+    no cache is in use; first_chunk_at is a perf_counter() timestamp. Cached
+    and simulated responses arrive whole, so their first chunk is the full text.
+    Time spent in the provider call and in the cache goes to `phases`; the
+    provider call's retry/hedge counts go to `request`.
+    """
+    target = target or {}
+    adapter = target.get("adapter")
+    phases = phases or PhaseTimer()
 
-    expected = case.get("expected", {})
-    contains = expected.get("contains", [])
-    passed_contains = all((token.lower() in response.lower()) for token in contains)
+    def call() -> Tuple[str, Optional[float], int]:
+        with phases.phase("provider"):
+            if adapter is not None:
+                return stream_response(adapter, prompt, request)
+            text = simulate_model_response(prompt.user)
+            return text, time.perf_counter(), len(split_chunks(text))
 
-    passed = passed_contains
+    if cache is None or not cache.enabled:
+        text, first, chunks = call()
+        return text, None, first, chunks
+    variants = target.get("variants")
+    key = cache_key(
+        target.get("recipe_sha", ""),
+        target.get("provider"),
+        target.get("model"),
+        adapter.base_url if adapter is not None and adapter.base_url else CACHE_DRY_RUN,
+        "+".join(variants) if variants else None,
+        target.get("temperature"),
+        prompt.user,
+        prompt.prefix.key if prompt.prefix is not None else None,
+    )
+    with phases.phase("cache"):
+        cached = cache.get(key)
+    if cached is not None:
+        return cached, True, time.perf_counter(), len(split_chunks(cached))
+    text, first, chunks = call()
+    with phases.phase("cache"):
+        cache.put(key, text)
+    return text, False, first, chunks
 
-    return {
+
+def generate_case(
+    case: Dict[str, Any],
+    target: Optional[Dict[str, Any]] = None,
+    cache: Optional[ResponseCache] = None,
+) -> Tuple[Dict[str, Any], str]:
+    """Generate and time one case. Returns (result without scoring, full response).
+    Targets ingested from a batch job carry their responses; those cases take
+    no time here and record latency 0. A provider request that still fails
+    after the adapter's retries (or misses its deadline) is recorded as the
+    case's `error` with an empty response, instead of aborting the run.
+    Multi-role targets run the case through their TopologyExecutor (uncached)
+    and add per-role timings and the critical path to the result."""
+    phases = PhaseTimer()
+    start = time.perf_counter()
+    with phases.phase("prompt"):
+        prompt = assemble((target or {}).get("prefix"), _to_text(case.get("input", "")))
+    batch_error: Optional[str] = None
+    error: Optional[str] = None
+    adapter = (target or {}).get("adapter")
+    request: Optional[Dict[str, Any]] = {} if adapter is not None and adapter.base_url else None
+    topology: Optional[TopologyExecutor] = (target or {}).get("topology")
+    outcome = None
+    responses = (target or {}).get("responses")
+    if responses is not None:
+        case_id = str(case.get("id"))
+        response = responses.get(case_id, "")
+        batch_error = target["batch_errors"].get(case_id) or (None if case_id in responses else "no result in batch output")
+        cache_hit, chunks = None, len(split_chunks(response))
+        latency_ms = ttft_ms = tokens_per_sec = 0.0
+    else:
+        try:
+            if topology is not None:
+                with phases.phase("provider"):
+                    outcome = topology.run(prompt.user)
+                response, cache_hit, first_chunk_at, chunks = (
+                    outcome.output, None, outcome.first_chunk_at, outcome.output_tokens,
+                )
+            else:
+                response, cache_hit, first_chunk_at, chunks = generate(prompt, target, cache, phases, request)
+        except (*REQUEST_ERRORS, RoleFailed) as e:
+            error = f"{type(e).__name__}: {e}"
+            response, cache_hit, first_chunk_at, chunks = "", None, None, 0
+        end = time.perf_counter()
+        latency_ms = (end - start) * 1000.0
+        ttft_ms = ((first_chunk_at if first_chunk_at is not None else end) - start) * 1000.0
+        tokens_per_sec = chunks / (latency_ms / 1000.0) if latency_ms > 0 else 0.0
+
+    result = {
         "id": case.get("id"),
-        "passed": bool(passed),
+        "passed": False,
         "latency_ms": latency_ms,
+        "ttft_ms": ttft_ms,
+        "prompt_tokens": prompt.tokens,
+        "prefix_tokens": prompt.prefix_tokens,
+        "output_tokens": chunks,
+        "tokens_per_sec": tokens_per_sec,
         "tool_calls": 0,
-        "checks": {
-            "contains": {
-                "expected": contains,
-                "ok": passed_contains,
-            }
-        },
+        "checks": {},
+        "phases_ms": phases.as_dict(),
         "response_preview": response[:200],
     }
+    if cache_hit is not None:
+        result["cache"] = "hit" if cache_hit else "miss"
+    if request:
+        result["retries"] = request["retries"]
+        result["throttled"] = request["throttled"]
+        result["hedged"] = request["hedged"]
+        if request["hedged"]:
+            result["hedge_won"] = request["hedge_won"]
+    if outcome is not None:
+        # Every role's prompt and output; the prefix is sent once per role
+        result["prompt_tokens"] = outcome.prompt_tokens
+        result["prefix_tokens"] = prompt.prefix_tokens * len(outcome.roles)
+        result["roles"] = outcome.roles_dict()
+        result["critical_path"] = outcome.critical_path
+        result["critical_path_ms"] = round(outcome.critical_path_ms, 3)
+        retries = sum(r.get("retries", 0) for r in result["roles"].values())
+        if retries:
+            result["retries"] = retries
+    if error:
+        result["error"] = error
+    if batch_error:
+        result["batch_error"] = batch_error
+    return result, response
+
+
+def eval_case(
+    case: Dict[str, Any],
+    target: Optional[Dict[str, Any]] = None,
+    cache: Optional[ResponseCache] = None,
+    engine: Optional[ScoringEngine] = None,
+) -> Dict[str, Any]:
+    result, response = generate_case(case, target, cache)
+    engine = engine or ScoringEngine([case], workers=1)
+    result["passed"], result["checks"], score_ms = engine.score_timed(case.get("id"), response)
+    result["phases_ms"]["score"] = round(score_ms, 3)
+    return result
+
+
+def run_cases(
+    cases: List[Dict[str, Any]],
+    concurrency: int = 1,
+    target: Optional[Dict[str, Any]] = None,
+    cache: Optional[ResponseCache] = None,
+    engine: Optional[ScoringEngine] = None,
+    phases: Optional[PhaseTimer] = None,
+    score_batch: int = SCORE_BATCH,
+) -> Iterator[Dict[str, Any]]:
+    """Evaluate cases, optionally on a thread pool of `concurrency` workers.
+    Results are yielded in case order; each case times itself, so latency_ms
+    stays per-case even when calls overlap. Responses are scored after
+    generation in batches of `score_batch` (see scoring.ScoringEngine); pass 1
+    to score and yield every case as soon as it is generated.
+    Wall time spent waiting on generation and on scoring goes to `phases`.
+    """
+    engine = engine or ScoringEngine(cases)
+    phases = phases or PhaseTimer()
+
+    def generated() -> Iterator[Tuple[Dict[str, Any], str]]:
+        if concurrency <= 1 or len(cases) <= 1:
+            for c in cases:
+                yield generate_case(c, target, cache)
+            return
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(cases))) as pool:
+            yield from pool.map(lambda c: generate_case(c, target, cache), cases)
+
+    def scored(batch: List[Tuple[Dict[str, Any], str]]) -> Iterator[Dict[str, Any]]:
+        with phases.phase("score"):
+            verdicts = engine.score_batch([(r["id"], response) for r, response in batch])
+        for (r, _), (passed, checks, score_ms) in zip(batch, verdicts):
+            r["passed"], r["checks"] = passed, checks
+            r["phases_ms"]["score"] = round(score_ms, 3)
+            yield r
+
+    batch: List[Tuple[Dict[str, Any], str]] = []
+    source = generated()
+    while True:
+        with phases.phase("generate"):
+            item = next(source, None)
+        if item is None:
+            break
+        batch.append(item)
+        if len(batch) >= score_batch:
+            yield from scored(batch)
+            batch = []
+    yield from scored(batch)
 
 
 def load_cases(task: str, case_selector: str) -> List[Dict[str, Any]]:
+    """Selected cases from bench/<task>/cases.jsonl (indexed; parses only the selection)
+    or, without a pack, from bench/<task>/cases/*.json."""
+    try:
+        terms = parse_selector(case_selector)
+    except re.error as e:
+        raise SystemExit(f"--cases: invalid regex: {e}")
+
+    pack = case_pack_path(task)
+    if os.path.isfile(pack):
+        try:
+            with CaseStore(pack) as store:
+                result = list(store.iter_cases(case_selector))
+        except ValueError as e:
+            raise SystemExit(str(e))
+        if not result:
+            raise SystemExit("No cases matched the selector")
+        return result
+
     case_dir = os.path.join("bench", task, "cases")
     paths = sorted(glob(os.path.join(case_dir, "*.json")))
     if not paths:
         raise SystemExit(f"No cases found under {case_dir}")
 
-    selected_ids: Optional[List[str]] = None
-    if case_selector and case_selector.lower() != "all":
-        selected_ids = [c.strip() for c in case_selector.split(",") if c.strip()]
-
     result = []
     for p in paths:
-        case = read_json(p)
-        if selected_ids is None or case.get("id") in selected_ids:
+        case = read_json_cached(p)
+        # Cases without an explicit id are identified by their file stem (on a copy: the memo is shared)
+        if isinstance(case, dict) and not case.get("id"):
+            case = dict(case, id=os.path.splitext(os.path.basename(p))[0])
+        if matches(case, terms):
             result.append(case)
     if not result:
         raise SystemExit("No cases matched the selector")
     return result
 
 
-def main(argv: Optional[List[str]] = None) -> int:
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """Parse '--shard i/n' (1-based i) into (i, n)."""
+    try:
+        i, n = (int(x) for x in spec.split("/", 1))
+    except ValueError:
+        raise SystemExit(f"--shard: expected i/n, got {spec!r}")
+    if n < 1 or not 1 <= i <= n:
+        raise SystemExit(f"--shard: need 1 <= i <= n, got {spec!r}")
+    return i, n
+
+
+def _case_hash(case_id: Any) -> int:
+    # Stable across processes and machines, unlike hash()
+    return int(hashlib.sha1(str(case_id).encode("utf-8")).hexdigest()[:16], 16)
+
+
+def load_latency_weights(paths: List[str]) -> Dict[str, float]:
+    """Mean latency_ms per case id from earlier results files (JSON or JSONL)."""
+    sums: Dict[str, List[float]] = {}
+    for path in paths:
+        records: List[Any] = []
+        try:
+            if path.lower().endswith(".jsonl"):
+                with open(path, "r", encoding="utf-8") as f:
+                    records = [json.loads(line) for line in f if line.strip()]
+                records = [r for r in records if isinstance(r, dict) and r.get("type") == "case"]
+            else:
+                data = read_json(path)
+                blocks = data.get("runs") if isinstance(data, dict) and isinstance(data.get("runs"), list) else [data]
+                records = [c for b in blocks if isinstance(b, dict) for c in b.get("cases") or []]
+        except (OSError, ValueError) as e:
+            _warn(f"--shard-weights: skipping {path}: {e}")
+            continue
+        for r in records:
+            if isinstance(r, dict) and isinstance(r.get("latency_ms"), (int, float)):
+                acc = sums.setdefault(str(r.get("id")), [0.0, 0.0])
+                acc[0] += float(r["latency_ms"])
+                acc[1] += 1
+    return {k: total / n for k, (total, n) in sums.items() if n}
+
+
+def shard_cases(
+    cases: List[Dict[str, Any]], index: int, count: int, weights: Optional[Dict[str, float]] = None
+) -> List[Dict[str, Any]]:
+    """Cases of shard `index` (1-based) out of `count`, in their original order.
+
+    Without weights a case goes to shard hash(id) % count. With weights (mean
+    latency per id from earlier runs) cases are placed longest-first onto the
+    least-loaded shard, so shards finish at about the same time; ids without
+    history count as the median known latency. Every shard computes the same
+    assignment from the same case list and weights."""
+    if count == 1:
+        return list(cases)
+    if not weights:
+        return [c for c in cases if _case_hash(c.get("id")) % count == index - 1]
+    known = sorted(weights.values())
+    default = known[len(known) // 2] if known else 1.0
+
+    def weight(c: Dict[str, Any]) -> float:
+        return weights.get(str(c.get("id")), default)
+
+    loads = [0.0] * count
+    assigned: Dict[str, int] = {}
+    for c in sorted(cases, key=lambda c: (-weight(c), _case_hash(c.get("id")))):
+        k = min(range(count), key=lambda j: (loads[j], j))
+        loads[k] += weight(c)
+        assigned[str(c.get("id"))] = k
+    return [c for c in cases if assigned[str(c.get("id"))] == index - 1]
+
+
+def default_shard_group(bench_id: str, recipe_sha: Optional[str], selector: str, count: int) -> str:
+    """Shared id for the shards of one logical run: $BENCH_SHARD_GROUP, the CI run id,
+    or a hash of what the shards must agree on plus today's UTC date."""
+    if os.environ.get("BENCH_SHARD_GROUP"):
+        return os.environ["BENCH_SHARD_GROUP"]
+    if os.environ.get("GITHUB_RUN_ID"):
+        return f"gh-{os.environ['GITHUB_RUN_ID']}-{os.environ.get('GITHUB_RUN_ATTEMPT', '1')}"
+    day = datetime.now(timezone.utc).date().isoformat()
+    basis = "|".join([bench_id, recipe_sha or "", selector, str(count), day])
+    return hashlib.sha1(basis.encode("utf-8")).hexdigest()[:12]
+
+
+@dataclass
+class RunTotals:
+    """Running totals for one results block; lets streamed runs drop per-case results."""
+    cases: int = 0
+    passed: int = 0
+    sum_latency_ms: float = 0.0
+    sum_ttft_ms: float = 0.0
+    prompt_tokens: int = 0
+    prefix_tokens: int = 0
+    output_tokens: int = 0
+    tool_calls: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    retries: int = 0
+    throttled: int = 0
+    hedged: int = 0
+    hedge_wins: int = 0
+    errors: int = 0
+    sum_phases_ms: Dict[str, float] = field(default_factory=dict)
+    # Multi-role runs: per-role latency sums, cases each role ran in, cases each role was on the critical path
+    sum_role_latency_ms: Dict[str, float] = field(default_factory=dict)
+    role_cases: Dict[str, int] = field(default_factory=dict)
+    critical_path_cases: Dict[str, int] = field(default_factory=dict)
+
+    def add(self, r: Dict[str, Any]) -> None:
+        self.cases += 1
+        self.passed += 1 if r.get("passed") else 0
+        self.sum_latency_ms += float(r.get("latency_ms", 0.0))
+        self.sum_ttft_ms += float(r.get("ttft_ms", r.get("latency_ms", 0.0)))
+        self.prompt_tokens += int(r.get("prompt_tokens", 0))
+        self.prefix_tokens += int(r.get("prefix_tokens", 0))
+        self.output_tokens += int(r.get("output_tokens", 0))
+        self.tool_calls += int(r.get("tool_calls", 0))
+        self.cache_hits += 1 if r.get("cache") == "hit" else 0
+        self.cache_misses += 1 if r.get("cache") == "miss" else 0
+        self.retries += int(r.get("retries", 0))
+        self.throttled += int(r.get("throttled", 0))
+        self.hedged += 1 if r.get("hedged") else 0
+        self.hedge_wins += 1 if r.get("hedge_won") else 0
+        self.errors += 1 if r.get("error") else 0
+        phases = r.get("phases_ms")
+        if isinstance(phases, dict):
+            for name, ms in phases.items():
+                if isinstance(ms, (int, float)):
+                    self.sum_phases_ms[name] = self.sum_phases_ms.get(name, 0.0) + float(ms)
+        roles = r.get("roles")
+        if isinstance(roles, dict):
+            for name, rr in roles.items():
+                if isinstance(rr, dict) and isinstance(rr.get("latency_ms"), (int, float)):
+                    self.sum_role_latency_ms[name] = self.sum_role_latency_ms.get(name, 0.0) + float(rr["latency_ms"])
+                    self.role_cases[name] = self.role_cases.get(name, 0) + 1
+            for name in r.get("critical_path") or []:
+                self.critical_path_cases[name] = self.critical_path_cases.get(name, 0) + 1
+
+    def as_dict(self, wall_clock_ms: float, concurrency: int) -> Dict[str, Any]:
+        accuracy = (self.passed / self.cases) if self.cases else 0.0
+        avg_latency_ms = self.sum_latency_ms / self.cases if self.cases else 0.0
+        avg_ttft_ms = self.sum_ttft_ms / self.cases if self.cases else 0.0
+        tokens_per_sec = self.output_tokens / (self.sum_latency_ms / 1000.0) if self.sum_latency_ms > 0 else 0.0
+        out: Dict[str, Any] = {
+            "cases": self.cases,
+            "passed": self.passed,
+            "accuracy": round(accuracy, 4),
+            "avg_latency_ms": round(avg_latency_ms, 2),
+            "avg_ttft_ms": round(avg_ttft_ms, 2),
+            "tokens_per_sec": round(tokens_per_sec, 2),
+            "prompt_tokens": self.prompt_tokens,
+            "prefix_tokens": self.prefix_tokens,
+            "output_tokens": self.output_tokens,
+            "sum_latency_ms": round(self.sum_latency_ms, 2),
+            "sum_ttft_ms": round(self.sum_ttft_ms, 2),
+            "wall_clock_ms": round(wall_clock_ms, 2),
+            "concurrency": max(1, concurrency),
+            "tool_calls": self.tool_calls,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "errors": self.errors,
+            "sum_phases_ms": {k: round(v, 2) for k, v in self.sum_phases_ms.items()},
+        }
+        if self.role_cases:
+            out["sum_role_latency_ms"] = {k: round(v, 2) for k, v in self.sum_role_latency_ms.items()}
+            out["role_cases"] = dict(self.role_cases)
+            out["critical_path_cases"] = dict(self.critical_path_cases)
+        return out
+
+
+def run_summary(
+    cases: List[Dict[str, Any]],
+    bench_id: str,
+    target: Dict[str, Any],
+    concurrency: int = 1,
+    sink: Optional[Callable[[Dict[str, Any]], None]] = None,
+    seed: Optional[RunTotals] = None,
+    cache: Optional[ResponseCache] = None,
+    engine: Optional[ScoringEngine] = None,
+    startup_phases: Optional[Dict[str, float]] = None,
+) -> Dict[str, Any]:
+    """Evaluate `cases` against one provider/model/variant target and return
+    a results block (bench_id, provider, model, variants, totals, cases).
+
+    With a `sink`, each case result is scored and handed to it as soon as it
+    is generated, and the block carries totals only. `seed` carries totals from a resumed run.
+    The block's phases_ms holds the invocation's `startup_phases` followed by
+    this run's generate, score and write time.
+    """
+    started_at = datetime.now(timezone.utc).isoformat()
+    totals = seed if seed is not None else RunTotals()
+    per_case: List[Dict[str, Any]] = []
+    phases = PhaseTimer()
+    phases.update(startup_phases or {})
+
+    wall_start = time.perf_counter()
+    # A sink (JSONL) must see each case as it finishes, so a crash loses none of them
+    score_batch = 1 if sink is not None else SCORE_BATCH
+    for r in run_cases(cases, concurrency, target, cache, engine, phases, score_batch):
+        totals.add(r)
+        if sink is not None:
+            with phases.phase("write"):
+                sink(r)
+        else:
+            per_case.append(r)
+    wall_clock_ms = (time.perf_counter() - wall_start) * 1000.0
+
+    block: Dict[str, Any] = {
+        "bench_id": bench_id,
+        "provider": target.get("provider"),
+        "model": target.get("model"),
+        "variants": target.get("variants"),
+        "started_at": started_at,
+        "ended_at": datetime.now(timezone.utc).isoformat(),
+        "git_sha": target.get("git_sha"),
+        "totals": totals.as_dict(wall_clock_ms, concurrency),
+        "phases_ms": phases.as_dict(),
+    }
+    if target.get("prefix") is not None:
+        block["prompt_prefix"] = describe_prefix(target["prefix"])
+    if target.get("batch"):
+        # Latency fields are meaningless for offline batch responses
+        block["mode"] = "batch"
+        block["batch"] = target["batch"]
+    if target.get("shard"):
+        block["shard"] = target["shard"]
+    topology = target.get("topology")
+    if topology is not None:
+        block["topology"] = topology.describe()
+        block["roles"] = role_summary(block["totals"])
+        for name, adapter in topology.adapters.items():
+            if adapter.base_url and name in block["roles"]:
+                block["roles"][name]["requests"] = adapter.request_stats.as_dict()
+    adapter = target.get("adapter")
+    if adapter is not None and adapter.base_url and adapter.limiter is not None:
+        block["rate_limit"] = adapter.limiter.stats()
+    if adapter is not None and adapter.base_url:
+        block["requests"] = dict(adapter.request_stats.as_dict(), policy=adapter.policy.as_dict())
+    if sink is None:
+        block["cases"] = per_case
+    return block
+
+
+def run_key(target: Dict[str, Any]) -> str:
+    """Stable identifier of a provider/model/variant target within a JSONL results file."""
+    variants = target.get("variants")
+    return "|".join([
+        str(target.get("provider") or "unknown"),
+        str(target.get("model") or "unknown"),
+        "+".join(variants) if variants else "default",
+    ])
+
+
+def trim_partial_line(path: str) -> None:
+    """Cut a file back to its last newline, dropping a line left half-written by a crash."""
+    with open(path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        pos = end
+        while pos > 0:
+            step = min(1 << 16, pos)
+            f.seek(pos - step)
+            nl = f.read(step).rfind(b"\n")
+            if nl >= 0:
+                pos = pos - step + nl + 1
+                break
+            pos -= step
+        if pos != end:
+            f.truncate(pos)
+
+
+class JsonlWriter:
+    """JSON Lines writer; every record is flushed as soon as it is written.
+    Truncates the file unless `append` is set (resumed runs), in which case a
+    trailing partial line is dropped first so new records start on their own line."""
+
+    def __init__(self, path: str, append: bool = False) -> None:
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        if append and os.path.isfile(path):
+            trim_partial_line(path)
+        self._f = open(path, "a" if append else "w", encoding="utf-8")
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self._f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._f.flush()
+
+    def close(self) -> None:
+        self._f.close()
+
+
+def read_resume(path: str) -> Dict[str, Tuple[set, RunTotals]]:
+    """Read a JSONL results file and return {run_key: (done case ids, totals)}.
+    Unreadable or truncated lines (e.g. from a crash mid-write) are ignored;
+    JsonlWriter drops a trailing one before appending to the file."""
+    done: Dict[str, Tuple[set, RunTotals]] = {}
+    if not os.path.isfile(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except Exception:
+                continue
+            if not isinstance(rec, dict) or rec.get("type") != "case":
+                continue
+            ids, totals = done.setdefault(str(rec.get("run")), (set(), RunTotals()))
+            if rec.get("id") in ids:
+                continue
+            ids.add(rec.get("id"))
+            totals.add(rec)
+    return done
+
+
+def run_jsonl(
+    out_path: str,
+    cases: List[Dict[str, Any]],
+    bench_id: str,
+    targets: List[Dict[str, Any]],
+    concurrency: int = 1,
+    resume: bool = False,
+    cache: Optional[ResponseCache] = None,
+    engine: Optional[ScoringEngine] = None,
+    startup_phases: Optional[Dict[str, float]] = None,
+) -> List[Dict[str, Any]]:
+    """Stream results to `out_path` as JSON Lines and return the summary blocks.
+
+    Each target writes a `run` line, one `case` line per completed case and a
+    final `summary` line. With `resume`, cases already recorded for a target
+    are skipped and their totals carried into the new summary.
+    """
+    prior = read_resume(out_path) if resume else {}
+    writer = JsonlWriter(out_path, append=resume)
+    summaries: List[Dict[str, Any]] = []
+    try:
+        for t in targets:
+            key = run_key(t)
+            done_ids, seed = prior.get(key, (set(), RunTotals()))
+            todo = [c for c in cases if c.get("id") not in done_ids]
+            writer.write({
+                "type": "run",
+                "run": key,
+                "bench_id": bench_id,
+                "provider": t.get("provider"),
+                "model": t.get("model"),
+                "variants": t.get("variants"),
+                **({"shard": t["shard"]} if t.get("shard") else {}),
+                "resumed_cases": len(done_ids),
+            })
+            block = run_summary(
+                todo, bench_id, t, concurrency,
+                sink=lambda r, key=key: writer.write({"type": "case", "run": key, **r}),
+                seed=seed,
+                cache=cache,
+                engine=engine,
+                startup_phases=startup_phases,
+            )
+            writer.write({"type": "summary", "run": key, **block})
+            summaries.append(block)
+    finally:
+        writer.close()
+    return summaries
+
+
+def build_matrix(
+    header: Dict[str, Any],
+    cases: List[Dict[str, Any]],
+    provider: Optional[str] = None,
+    model: Optional[str] = None,
+    variants: Optional[List[str]] = None,
+) -> List[Dict[str, Any]]:
+    """Return the provider × model × variant targets for a --matrix sweep.
+
+    Uses the cases' providerVariants when any case declares them; otherwise
+    crosses the recipe roles with its prompt variants. `provider`/`model`
+    narrow the sweep and `variants` overrides the recipe's variant list.
+    """
+    targets: List[Dict[str, Any]] = []
+    seen = set()
+
+    def add(p: Any, m: Any, v: Any) -> None:
+        if not p or (provider and p != provider) or (model and m != model):
+            return
+        key = (p, m, v)
+        if key in seen:
+            return
+        seen.add(key)
+        targets.append({"provider": p, "model": m, "variants": [v] if v else None})
+
+    case_variants = [
+        pv for c in cases for pv in (c.get("providerVariants") or []) if isinstance(pv, dict)
+    ]
+    if case_variants:
+        for pv in case_variants:
+            for v in (variants or [pv.get("variant")]):
+                add(pv.get("provider"), pv.get("model"), v)
+        return targets
+
+    if variants is None:
+        pvs = header.get("prompt_variants") if isinstance(header.get("prompt_variants"), list) else []
+        variants = [pv["id"] for pv in pvs if isinstance(pv, dict) and pv.get("id")]
+    roles = header.get("roles") if isinstance(header.get("roles"), list) else []
+    for r in roles:
+        if isinstance(r, dict):
+            for v in (variants or [None]):
+                add(r.get("provider"), r.get("model"), v)
+    return targets
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", text).strip("_") or "run"
+
+
+def write_batch(
+    task: str,
+    bench_id: str,
+    selector: str,
+    recipe: Optional[str],
+    recipe_sha: Optional[str],
+    cases: List[Dict[str, Any]],
+    targets: List[Dict[str, Any]],
+    shard: Optional[Dict[str, Any]] = None,
+    endpoint: Optional[BatchDirectory] = None,
+    matrix: bool = False,
+) -> str:
+    """Serialize every case prompt of every target into a provider batch-job JSONL
+    file (one file per target, custom_id = case id) plus a manifest that --ingest
+    reads back. With an endpoint, each file is also submitted. Returns the manifest path."""
+    ts = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    out_dir = os.path.join("bench", task, "batches", ts)
+    os.makedirs(out_dir, exist_ok=True)
+    entries: List[Dict[str, Any]] = []
+    for t in targets:
+        key = run_key(t)
+        input_path = os.path.join(out_dir, f"{_slug(key)}.input.jsonl")
+        prompt_tokens = 0
+        with open(input_path, "w", encoding="utf-8", newline="\n") as f:
+            for c in cases:
+                prompt = assemble(t.get("prefix"), _to_text(c.get("input", "")))
+                prompt_tokens += prompt.tokens
+                line = t["adapter"].batch_request(str(c.get("id")), prompt.user, prompt.prefix)
+                f.write(json.dumps(line, ensure_ascii=False) + "\n")
+        entry: Dict[str, Any] = {
+            "run": key,
+            "provider": t.get("provider"),
+            "model": t.get("model"),
+            "variants": t.get("variants"),
+            "input": input_path,
+            # Where --ingest looks for results of jobs not submitted through --batch-dir
+            "output": os.path.join(out_dir, f"{_slug(key)}.output.jsonl"),
+            "requests": len(cases),
+            "prompt_tokens": prompt_tokens,
+        }
+        if endpoint is not None:
+            entry["endpoint"] = endpoint.root
+            entry["batch_id"] = endpoint.submit(input_path, str(t.get("provider")), t.get("model"))
+        entries.append(entry)
+    manifest_path = os.path.join(out_dir, BATCH_MANIFEST)
+    write_json(manifest_path, {
+        "type": "bench-batch",
+        "version": BATCH_MANIFEST_VERSION,
+        "bench_id": bench_id,
+        "task": task,
+        "cases": selector,
+        "case_ids": [c.get("id") for c in cases],
+        "recipe": recipe,
+        "recipe_sha": recipe_sha,
+        "shard": shard,
+        "matrix": matrix,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "targets": entries,
+    })
+    return manifest_path
+
+
+def read_batch_manifest(path: str) -> Dict[str, Any]:
+    try:
+        manifest = read_json(path)
+    except (OSError, ValueError) as e:
+        raise SystemExit(f"--ingest: cannot read {path}: {e}")
+    if not isinstance(manifest, dict) or manifest.get("type") != "bench-batch":
+        raise SystemExit(f"--ingest: {path} is not a bench-run batch manifest")
+    if int(manifest.get("version", 0)) > BATCH_MANIFEST_VERSION:
+        raise SystemExit(f"--ingest: {path} was written by a newer bench-run (version {manifest.get('version')})")
+    return manifest
+
+
+def read_batch_output(entry: Dict[str, Any], adapter: Any) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """({case id: response}, {case id: error}) from a target's batch-job output JSONL."""
+    if entry.get("batch_id"):
+        endpoint = BatchDirectory(entry["endpoint"])
+        path = endpoint.output_path(entry["batch_id"])
+        if path is None:
+            status = endpoint.status(entry["batch_id"]).get("status")
+            raise SystemExit(f"--ingest: batch {entry['batch_id']} ({entry['run']}) is {status}; ingest again once it completes")
+    else:
+        path = entry.get("output") or ""
+        if not os.path.isfile(path):
+            raise SystemExit(f"--ingest: no batch output for {entry['run']} at {path} (save the provider's output file there)")
+    responses: Dict[str, str] = {}
+    errors: Dict[str, str] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for lineno, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                _warn(f"--ingest: {path}:{lineno}: invalid JSON, skipped")
+                continue
+            custom_id, text, error = adapter.parse_batch_result(record)
+            if custom_id is None:
+                _warn(f"--ingest: {path}:{lineno}: result without an id: {error or 'no id'}")
+                continue
+            if error:
+                errors[str(custom_id)] = error
+            responses[str(custom_id)] = text
+    return responses, errors
+
+
+def role_temperature(header: Dict[str, Any], provider: Optional[str], model: Optional[str]) -> Optional[float]:
+    """Temperature the recipe declares for provider/model, if any."""
+    roles = header.get("roles") if isinstance(header.get("roles"), list) else []
+    for r in roles:
+        if isinstance(r, dict) and r.get("provider") == provider and (model is None or r.get("model") == model):
+            t = r.get("temperature")
+            return float(t) if isinstance(t, (int, float)) else None
+    return None
+
+
+def run_cli(argv: List[str], keep_pools: bool = False) -> int:
+    """One bench-run invocation. keep_pools leaves connection pools open for the next one (serve mode)."""
     parser = argparse.ArgumentParser(description="Run micro-bench over a recipe")
-    parser.add_argument("--task", required=True, help="Task name under bench/<task>/cases/")
-    parser.add_argument("--cases", default="all", help="all or comma-separated case IDs")
+    parser.add_argument("--task", default=None, help="Task name under bench/<task>/cases/ (required unless --ingest)")
+    parser.add_argument("--cases", default="all", help="all, or comma-separated case ids, tag:<tag> and re:<regex on id> terms")
     parser.add_argument("--recipe", default=None, help="Path to recipe (.poml canonical, or legacy .md with YAML header)")
     parser.add_argument("--provider", default=None, choices=["openai", "gemini", "qwen"], help="LLM provider")
     parser.add_argument("--model", default=None, help="Model name")
     parser.add_argument("--variants", default=None, help="Comma-separated prompt variant IDs")
-    parser.add_argument("--output", default=None, help="Override output JSON path")
+    parser.add_argument("--output", default=None, help="Override output JSON path (.jsonl implies --format jsonl)")
+    parser.add_argument("--format", default=None, choices=["json", "jsonl"],
+                        help="json: single document written at the end (default); jsonl: one line per case as it completes plus a summary line")
+    parser.add_argument("--resume", default=None, metavar="FILE",
+                        help="Append to an existing JSONL results file, skipping case ids it already contains")
+    parser.add_argument("--pool-size", type=int, default=None,
+                        help="Keep-alive HTTP connections per provider endpoint (default: --concurrency)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Provider request timeout in seconds")
+    parser.add_argument("--rpm", type=float, default=None, help="Requests/min budget per provider+model, shared by all workers")
+    parser.add_argument("--deadline", type=float, default=None,
+                        help="Seconds allowed per provider request, retries and hedges included (default: none)")
+    parser.add_argument("--retries", type=int, default=2,
+                        help="Retries of transient provider failures, with jittered exponential backoff (default: 2)")
+    parser.add_argument("--hedge", action="store_true",
+                        help="Send a duplicate request when the first chunk is later than the observed p95 for the provider/model; the slower copy is cancelled")
+    parser.add_argument("--tpm", type=float, default=None, help="Estimated tokens/min budget per provider+model, shared by all workers")
+    parser.add_argument("--cache", default="off", choices=list(CACHE_MODES),
+                        help="Response cache: off (default), read (serve hits only) or readwrite (serve hits, store misses)")
+    parser.add_argument("--cache-path", default=CACHE_PATH, help=f"SQLite response cache file (default: {CACHE_PATH})")
+    parser.add_argument("--cache-max-mb", type=float, default=256.0, help="Evict least-recently-used entries beyond this size")
+    parser.add_argument("--cache-max-age-days", type=float, default=30.0, help="Drop cache entries older than this")
+    parser.add_argument("--concurrency", type=int, default=1, help="Number of cases evaluated in parallel (default: 1)")
+    parser.add_argument("--profile", default=None, choices=list(PROFILE_MODES),
+                        help="Profile the run: cpu (cProfile) or mem (tracemalloc); reports are written next to the results file")
+    parser.add_argument("--score-workers", type=int, default=None,
+                        help="Processes for batched scoring (default: one per CPU; 1 scores in-process)")
+    parser.add_argument("--shard", default=None, metavar="I/N",
+                        help="Run only shard I of N (1-based), assigned by a stable hash of the case id; "
+                             "merge shard results with bench-aggregate.py --merge")
+    parser.add_argument("--shard-weights", action="append", default=None, metavar="FILE",
+                        help="Earlier results file(s); balance shards by each case's past latency instead of by hash")
+    parser.add_argument("--shard-group", default=None,
+                        help="Id shared by all shards of one run (default: $BENCH_SHARD_GROUP, the CI run id, "
+                             "or a hash of bench id, recipe, selector, N and date)")
+    parser.add_argument("--batch", action="store_true",
+                        help="Do not call providers: write every prompt to a provider batch-job JSONL file per target "
+                             "plus a manifest under bench/<task>/batches/, for --ingest later")
+    parser.add_argument("--batch-dir", default=None, metavar="DIR",
+                        help="With --batch, also submit the jobs to the local directory batch endpoint at DIR "
+                             "(scripts/adapters/batch_dir.py)")
+    parser.add_argument("--ingest", default=None, metavar="MANIFEST",
+                        help="Score the results of a --batch job (task, cases, recipe and targets come from the manifest)")
+    parser.add_argument("--matrix", action="store_true",
+                        help="Sweep every provider/model/variant of the recipe (or the cases' providerVariants) in one run; "
+                             "--provider/--model/--variants narrow the sweep")
+    parser.add_argument("--topology", default=None, choices=["solo", "multi"],
+                        help="multi: run the recipe's roles as a dependency DAG per case (depends_on), independent roles "
+                             "concurrently; solo: a single provider call per case. Default: the recipe's topology, "
+                             "unless --provider or --matrix is given")
 
     args = parser.parse_args(argv)
+    if args.concurrency < 1:
+        parser.error("--concurrency must be >= 1")
+    if args.score_workers is not None and args.score_workers < 1:
+        parser.error("--score-workers must be >= 1")
+    if args.ingest:
+        if args.batch or args.matrix or args.shard or args.provider or args.task:
+            parser.error("--ingest takes the task, targets and shard from the manifest; "
+                         "it cannot be combined with --task, --batch, --matrix, --shard or --provider")
+    elif not args.task:
+        parser.error("--task is required")
+    if args.batch and (args.resume or args.format):
+        parser.error("--batch writes batch-job files, not results; drop --resume/--format")
+    if args.batch_dir and not args.batch:
+        parser.error("--batch-dir requires --batch")
+    if args.topology == "multi" and (args.provider or args.matrix or args.batch or args.ingest):
+        parser.error("--topology multi takes providers from the recipe's roles; "
+                     "it cannot be combined with --provider, --matrix, --batch or --ingest")
 
-    cases = load_cases(args.task, args.cases)
+    profiler = Profiler(args.profile)
+    profiler.start()
+    try:
+        return run_bench(args, parser, profiler, keep_pools)
+    finally:
+        # Reports go next to the results file; a run that failed before choosing one leaves none
+        for path in profiler.stop(profiler.base):
+            _warn(f"bench-run: profile written to {path}")
 
-    header = parse_recipe_header(args.recipe)
-    bench_id = header.get("bench_id") if isinstance(header, dict) else None
-    if not bench_id:
-        bench_id = args.task
 
-    # Minimal header validation (warn-only)
-    v = validate_header_min(header)
-    if not v["ok"]:
-        _warn("bench-run: header validation warnings:")
-        for e in v["errors"]:
-            _warn(f"- {e}")
-
-    # Only attempt YAML schema validation for legacy Markdown recipes
-    if args.recipe and args.recipe.lower().endswith(".md"):
-        note = try_validate_with_schema(header)
-        if note:
-            _warn(note)
-    else:
-        _warn("schema: skipping strict validation for POML input (YAML schema applies to .md only)")
+def run_bench(args: argparse.Namespace, parser: argparse.ArgumentParser, profiler: Profiler, keep_pools: bool) -> int:
+    """Body of run_cli once arguments are parsed."""
+    variants = [v.strip() for v in args.variants.split(",") if v.strip()] if args.variants else None
+    # Per-invocation phases; each run block adds its own generate/score/write
+    startup = PhaseTimer()
 
-    started_at = datetime.now(timezone.utc).isoformat()
+    manifest: Optional[Dict[str, Any]] = None
+    if args.ingest:
+        manifest = read_batch_manifest(args.ingest)
+        args.task, args.cases, args.recipe = manifest["task"], manifest.get("cases") or "all", manifest.get("recipe")
+        args.matrix = bool(manifest.get("matrix"))
 
-    per_case = [eval_case(c) for c in cases]
+    with startup.phase("load_cases"):
+        cases = load_cases(args.task, args.cases)
+        if manifest is not None:
+            # Exactly the cases that were submitted, in submission order
+            by_id = {str(c.get("id")): c for c in cases}
+            ids = [str(i) for i in manifest.get("case_ids") or []]
+            gone = [i for i in ids if i not in by_id]
+            if gone:
+                _warn(f"--ingest: {len(gone)} submitted case(s) no longer exist and are skipped: {', '.join(gone[:5])}")
+            cases = [by_id[i] for i in ids if i in by_id]
 
-    total = len(per_case)
-    passed = sum(1 for r in per_case if r["passed"]) 
-    accuracy = (passed / total) if total else 0.0
-    avg_latency_ms = sum(r["latency_ms"] for r in per_case) / total if total else 0.0
-    total_tool_calls = sum(r.get("tool_calls", 0) for r in per_case)
+    with startup.phase("parse_recipe"):
+        header = parse_recipe_header(args.recipe)
+    bench_id = header.get("bench_id") if isinstance(header, dict) else None
+    if not bench_id:
+        bench_id = args.task
 
-    summary: Dict[str, Any] = {
-        "bench_id": bench_id,
-        "provider": args.provider,
-        "model": args.model,
-        "variants": [v.strip() for v in args.variants.split(",")] if args.variants else None,
-        "started_at": started_at,
-        "ended_at": datetime.now(timezone.utc).isoformat(),
-        "totals": {
-            "cases": total,
-            "passed": passed,
-            "accuracy": round(accuracy, 4),
-            "avg_latency_ms": round(avg_latency_ms, 2),
-            "tool_calls": total_tool_calls,
-        },
-        "cases": per_case,
-    }
+    with startup.phase("validate"):
+        # Minimal header validation (warn-only)
+        v = validate_header_min(header)
+        if not v["ok"]:
+            _warn("bench-run: header validation warnings:")
+            for e in v["errors"]:
+                _warn(f"- {e}")
+
+        # Strict schema validation (warn-only) for POML headers and Markdown frontmatter alike
+        if args.recipe:
+            note = try_validate_with_schema(header)
+            if note:
+                _warn(note)
 
-    if args.output:
+    if args.resume:
+        out_path = args.resume
+    elif args.output:
         out_path = args.output
     else:
         ts = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
         out_dir = os.path.join("bench", args.task, "results")
-        out_path = os.path.join(out_dir, f"results_{ts}.json")
+        ext = "jsonl" if args.format == "jsonl" else "json"
+        suffix = "_shard{}of{}".format(*parse_shard(args.shard)) if args.shard else ""
+        out_path = os.path.join(out_dir, f"results_{ts}{suffix}.{ext}")
+    fmt = args.format or ("jsonl" if out_path.lower().endswith(".jsonl") else "json")
+    if args.resume and fmt != "jsonl":
+        parser.error("--resume requires JSONL results (--format jsonl or a .jsonl file)")
+    profiler.base = os.path.splitext(out_path)[0]
+
+    setup_start = time.perf_counter()
+    if manifest is not None:
+        targets = [
+            {"provider": e.get("provider"), "model": e.get("model"), "variants": e.get("variants"), "batch_entry": e}
+            for e in manifest.get("targets") or [] if isinstance(e, dict)
+        ]
+    elif args.matrix:
+        targets = build_matrix(header, cases, args.provider, args.model, variants)
+        if not targets:
+            raise SystemExit("--matrix: no provider/model/variant combinations found in recipe or cases")
+    elif args.topology == "multi" or (
+        args.topology is None and header.get("topology") == "multi" and not (args.provider or args.batch)
+    ):
+        try:
+            roles = parse_roles(header)
+        except ValueError as e:
+            raise SystemExit(f"{args.recipe}: {e}")
+        if len(roles) < 2:
+            raise SystemExit(f"{args.recipe}: topology multi needs at least two roles")
+        # One logical target; its provider/model name the topology in results and the lockfile
+        targets = [{"provider": "multi", "model": "+".join(r.name for r in roles), "variants": variants, "roles": roles}]
+    else:
+        targets = [{"provider": args.provider, "model": args.model, "variants": variants}]
+    recipe_sha = hash_file(args.recipe)
+    shard_info: Optional[Dict[str, Any]] = None
+    if manifest is not None:
+        shard_info = manifest.get("shard")
+        if manifest.get("recipe_sha") != recipe_sha:
+            _warn(f"--ingest: {args.recipe} changed since the batch was written; scoring against the current recipe")
+    elif args.shard:
+        # Shard after building the matrix so every shard sweeps the same targets
+        index, count = parse_shard(args.shard)
+        weights = load_latency_weights(args.shard_weights) if args.shard_weights else None
+        total_cases = len(cases)
+        cases = shard_cases(cases, index, count, weights)
+        shard_info = {
+            "index": index,
+            "count": count,
+            "group": args.shard_group or default_shard_group(bench_id, recipe_sha, args.cases, count),
+            "strategy": "latency" if weights else "hash",
+            "cases_total": total_cases,
+        }
+    policy = RequestPolicy(deadline_s=args.deadline, max_retries=max(0, args.retries), hedge=args.hedge)
+    head = git_head()
+
+    def make_adapter(provider: str, model: str, temperature: Optional[float], fan_out: int = 1) -> Any:
+        # fan_out: roles of one case that may call this provider/model at the same time
+        return get_adapter(
+            provider, model,
+            temperature=temperature,
+            pool_size=args.pool_size or args.concurrency,
+            timeout=args.timeout,
+            limiter=get_limiter(
+                provider, model,
+                rpm=args.rpm, tpm=args.tpm, max_concurrency=args.concurrency * fan_out,
+            ),
+            policy=policy,
+        )
+
+    for t in targets:
+        t["recipe_sha"] = recipe_sha
+        t["git_sha"] = head
+        t["shard"] = shard_info
+        t["temperature"] = role_temperature(header, t.get("provider"), t.get("model"))
+        # Rendered once per recipe + variant and shared by every case of the target
+        t["prefix"] = get_prefix(args.recipe, (t.get("variants") or [None])[0])
+        if t.get("roles"):
+            roles = t.pop("roles")
+            fan_out = {(r.provider, r.model): sum(1 for o in roles if (o.provider, o.model) == (r.provider, r.model))
+                       for r in roles}
+            adapters = {r.name: make_adapter(r.provider, r.model, r.temperature, fan_out[(r.provider, r.model)]) for r in roles}
+            # Pools are shared per base URL, whatever the provider: size each for every role behind it
+            per_url = Counter(a.base_url.rstrip("/") for a in adapters.values() if a.base_url)
+            for a in adapters.values():
+                if a.base_url:
+                    a.pool_size = (args.pool_size or args.concurrency) * per_url[a.base_url.rstrip("/")]
+            t["topology"] = TopologyExecutor(roles, adapters, t["prefix"])
+        elif t.get("provider"):
+            t["adapter"] = make_adapter(t["provider"], t.get("model") or "", t["temperature"])
+
+    if args.batch:
+        if not all(t.get("adapter") for t in targets):
+            parser.error("--batch needs a provider: pass --provider or --matrix")
+        endpoint = BatchDirectory(args.batch_dir) if args.batch_dir else None
+        manifest_path = write_batch(
+            args.task, bench_id, args.cases, args.recipe, recipe_sha, cases, targets, shard_info, endpoint,
+            matrix=args.matrix,
+        )
+        profiler.base = os.path.splitext(manifest_path)[0]
+        print(json.dumps({
+            "manifest": manifest_path,
+            "requests": len(cases) * len(targets),
+            "batches": [e.get("batch_id") or e["input"] for e in read_json(manifest_path)["targets"]],
+        }, ensure_ascii=False))
+        return 0
+    if manifest is not None:
+        for t in targets:
+            entry = t.pop("batch_entry")
+            if not t.get("adapter"):
+                raise SystemExit(f"--ingest: manifest target {entry.get('run')} has no provider")
+            t["responses"], t["batch_errors"] = read_batch_output(entry, t["adapter"])
+            t["batch"] = {"manifest": args.ingest, "batch_id": entry.get("batch_id"), "errors": len(t["batch_errors"])}
 
-    write_json(out_path, summary)
+    cache = ResponseCache(
+        args.cache_path,
+        mode=args.cache,
+        max_bytes=int(args.cache_max_mb * 1024 * 1024),
+        max_age_days=args.cache_max_age_days,
+    )
+    # Compiled once for the suite and shared by every target of a matrix
+    try:
+        engine = ScoringEngine(cases, workers=args.score_workers)
+    except (ValueError, re.error) as e:
+        raise SystemExit(f"Invalid case expectations: {e}")
+    startup.add("setup", (time.perf_counter() - setup_start) * 1000.0)
+    startup_phases = startup.as_dict()
+    try:
+        if fmt == "jsonl":
+            runs = run_jsonl(
+                out_path, cases, bench_id, targets, args.concurrency,
+                resume=bool(args.resume), cache=cache, engine=engine, startup_phases=startup_phases,
+            )
+        elif args.matrix:
+            started_at = datetime.now(timezone.utc).isoformat()
+            runs = [
+                run_summary(cases, bench_id, t, args.concurrency, cache=cache, engine=engine, startup_phases=startup_phases)
+                for t in targets
+            ]
+            write_json(out_path, {
+                "bench_id": bench_id,
+                "matrix": True,
+                "started_at": started_at,
+                "ended_at": datetime.now(timezone.utc).isoformat(),
+                "runs": runs,
+            })
+        else:
+            runs = [run_summary(
+                cases, bench_id, targets[0], args.concurrency,
+                cache=cache, engine=engine, startup_phases=startup_phases,
+            )]
+            write_json(out_path, runs[0])
+    finally:
+        engine.close()
+        cache.close()
+        if not keep_pools:
+            close_pools()
+
+    if args.matrix:
+        print(json.dumps({
+            "output": out_path,
+            "runs": [{
+                "provider": r["provider"],
+                "model": r["model"],
+                "variants": r["variants"],
+                "accuracy": r["totals"]["accuracy"],
+                "cases": r["totals"]["cases"],
+                "passed": r["totals"]["passed"],
+            } for r in runs],
+        }, ensure_ascii=False))
+        return 0
+
+    summary = runs[0]
 
     # Minimal console summary
     print(json.dumps({
@@ -351,5 +1349,146 @@ def main(argv: Optional[List[str]] = None) -> int:
     return 0
 
 
+def _exit_code(exc: SystemExit) -> int:
+    """Mirror the interpreter: None -> 0, int -> itself, anything else is printed and exits 1."""
+    if exc.code is None:
+        return 0
+    if isinstance(exc.code, int):
+        return exc.code
+    _warn(str(exc.code))
+    return 1
+
+
+def _forwarded_env() -> Dict[str, str]:
+    return {k: v for k, v in os.environ.items() if k.endswith(FORWARD_ENV_SUFFIXES)}
+
+
+# run_request swaps process-wide state, so requests must never overlap
+_REQUEST_LOCK = threading.Lock()
+
+
+def run_request(req: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one forwarded invocation in-process with the caller's cwd and endpoint env.
+    Returns {"exit", "stdout", "stderr"}.
+
+    The cwd, the *_BASE_URL/*_API_KEY variables and stdout/stderr are
+    process-global: they are swapped in for the request and restored after it.
+    Requests therefore run one at a time, under _REQUEST_LOCK, whatever server
+    calls this."""
+    out, err = io.StringIO(), io.StringIO()
+    with _REQUEST_LOCK:
+        saved_cwd = os.getcwd()
+        saved_env = _forwarded_env()
+        try:
+            os.chdir(req.get("cwd") or saved_cwd)
+            for k in saved_env:
+                del os.environ[k]
+            os.environ.update(req.get("env") or {})
+            with redirect_stdout(out), redirect_stderr(err):
+                try:
+                    code = run_cli([str(a) for a in req.get("argv") or []], keep_pools=True)
+                except SystemExit as e:
+                    code = _exit_code(e)
+                except Exception:
+                    traceback.print_exc()
+                    code = 1
+        finally:
+            for k in _forwarded_env():
+                del os.environ[k]
+            os.environ.update(saved_env)
+            os.chdir(saved_cwd)
+    return {"exit": code, "stdout": out.getvalue(), "stderr": err.getvalue()}
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """One JSON line in ({"argv", "cwd", "env"} or {"op": "ping"}), one JSON line out."""
+
+    def handle(self) -> None:
+        try:
+            req = json.loads(self.rfile.readline() or b"{}")
+        except ValueError:
+            return
+        if req.get("op") == "ping":
+            reply: Dict[str, Any] = {"ok": True, "pid": os.getpid()}
+        else:
+            reply = run_request(req)
+        self.wfile.write((json.dumps(reply, ensure_ascii=False) + "\n").encode("utf-8"))
+
+
+def _connect(path: str) -> socket.socket:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def _call(sock: socket.socket, req: Dict[str, Any]) -> Dict[str, Any]:
+    with sock, sock.makefile("rwb") as f:
+        f.write((json.dumps(req, ensure_ascii=False) + "\n").encode("utf-8"))
+        f.flush()
+        line = f.readline()
+    if not line:
+        raise ConnectionError("bench-run server closed the connection without a reply")
+    return json.loads(line)
+
+
+def serve(argv: List[str]) -> int:
+    """Long-lived worker: requests are served one at a time (each run still uses its own
+    --concurrency), sharing memoized recipes, cases, schema, rate limiters and connection pools.
+    The server is a single-threaded UnixStreamServer on purpose: see run_request."""
+    parser = argparse.ArgumentParser(prog="bench-run.py serve",
+                                     description="Serve bench-run requests over a Unix socket")
+    parser.add_argument("--socket", default=os.environ.get(SOCKET_ENV) or DEFAULT_SOCKET,
+                        help=f"Socket path (default: ${SOCKET_ENV} or {DEFAULT_SOCKET})")
+    args = parser.parse_args(argv)
+    if not hasattr(socket, "AF_UNIX"):
+        raise SystemExit("serve: Unix domain sockets are not available on this platform")
+
+    path = os.path.abspath(args.socket)
+    if os.path.exists(path):
+        try:
+            _call(_connect(path), {"op": "ping"})
+        except (OSError, ValueError):
+            os.unlink(path)  # stale socket from a previous server
+        else:
+            raise SystemExit(f"serve: a server is already listening on {path}")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    server = socketserver.UnixStreamServer(path, _RequestHandler)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    _warn(f"bench-run: serving on {path} (export {SOCKET_ENV}={path} to route bench-run.py through it)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        close_pools()
+        if os.path.exists(path):
+            os.unlink(path)
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv[:1] == ["serve"]:
+        return serve(argv[1:])
+    sock_path = os.environ.get(SOCKET_ENV)
+    if sock_path and hasattr(socket, "AF_UNIX") and os.path.exists(sock_path):
+        try:
+            sock = _connect(sock_path)
+        except OSError as e:
+            _warn(f"bench-run: server at {sock_path} unavailable ({e}); running locally")
+        else:
+            reply = _call(sock, {"argv": argv, "cwd": os.getcwd(), "env": _forwarded_env()})
+            sys.stdout.write(reply.get("stdout", ""))
+            sys.stderr.write(reply.get("stderr", ""))
+            return int(reply.get("exit", 1))
+    return run_cli(argv)
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
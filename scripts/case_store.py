@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+case_store: Packed, indexed bench cases. Standard library only.
+
+A task's cases can live in one JSONL pack, bench/<task>/cases.jsonl (one case
+object per line, each with an "id"), instead of one file per case. A SQLite
+index under .cache/bench/cases/ maps id -> (byte offset, length, order, tags).
+It is rebuilt with one linear scan whenever the pack's size or mtime changes.
+After that, lookups by id are O(1) and selecting k cases parses k lines, not
+the whole suite.
+
+Selectors (--cases) are comma-separated terms, unioned:
+  all            every case
+  case-001       a case id
+  tag:smoke      cases whose "tags" list contains smoke
+  re:^auth-      cases whose id matches the regex (re.search)
+
+Usage:
+  python scripts/case_store.py import sample-task      # cases/*.json -> cases.jsonl
+  python scripts/case_store.py ids sample-task --cases tag:smoke
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+from glob import glob
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+PACK_NAME = "cases.jsonl"
+INDEX_DIR = os.path.join(".cache", "bench", "cases")
+# Bump whenever the index layout changes; older index files are rebuilt
+INDEX_VERSION = 1
+
+Term = Tuple[str, str]  # ("id" | "tag" | "re", value)
+
+
+def parse_selector(selector: Optional[str]) -> Optional[List[Term]]:
+    """Selector terms, or None for all cases."""
+    if not selector or selector.strip().lower() == "all":
+        return None
+    terms: List[Term] = []
+    for raw in selector.split(","):
+        term = raw.strip()
+        if not term:
+            continue
+        if term.startswith("tag:"):
+            terms.append(("tag", term[4:]))
+        elif term.startswith("re:"):
+            re.compile(term[3:])  # fail fast on a bad pattern
+            terms.append(("re", term[3:]))
+        else:
+            terms.append(("id", term))
+    return terms
+
+
+def case_tags(case: Dict[str, Any]) -> List[str]:
+    tags = case.get("tags")
+    return [str(t) for t in tags] if isinstance(tags, list) else []
+
+
+def matches(case: Dict[str, Any], terms: Optional[List[Term]]) -> bool:
+    """Whether a parsed case satisfies any selector term (the per-file layout path)."""
+    if terms is None:
+        return True
+    case_id = str(case.get("id"))
+    for kind, value in terms:
+        if kind == "id" and case_id == value:
+            return True
+        if kind == "tag" and value in case_tags(case):
+            return True
+        if kind == "re" and re.search(value, case_id):
+            return True
+    return False
+
+
+def _regexp(pattern: str, value: Optional[str]) -> bool:
+    return value is not None and re.search(pattern, value) is not None
+
+
+class CaseStore:
+    """Read-only view of a JSONL case pack through its id -> offset index."""
+
+    def __init__(self, pack_path: str, index_path: Optional[str] = None) -> None:
+        self.pack_path = pack_path
+        if index_path is None:
+            digest = hashlib.sha1(os.path.abspath(pack_path).encode("utf-8")).hexdigest()[:16]
+            index_path = os.path.join(INDEX_DIR, f"{digest}.sqlite")
+        os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+        self.index_path = index_path
+        self.db = sqlite3.connect(index_path)
+        self.db.create_function("REGEXP", 2, _regexp, deterministic=True)
+        self.db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS cases (
+                id TEXT PRIMARY KEY, ord INTEGER NOT NULL, offset INTEGER NOT NULL, length INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS tags (tag TEXT NOT NULL, id TEXT NOT NULL, PRIMARY KEY (tag, id));
+            """
+        )
+        self._ensure_index()
+
+    def _stamp(self) -> str:
+        st = os.stat(self.pack_path)
+        return f"{INDEX_VERSION}:{st.st_size}:{st.st_mtime_ns}"
+
+    def _ensure_index(self) -> None:
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'stamp'").fetchone()
+        if row is None or row[0] != self._stamp():
+            self.rebuild()
+
+    def rebuild(self) -> None:
+        """Re-index the pack in one pass. A repeated id keeps its last occurrence."""
+        stamp = self._stamp()
+        with self.db:
+            self.db.execute("DELETE FROM cases")
+            self.db.execute("DELETE FROM tags")
+            offset = 0
+            with open(self.pack_path, "rb") as f:
+                for lineno, line in enumerate(f, start=1):
+                    length = len(line)
+                    if line.strip():
+                        try:
+                            case = json.loads(line)
+                        except ValueError as e:
+                            raise ValueError(f"{self.pack_path}:{lineno}: invalid JSON ({e})") from None
+                        if not isinstance(case, dict) or not case.get("id"):
+                            raise ValueError(f"{self.pack_path}:{lineno}: case without an id")
+                        case_id = str(case["id"])
+                        self.db.execute("DELETE FROM tags WHERE id = ?", (case_id,))
+                        self.db.execute(
+                            "INSERT OR REPLACE INTO cases (id, ord, offset, length) VALUES (?, ?, ?, ?)",
+                            (case_id, lineno, offset, length),
+                        )
+                        self.db.executemany(
+                            "INSERT OR IGNORE INTO tags (tag, id) VALUES (?, ?)",
+                            [(t, case_id) for t in case_tags(case)],
+                        )
+                    offset += length
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('stamp', ?)", (stamp,))
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM cases").fetchone()[0]
+
+    def __contains__(self, case_id: object) -> bool:
+        return self.db.execute("SELECT 1 FROM cases WHERE id = ?", (str(case_id),)).fetchone() is not None
+
+    def _locate(self, terms: Optional[List[Term]]) -> List[Tuple[int, str, int, int]]:
+        """(ord, id, offset, length) of selected cases, in pack order."""
+        cols = "c.ord, c.id, c.offset, c.length"
+        if terms is None:
+            return self.db.execute(f"SELECT {cols} FROM cases c ORDER BY c.ord").fetchall()
+        found: Dict[int, Tuple[int, str, int, int]] = {}
+        for kind, value in terms:
+            if kind == "id":
+                rows = self.db.execute(f"SELECT {cols} FROM cases c WHERE c.id = ?", (value,))
+            elif kind == "tag":
+                rows = self.db.execute(
+                    f"SELECT {cols} FROM tags t JOIN cases c ON c.id = t.id WHERE t.tag = ?", (value,)
+                )
+            else:
+                rows = self.db.execute(f"SELECT {cols} FROM cases c WHERE c.id REGEXP ?", (value,))
+            for row in rows:
+                found[row[0]] = row
+        return [found[k] for k in sorted(found)]
+
+    def ids(self, selector: Optional[str] = None) -> List[str]:
+        return [row[1] for row in self._locate(parse_selector(selector))]
+
+    def get(self, case_id: str) -> Optional[Dict[str, Any]]:
+        row = self.db.execute("SELECT offset, length FROM cases WHERE id = ?", (case_id,)).fetchone()
+        if row is None:
+            return None
+        with open(self.pack_path, "rb") as f:
+            f.seek(row[0])
+            return json.loads(f.read(row[1]))
+
+    def iter_cases(self, selector: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Lazily parse the selected cases, in pack order."""
+        located = self._locate(parse_selector(selector))
+        with open(self.pack_path, "rb") as f:
+            for _, _, offset, length in located:
+                f.seek(offset)
+                yield json.loads(f.read(length))
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self) -> "CaseStore":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def pack_path(task: str) -> str:
+    return os.path.join("bench", task, PACK_NAME)
+
+
+def import_cases(task: str, force: bool = False) -> Tuple[str, int]:
+    """Write bench/<task>/cases/*.json into bench/<task>/cases.jsonl in file order.
+    Cases without an id get their file stem, as load_cases does. Returns (pack path, count)."""
+    out = pack_path(task)
+    if os.path.exists(out) and not force:
+        raise SystemExit(f"{out} already exists (use --force to overwrite)")
+    paths = sorted(glob(os.path.join("bench", task, "cases", "*.json")))
+    if not paths:
+        raise SystemExit(f"No cases found under {os.path.join('bench', task, 'cases')}")
+    tmp = f"{out}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8", newline="\n") as f:
+        for p in paths:
+            with open(p, "r", encoding="utf-8") as src:
+                case = json.load(src)
+            if isinstance(case, dict) and not case.get("id"):
+                case["id"] = os.path.splitext(os.path.basename(p))[0]
+            f.write(json.dumps(case, ensure_ascii=False) + "\n")
+    os.replace(tmp, out)
+    return out, len(paths)
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Pack and query indexed bench cases")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_import = sub.add_parser("import", help="Pack bench/<task>/cases/*.json into bench/<task>/cases.jsonl")
+    p_import.add_argument("task")
+    p_import.add_argument("--force", action="store_true", help="Overwrite an existing pack")
+    p_ids = sub.add_parser("ids", help="List case ids matching a selector")
+    p_ids.add_argument("task")
+    p_ids.add_argument("--cases", default="all", help="Selector: all, ids, tag:<tag>, re:<regex> (comma-separated)")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "import":
+        out, n = import_cases(args.task, force=args.force)
+        print(json.dumps({"pack": out, "cases": n}))
+        sys.stderr.write(f"case_store: bench-run now reads {out}; remove bench/{args.task}/cases/ once verified\n")
+        return 0
+
+    if not os.path.isfile(pack_path(args.task)):
+        raise SystemExit(f"No case pack at {pack_path(args.task)} (run: case_store.py import {args.task})")
+    with CaseStore(pack_path(args.task)) as store:
+        for case_id in store.ids(args.cases):
+            print(case_id)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -2,6 +2,7 @@
 """
 Validate required <let> headers exist in POML recipes.
 Usage (lint-staged): python scripts/check_poml_headers.py -- <files>
+Usage (whole tree):  python scripts/check_poml_headers.py --all
 
 Required let names:
 - topology (solo|multi)
@@ -13,58 +14,134 @@ Optional but recommended:
 - tool_aliases
 - constraints
 - prompt_variants
+
+Passing files are remembered in .cache/check_poml_headers.json by path,
+mtime/size and content hash; unchanged or identical files are skipped. The
+cache is dropped when the required keys or the recipe parser
+(recipe_loader.LOADER_VERSION) change.
+Only the header is parsed (poml_parser stops at the first <role>/<task>/
+<output-format>, so header lets must come first); large batches are validated
+on a process pool.
 """
 import argparse
-import re
+import hashlib
+import json
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-LET_RE = re.compile(r"<let\s+name=\"([^\"]+)\"[^>]*>([\s\S]*?)</let>", re.MULTILINE)
+from recipe_loader import LOADER_VERSION, read_header_lets
 
 REQUIRED = {"topology", "bench_id", "tools", "providers"}
 OPTIONAL = {"variant", "variants", "tool_aliases", "constraints", "prompt_variants"}
 
+CACHE_PATH = os.path.join(".cache", "check_poml_headers.json")
+# Below this many files to validate, a process pool costs more than it saves
+PARALLEL_MIN_FILES = 32
+
+
+def _validate(path: str) -> tuple[str, str, list[str]]:
+    sha, lets = read_header_lets(path)
+    return path, sha, [k for k in sorted(REQUIRED) if k not in lets]
 
-def parse_lets(text: str) -> dict:
-    lets = {}
-    for m in LET_RE.finditer(text):
-        name = m.group(1).strip()
-        body = m.group(2).strip()
-        # last occurrence wins
-        lets[name] = body
-    return lets
 
+def empty_cache() -> dict:
+    return {"required": sorted(REQUIRED), "loader": LOADER_VERSION, "files": {}, "passing": []}
 
-def validate_file(path: Path) -> list[str]:
+
+def load_cache(path: str) -> dict:
+    """Cached passing results: {"files": {path: [mtime_ns, size, sha]}, "passing": [sha, ...]}.
+    Discarded if written for a different REQUIRED set or by another parser
+    (recipe_loader.LOADER_VERSION), so files passed by an older parser are re-checked."""
     try:
-        text = path.read_text(encoding="utf-8")
-    except UnicodeDecodeError:
-        text = path.read_text(encoding="utf-8-sig")
-    lets = parse_lets(text)
-    missing = [k for k in sorted(REQUIRED) if k not in lets]
-    return missing
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = None
+    if (
+        not isinstance(data, dict)
+        or data.get("required") != sorted(REQUIRED)
+        or data.get("loader") != LOADER_VERSION
+    ):
+        return empty_cache()
+    return data
+
+
+def save_cache(path: str, data: dict) -> None:
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def check_files(paths: list[str], cache: dict, jobs: int | None = None) -> dict[str, list[str]]:
+    """Return {path: missing keys} for failing files, updating cache with passing ones."""
+    files: dict = cache["files"]
+    passing = set(cache["passing"])
+    todo: list[str] = []
+    for p in paths:
+        st = os.stat(p)
+        entry = files.get(p)
+        if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+            continue
+        with open(p, "rb") as f:
+            sha = hashlib.sha256(f.read()).hexdigest()
+        if sha in passing:
+            files[p] = [st.st_mtime_ns, st.st_size, sha]
+        else:
+            files.pop(p, None)
+            todo.append(p)
+
+    if jobs == 1 or len(todo) < PARALLEL_MIN_FILES:
+        results = [_validate(p) for p in todo]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(_validate, todo, chunksize=8))
+
+    failures: dict[str, list[str]] = {}
+    for p, sha, missing in results:
+        if missing:
+            failures[p] = missing
+            continue
+        st = os.stat(p)
+        files[p] = [st.st_mtime_ns, st.st_size, sha]
+        passing.add(sha)
+    cache["passing"] = sorted(passing)
+    return failures
 
 
 def main(argv: list[str]) -> int:
     parser = argparse.ArgumentParser(add_help=False)
     parser.add_argument("files", nargs="*")
+    parser.add_argument("--all", action="store_true", help="Check every poml/**/*.poml file")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes for large batches")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore and do not update cached passing results")
     args = parser.parse_args(argv)
-    if not args.files:
+
+    files = list(args.files)
+    if args.all:
+        files += [str(p) for p in sorted(Path("poml").rglob("*.poml"))]
+    # Only validate .poml files
+    paths = list(dict.fromkeys(f for f in files if Path(f).suffix.lower() == ".poml" and Path(f).exists()))
+    if not paths:
         return 0
 
-    had_error = False
-    for f in args.files:
-        p = Path(f)
-        # Only validate .poml files
-        if p.suffix.lower() != ".poml" or not p.exists():
-            continue
-        missing = validate_file(p)
-        if missing:
-            had_error = True
+    cache = empty_cache() if args.no_cache else load_cache(CACHE_PATH)
+    failures = check_files(paths, cache, jobs=args.jobs)
+    if not args.no_cache:
+        save_cache(CACHE_PATH, cache)
+
+    for p in paths:
+        if p in failures:
             sys.stderr.write(
-                f"[check_poml_headers] Missing <let> keys in {p}: {', '.join(missing)}\n"
+                f"[check_poml_headers] Missing <let> keys in {p}: {', '.join(failures[p])}\n"
             )
-    return 1 if had_error else 0
+    return 1 if failures else 0
 
 
 if __name__ == "__main__":
@@ -3,7 +3,12 @@
 convert_md_to_poml: Migrate Markdown agent recipes to canonical POML.
 - Standard library only; optional PyYAML if available for frontmatter.
 - Reads department folders with *.md and writes poml/<dept>/*.poml.
-- Does not overwrite existing POML unless --force is set.
+- Incremental: <dst-root>/.convert-manifest.json records each output's source
+  hash, output hash and converter fingerprint. Only new or changed sources (or
+  a changed converter) are reconverted; outputs of deleted sources are removed.
+- Never overwrites POML it did not generate, or generated POML that was edited
+  by hand since, unless --force is set.
+- Conversions run on a process pool for larger batches (--jobs).
 
 Usage:
   python scripts/convert_md_to_poml.py \
@@ -14,17 +19,19 @@ Windows-safe paths; preserves UTF-8.
 """
 from __future__ import annotations
 import argparse
+import hashlib
 import json
 import os
-import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, List, Tuple
 
-try:
-    import yaml  # type: ignore
-except Exception:  # pragma: no cover
-    yaml = None  # type: ignore
+from recipe_loader import LOADER_VERSION, load_recipe
+
+MANIFEST_NAME = ".convert-manifest.json"
+# Below this many conversions, a process pool costs more than it saves
+PARALLEL_MIN_FILES = 8
 
 CANONICAL_PROVIDERS: Dict[str, Dict[str, Any]] = {
     "openai": {"model": "gpt-5", "temperature": 0.2},
@@ -41,37 +48,11 @@ QWEN_ALIASES = {
     "fs.search@qwen": "search_file_content",
 }
 
-FRONTMATTER_DELIM = re.compile(r"^---\s*$")
-
-
 def parse_md(path: Path) -> Tuple[Dict[str, Any], str]:
     """Return (frontmatter_dict, body_text). If no frontmatter, {} and all text.
     """
-    text = path.read_text(encoding="utf-8")
-    # normalize newlines
-    text = text.replace("\r\n", "\n")
-    lines = text.split("\n")
-    header: Dict[str, Any] = {}
-    body = text
-    if lines and FRONTMATTER_DELIM.match(lines[0]):
-        # find closing '---'
-        end_idx = None
-        for i in range(1, len(lines)):
-            if FRONTMATTER_DELIM.match(lines[i]):
-                end_idx = i
-                break
-        if end_idx is not None:
-            header_text = "\n".join(lines[1:end_idx])
-            body = "\n".join(lines[end_idx + 1 :])
-            if yaml is not None:
-                try:
-                    parsed = yaml.safe_load(header_text)
-                    header = parsed if isinstance(parsed, dict) else {}
-                except Exception:
-                    header = {}
-            else:
-                header = {}
-    return header, body.strip()
+    recipe = load_recipe(str(path))
+    return recipe.lets, recipe.body
 
 
 def stem_to_title(stem: str) -> str:
@@ -121,6 +102,95 @@ def build_poml(front: Dict[str, Any], body: str, bench_id: str) -> str:
     return "\n".join(poml)
 
 
+def sha256_file(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def converter_fingerprint() -> str:
+    """Changes whenever this script or the recipe loader's parsing changes."""
+    own = sha256_file(Path(__file__))[:16]
+    return f"{own}+loader{LOADER_VERSION}"
+
+
+def load_manifest(path: Path, fingerprint: str) -> Dict[str, Any]:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        data = None
+    if not isinstance(data, dict) or not isinstance(data.get("files"), dict):
+        data = {"files": {}}
+    data["converter"] = fingerprint
+    return data
+
+
+def save_manifest(path: Path, data: Dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    data["files"] = dict(sorted(data["files"].items()))
+    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _convert_job(job: Tuple[str, str, str]) -> Tuple[str, str]:
+    md_path, dst_root, dept = job
+    out_path, _ = convert_file(Path(md_path), Path(dst_root), dept, force=True)
+    return md_path, sha256_file(out_path)
+
+
+def plan(
+    sources: List[Tuple[str, Path]],
+    dst_root: Path,
+    manifest: Dict[str, Any],
+    force: bool,
+) -> Tuple[List[Tuple[str, Path, str]], List[Tuple[Path, str]]]:
+    """Split sources into (to convert: [(dept, md, source_sha)], skipped: [(out, reason)])."""
+    files: Dict[str, Any] = manifest["files"]
+    todo: List[Tuple[str, Path, str]] = []
+    skipped: List[Tuple[Path, str]] = []
+    for dept, md_path in sources:
+        out_path = dst_root / dept / f"{md_path.stem}.poml"
+        key = f"{dept}/{md_path.stem}.poml"
+        source_sha = sha256_file(md_path)
+        entry = files.get(key)
+        if force or not out_path.exists():
+            todo.append((dept, md_path, source_sha))
+            continue
+        if entry is None:
+            skipped.append((out_path, "exists, not generated"))
+            continue
+        if sha256_file(out_path) != entry.get("output_sha"):
+            skipped.append((out_path, "edited since generated"))
+            continue
+        if entry.get("source_sha") == source_sha and entry.get("converter") == manifest["converter"]:
+            skipped.append((out_path, "up to date"))
+            continue
+        todo.append((dept, md_path, source_sha))
+    return todo, skipped
+
+
+def clean_stale(
+    manifest: Dict[str, Any], src_root: Path, dst_root: Path, departments: List[str], live: set
+) -> List[Path]:
+    """Drop manifest entries whose source is gone; delete their outputs if unedited."""
+    removed: List[Path] = []
+    files: Dict[str, Any] = manifest["files"]
+    for key in list(files):
+        entry = files[key]
+        if entry.get("dept") not in departments or key in live:
+            continue
+        if (src_root / entry.get("source", "")).exists():
+            continue
+        out_path = dst_root / key
+        if out_path.exists():
+            if sha256_file(out_path) == entry.get("output_sha"):
+                out_path.unlink()
+                removed.append(out_path)
+            else:
+                print(f"warn: source deleted but output was edited, keeping: {out_path}", file=sys.stderr)
+        del files[key]
+    return removed
+
+
 def convert_file(md_path: Path, dst_root: Path, dept: str, force: bool = False) -> Tuple[Path, bool]:
     front, body = parse_md(md_path)
     bench_id = (front.get("bench_id") if isinstance(front.get("bench_id"), str) else md_path.stem)
@@ -139,34 +209,57 @@ def main(argv=None) -> int:
     p.add_argument("--src-root", default=".", help="Repository root where dept folders live")
     p.add_argument("--dst-root", default="poml", help="Destination root for POML output")
     p.add_argument("--departments", nargs="+", required=True, help="Dept folders to process (e.g., design marketing)")
-    p.add_argument("--force", action="store_true", help="Overwrite existing .poml files")
+    p.add_argument("--force", action="store_true", help="Overwrite existing .poml files, even hand-edited ones")
+    p.add_argument("--jobs", type=int, default=None, help="Worker processes for larger batches")
     args = p.parse_args(argv)
 
     src_root = Path(args.src_root).resolve()
     dst_root = Path(args.dst_root)
-    created = 0
-    skipped = 0
-    processed = 0
+    manifest_path = dst_root / MANIFEST_NAME
+    manifest = load_manifest(manifest_path, converter_fingerprint())
 
+    sources: List[Tuple[str, Path]] = []
+    departments: List[str] = []
     for dept in args.departments:
         dept_dir = src_root / dept
         if not dept_dir.exists():
             print(f"warn: dept not found: {dept_dir}", file=sys.stderr)
             continue
-        for md_path in dept_dir.glob("*.md"):
-            processed += 1
-            out_path, wrote = convert_file(md_path, dst_root, dept, force=args.force)
-            if wrote:
-                created += 1
-                print(f"wrote: {out_path}")
-            else:
-                skipped += 1
-                print(f"skip (exists): {out_path}")
+        departments.append(dept)
+        sources += [(dept, md_path) for md_path in sorted(dept_dir.glob("*.md"))]
+
+    todo, skipped = plan(sources, dst_root, manifest, args.force)
+    jobs = [(str(md_path), str(dst_root), dept) for dept, md_path, _ in todo]
+    if args.jobs == 1 or len(jobs) < PARALLEL_MIN_FILES:
+        results = [_convert_job(j) for j in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            results = list(pool.map(_convert_job, jobs, chunksize=4))
+
+    for (dept, md_path, source_sha), (_, output_sha) in zip(todo, results):
+        key = f"{dept}/{md_path.stem}.poml"
+        manifest["files"][key] = {
+            "dept": dept,
+            "source": md_path.relative_to(src_root).as_posix(),
+            "source_sha": source_sha,
+            "output_sha": output_sha,
+            "converter": manifest["converter"],
+        }
+        print(f"wrote: {dst_root / key}")
+    for out_path, reason in skipped:
+        print(f"skip ({reason}): {out_path}")
+
+    live = {f"{dept}/{md_path.stem}.poml" for dept, md_path in sources}
+    removed = clean_stale(manifest, src_root, dst_root, departments, live)
+    for out_path in removed:
+        print(f"removed (source deleted): {out_path}")
+    save_manifest(manifest_path, manifest)
 
     print(json.dumps({
-        "processed": processed,
-        "created": created,
-        "skipped": skipped,
+        "processed": len(sources),
+        "created": len(todo),
+        "skipped": len(skipped),
+        "removed": len(removed),
         "dst_root": str(dst_root),
     }, ensure_ascii=False))
     return 0
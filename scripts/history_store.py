@@ -0,0 +1,238 @@
+"""
+history_store: Append-only SQLite history of bench metrics. Stdlib only.
+
+Every run block bench-aggregate extracts is recorded once, as one row with
+its git SHA and timestamp (plus bench_id/provider/model/variant). Rows are
+never updated or deleted, and triggers reject attempts to do so. A run's
+identity (run_key) comes from its own results, never from the commit it is
+attributed to: re-aggregating the same results files is a no-op, even after
+HEAD moves and results without a recorded git_sha would be labelled
+differently. Such runs keep the SHA they were first recorded under.
+
+Each row stores the scalar metrics as indexed columns for time-series queries
+(accuracy, latency averages and percentiles, tokens/s), plus the full metric
+JSON that recipes.lock.json is derived from.
+
+The store lives at bench/history.sqlite and is the system of record;
+recipes.lock.json is an export of its latest rows (bench-aggregate.py).
+Query it with scripts/bench-history.py.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from latency_sketch import LatencySketch
+
+HISTORY_PATH = os.path.join("bench", "history.sqlite")
+HISTORY_VERSION = 2
+# Metric fields that identify a run (all derived from its results file)
+RUN_IDENTITY = ("ended_at", "accuracy", "avg_latency_ms", "tool_calls", "mode", "latency_sketch")
+# Columns a series can be queried on
+SERIES_METRICS = (
+    "accuracy", "avg_latency_ms", "avg_ttft_ms", "tokens_per_sec", "tool_calls",
+    "p50_ms", "p90_ms", "p95_ms", "p99_ms", "max_ms", "cases",
+)
+
+# (bench_id, provider, model, variant, git sha, metric dict) as extracted by bench-aggregate
+HistoryRow = Tuple[str, str, str, str, str, Dict[str, Any]]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    run_key TEXT NOT NULL UNIQUE,
+    git_sha TEXT NOT NULL,
+    ended_at REAL NOT NULL,
+    recorded_at REAL NOT NULL,
+    bench_id TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    mode TEXT,
+    accuracy REAL,
+    avg_latency_ms REAL,
+    avg_ttft_ms REAL,
+    tokens_per_sec REAL,
+    tool_calls INTEGER,
+    p50_ms REAL,
+    p90_ms REAL,
+    p95_ms REAL,
+    p99_ms REAL,
+    max_ms REAL,
+    cases INTEGER,
+    metric TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_series ON runs(bench_id, provider, model, variant, ended_at);
+CREATE INDEX IF NOT EXISTS runs_sha ON runs(git_sha, ended_at);
+CREATE TRIGGER IF NOT EXISTS runs_no_update BEFORE UPDATE ON runs
+    BEGIN SELECT RAISE(ABORT, 'bench history is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS runs_no_delete BEFORE DELETE ON runs
+    BEGIN SELECT RAISE(ABORT, 'bench history is append-only'); END;
+"""
+
+
+def run_key(bench_id: str, provider: str, model: str, variant: str, metric: Dict[str, Any]) -> str:
+    """Identity of one recorded run: its key plus the RUN_IDENTITY fields of its metric."""
+    ident = {k: metric.get(k) for k in RUN_IDENTITY}
+    ident["ended_at"] = float(ident["ended_at"] or 0.0)
+    raw = "\0".join([bench_id, provider, model, variant, json.dumps(ident, sort_keys=True, separators=(",", ":"))])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def _percentiles(metric: Dict[str, Any]) -> Tuple[Optional[float], ...]:
+    """(p50, p90, p95, p99, max, n) of the metric's latency sketch; Nones without one."""
+    sketch = metric.get("latency_sketch")
+    if not isinstance(sketch, dict):
+        return (None,) * 6
+    summary = LatencySketch.from_dict(sketch).summary()
+    return summary["p50"], summary["p90"], summary["p95"], summary["p99"], summary["max"], summary["n"]
+
+
+class HistoryStore:
+    """Append-only run history in SQLite."""
+
+    def __init__(self, path: str = HISTORY_PATH) -> None:
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript(_SCHEMA)
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is None:
+            with self.db:
+                self.db.execute("INSERT INTO meta (key, value) VALUES ('version', ?)", (str(HISTORY_VERSION),))
+        elif int(row[0]) > HISTORY_VERSION:
+            self.db.close()
+            raise ValueError(f"{path}: history version {row[0]} is newer than this tool ({HISTORY_VERSION})")
+        elif int(row[0]) < 2:
+            self._rekey()
+
+    def _rekey(self) -> None:
+        """Version 1 keyed runs by git SHA, so results without a recorded SHA were
+        appended again under every new HEAD. Re-key every row by run_key() and
+        drop those later copies (the first recording of a run is kept)."""
+        with self.db:
+            self.db.execute("DROP TRIGGER IF EXISTS runs_no_update")
+            self.db.execute("DROP TRIGGER IF EXISTS runs_no_delete")
+            seen = set()
+            rows = self.db.execute("SELECT id, bench_id, provider, model, variant, metric FROM runs ORDER BY id").fetchall()
+            for rid, b, pr, mo, v, metric in rows:
+                key = run_key(b, pr, mo, v, json.loads(metric))
+                if key in seen:
+                    self.db.execute("DELETE FROM runs WHERE id = ?", (rid,))
+                    continue
+                seen.add(key)
+                self.db.execute("UPDATE runs SET run_key = ? WHERE id = ?", ("v2:" + key, rid))
+            # Two passes so a new key never collides with a not yet re-keyed row
+            self.db.execute("UPDATE runs SET run_key = substr(run_key, 4)")
+            self.db.execute("UPDATE meta SET value = ? WHERE key = 'version'", (str(HISTORY_VERSION),))
+        self.db.executescript(_SCHEMA)
+
+    def append(self, rows: Iterable[HistoryRow], recorded_at: Optional[float] = None) -> int:
+        """Record runs not seen before; returns how many were added."""
+        recorded_at = time.time() if recorded_at is None else recorded_at
+        before = self.db.total_changes
+        with self.db:
+            for bench_id, provider, model, variant, git_sha, metric in rows:
+                ended_at = float(metric.get("ended_at") or 0.0)
+                p50, p90, p95, p99, max_ms, n = _percentiles(metric)
+                self.db.execute(
+                    "INSERT OR IGNORE INTO runs (run_key, git_sha, ended_at, recorded_at, bench_id, provider, model,"
+                    " variant, mode, accuracy, avg_latency_ms, avg_ttft_ms, tokens_per_sec, tool_calls,"
+                    " p50_ms, p90_ms, p95_ms, p99_ms, max_ms, cases, metric)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        run_key(bench_id, provider, model, variant, metric),
+                        git_sha, ended_at, recorded_at, bench_id, provider, model, variant,
+                        metric.get("mode"),
+                        metric.get("accuracy"),
+                        None if metric.get("mode") == "batch" else metric.get("avg_latency_ms"),
+                        metric.get("avg_ttft_ms"),
+                        metric.get("tokens_per_sec"),
+                        metric.get("tool_calls"),
+                        p50, p90, p95, p99, max_ms, n,
+                        json.dumps(metric, ensure_ascii=False, separators=(",", ":")),
+                    ),
+                )
+        return self.db.total_changes - before
+
+    def rows(self) -> Iterator[Tuple[str, str, str, str, Dict[str, Any]]]:
+        """Every recorded run as (bench_id, provider, model, variant, metric dict), oldest first."""
+        for b, pr, mo, v, metric in self.db.execute(
+            "SELECT bench_id, provider, model, variant, metric FROM runs ORDER BY ended_at, id"
+        ):
+            yield b, pr, mo, v, json.loads(metric)
+
+    def series(
+        self,
+        bench_id: str,
+        metric: str = "p95_ms",
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        variant: Optional[str] = None,
+        commits: Optional[int] = None,
+        last: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """One metric over time for a bench, oldest first. `commits` keeps runs of
+        the N most recent git SHAs (by their latest run); `last` the N latest runs."""
+        if metric not in SERIES_METRICS:
+            raise ValueError(f"unknown metric {metric!r} (expected one of {', '.join(SERIES_METRICS)})")
+        where = ["bench_id = ?"]
+        params: List[Any] = [bench_id]
+        for column, value in (("provider", provider), ("model", model), ("variant", variant)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        if commits is not None:
+            # The same filters again, to rank SHAs among this series' runs only
+            where.append(
+                f"git_sha IN (SELECT git_sha FROM runs WHERE {' AND '.join(where)}"
+                " GROUP BY git_sha ORDER BY MAX(ended_at) DESC LIMIT ?)"
+            )
+            params = params + params + [commits]
+        sql = (
+            f"SELECT git_sha, ended_at, provider, model, variant, {metric} FROM runs"
+            f" WHERE {' AND '.join(where)} ORDER BY ended_at DESC, id DESC"
+        )
+        if last is not None:
+            sql += " LIMIT ?"
+            params.append(last)
+        out = [
+            {"git_sha": sha, "ended_at": ended_at, "provider": pr, "model": mo, "variant": v, metric: value}
+            for sha, ended_at, pr, mo, v, value in self.db.execute(sql, params)
+        ]
+        out.reverse()
+        return out
+
+    def commits(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Recorded git SHAs, most recent first, with their run counts and time span."""
+        sql = (
+            "SELECT git_sha, COUNT(*), MIN(ended_at), MAX(ended_at), COUNT(DISTINCT bench_id) FROM runs"
+            " GROUP BY git_sha ORDER BY MAX(ended_at) DESC"
+        )
+        params: List[Any] = []
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [
+            {"git_sha": sha, "runs": n, "first_ended_at": first, "last_ended_at": last, "benches": benches}
+            for sha, n, first, last, benches in self.db.execute(sql, params)
+        ]
+
+    def runs_at(self, git_sha: str) -> List[Dict[str, Any]]:
+        """Scalar metrics of every run recorded at a git SHA (a unique prefix is enough)."""
+        cur = self.db.execute(
+            f"SELECT git_sha, ended_at, bench_id, provider, model, variant, {', '.join(SERIES_METRICS)}"
+            " FROM runs WHERE substr(git_sha, 1, ?) = ? ORDER BY bench_id, provider, model, variant, ended_at",
+            (len(git_sha), git_sha),
+        )
+        names = [d[0] for d in cur.description]
+        return [dict(zip(names, row)) for row in cur]
+
+    def close(self) -> None:
+        self.db.close()
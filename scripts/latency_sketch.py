@@ -0,0 +1,110 @@
+"""
+latency_sketch: Mergeable fixed-memory quantile sketch for latency samples.
+Stdlib only.
+
+Log-bucketed histogram (DDSketch-style): a value x lands in bucket
+ceil(log(x) / log(gamma)) with gamma = (1 + a) / (1 - a), so every quantile
+estimate is within relative error `a` of the true value. Memory is bounded by
+max_bins (the lowest buckets are collapsed first, so tail quantiles stay
+accurate); merging two sketches adds bucket counts, so per-run sketches can be
+combined across any number of runs.
+"""
+from __future__ import annotations
+import math
+from typing import Any, Dict, Iterable, Optional
+
+# Samples at or below this (ms) are counted as zero
+MIN_VALUE_MS = 1e-3
+
+
+class LatencySketch:
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048) -> None:
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1.0 + relative_accuracy) / (1.0 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero = 0
+        self.count = 0
+        self.max: Optional[float] = None
+
+    def add(self, value: float, n: int = 1) -> None:
+        value = float(value)
+        self.count += n
+        if self.max is None or value > self.max:
+            self.max = value
+        if value <= MIN_VALUE_MS:
+            self.zero += n
+            return
+        k = math.ceil(math.log(value) / self._log_gamma)
+        self.bins[k] = self.bins.get(k, 0) + n
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def extend(self, values: Iterable[float]) -> "LatencySketch":
+        for v in values:
+            self.add(v)
+        return self
+
+    def merge(self, other: "LatencySketch") -> "LatencySketch":
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("cannot merge sketches with different relative accuracy")
+        for k, n in other.bins.items():
+            self.bins[k] = self.bins.get(k, 0) + n
+        self.zero += other.zero
+        self.count += other.count
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+        while len(self.bins) > self.max_bins:
+            self._collapse()
+        return self
+
+    def _collapse(self) -> None:
+        keys = sorted(self.bins)
+        lowest, nxt = keys[0], keys[1]
+        self.bins[nxt] += self.bins.pop(lowest)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated value at quantile q in [0, 1]; None when empty."""
+        if self.count == 0:
+            return None
+        if q >= 1.0:
+            return self.max
+        rank = q * (self.count - 1)
+        seen = self.zero
+        if rank < seen:
+            return 0.0
+        for k in sorted(self.bins):
+            seen += self.bins[k]
+            if rank < seen:
+                estimate = 2.0 * self.gamma ** k / (self.gamma + 1.0)
+                return min(estimate, self.max) if self.max is not None else estimate
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        """p50/p90/p95/p99/max (ms, rounded) and the sample count."""
+        out: Dict[str, Any] = {}
+        for name, q in (("p50", 0.50), ("p90", 0.90), ("p95", 0.95), ("p99", 0.99), ("max", 1.0)):
+            v = self.quantile(q)
+            out[name] = round(v, 2) if v is not None else None
+        out["n"] = self.count
+        return out
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "max_bins": self.max_bins,
+            "bins": {str(k): n for k, n in self.bins.items()},
+            "zero": self.zero,
+            "count": self.count,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencySketch":
+        sk = cls(float(data.get("relative_accuracy", 0.01)), int(data.get("max_bins", 2048)))
+        sk.bins = {int(k): int(n) for k, n in (data.get("bins") or {}).items()}
+        sk.zero = int(data.get("zero", 0))
+        sk.count = int(data.get("count", 0))
+        sk.max = data.get("max")
+        return sk
@@ -0,0 +1,175 @@
+"""
+poml_parser: Single-pass, linear-time POML parser. Standard library only.
+
+Scans the source once, left to right, jumping between '<' positions with
+bytes.find, and builds a lightweight tree of Nodes. Nested and unknown tags
+become child nodes; a close tag pops back to its matching open tag, so
+unbalanced markup inside role bodies (e.g. "List<String>") cannot derail the
+rest of the document. <let> is a raw-text element: its body is taken verbatim
+up to the next </let>, so JSON values never need escaping.
+
+Text is materialized only for the root's top-level elements (lets, role, task,
+output-format, ...); deeper nodes carry structure only, which keeps memory
+linear in the input. Large files are read through mmap, and header_only=True
+stops at the first <role>/<task>/<output-format> once the header lets are in.
+"""
+from __future__ import annotations
+import mmap
+import os
+import re
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Union
+
+Buffer = Union[bytes, mmap.mmap]
+
+# Files at least this large are mapped instead of read into memory
+MMAP_MIN_BYTES = 64 * 1024
+# Elements that end the header; header_only parsing stops at the first one
+BODY_TAGS = frozenset({"role", "task", "output-format"})
+
+_NAME_RE = re.compile(rb"[A-Za-z][\w.:-]*")
+_ATTR_RE = re.compile(rb"([A-Za-z_:][\w.:-]*)\s*=\s*(\"[^\"]*\"|'[^']*')")
+_BOM = b"\xef\xbb\xbf"
+
+
+@dataclass
+class Node:
+    tag: str
+    attrs: Dict[str, str] = field(default_factory=dict)
+    children: List["Node"] = field(default_factory=list)
+    # Raw inner text (CRLF normalized); only filled for top-level elements
+    text: Optional[str] = None
+
+    def iter(self, tag: Optional[str] = None) -> Iterator["Node"]:
+        """Depth-first iteration over descendants, optionally filtered by tag."""
+        for child in self.children:
+            if tag is None or child.tag == tag:
+                yield child
+            yield from child.iter(tag)
+
+    def find(self, tag: str) -> Optional["Node"]:
+        return next(self.iter(tag), None)
+
+
+def _decode(raw: bytes) -> str:
+    return raw.decode("utf-8", errors="replace").replace("\r\n", "\n")
+
+
+def parse_poml(data: Buffer, header_only: bool = False) -> Node:
+    """Parse POML bytes (or an mmap) into a tree rooted at a synthetic '#document' node.
+    The outer <poml> wrapper is transparent: its children are the top-level elements."""
+    root = Node("#document")
+    # stack of (node, inner_start, materialize_text)
+    stack: List[tuple] = [(root, 0, False)]
+    n = len(data)
+    stop = n
+    pos = len(_BOM) if data[:3] == _BOM else 0
+
+    def top_level() -> bool:
+        # Directly under the document, or under the document's <poml> wrapper
+        return len(stack) == 1 or (len(stack) == 2 and stack[1][0].tag == "poml")
+
+    while pos < n:
+        lt = data.find(b"<", pos)
+        if lt < 0:
+            break
+        if data[lt + 1:lt + 4] == b"!--":
+            end = data.find(b"-->", lt + 4)
+            pos = n if end < 0 else end + 3
+            continue
+
+        closing = data[lt + 1:lt + 2] == b"/"
+        m = _NAME_RE.match(data, lt + 2 if closing else lt + 1)
+        if m is None:
+            pos = lt + 1  # a bare '<' in text
+            continue
+        gt = data.find(b">", m.end())
+        if gt < 0:
+            break
+        tag = m.group(0).decode("ascii").lower()
+
+        if closing:
+            # pop back to the matching open tag; stray close tags are ignored
+            for depth in range(len(stack) - 1, 0, -1):
+                if stack[depth][0].tag == tag:
+                    while len(stack) > depth:
+                        node, start, materialize = stack.pop()
+                        if materialize:
+                            node.text = _decode(data[start:lt])
+                    break
+            pos = gt + 1
+            continue
+
+        attrs = {
+            k.decode("ascii"): v[1:-1].decode("utf-8", errors="replace")
+            for k, v in _ATTR_RE.findall(data[m.end():gt])
+        }
+        node = Node(tag, attrs)
+        materialize = top_level() and tag != "poml"
+        if header_only and materialize and tag in BODY_TAGS:
+            stop = lt
+            break
+        stack[-1][0].children.append(node)
+        if data[gt - 1:gt] == b"/":  # self-closing
+            if materialize:
+                node.text = ""
+            pos = gt + 1
+            continue
+        if tag == "let":
+            close = data.find(b"</let>", gt + 1)
+            end = n if close < 0 else close
+            node.text = _decode(data[gt + 1:end])
+            pos = n if close < 0 else close + len(b"</let>")
+            continue
+        stack.append((node, gt + 1, materialize))
+        pos = gt + 1
+
+    # close anything left open at EOF (or at the header_only stop point)
+    while len(stack) > 1:
+        node, start, materialize = stack.pop()
+        if materialize and node.text is None:
+            node.text = _decode(data[start:stop])
+    return root
+
+
+@contextmanager
+def open_source(path: str) -> Iterator[Buffer]:
+    """Yield a file's bytes: mapped for large files, read for small (or empty) ones."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        if size < MMAP_MIN_BYTES:
+            yield f.read()
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
+
+
+def parse_poml_file(path: str, header_only: bool = False) -> Node:
+    with open_source(path) as data:
+        return parse_poml(data, header_only=header_only)
+
+
+def lets(root: Node) -> Dict[str, str]:
+    """Top-level {let name: stripped raw value}; the last occurrence of a name wins."""
+    out: Dict[str, str] = {}
+    for node in _top_level(root):
+        if node.tag == "let" and node.attrs.get("name"):
+            out[node.attrs["name"].strip()] = (node.text or "").strip()
+    return out
+
+
+def section(root: Node, tag: str) -> Optional[str]:
+    """Raw text of the first top-level <tag> element, or None."""
+    for node in _top_level(root):
+        if node.tag == tag:
+            return node.text or ""
+    return None
+
+
+def _top_level(root: Node) -> Iterator[Node]:
+    for child in root.children:
+        if child.tag == "poml":
+            yield from child.children
+        else:
+            yield child
@@ -0,0 +1,134 @@
+"""
+profiling: Phase timers and optional profilers for bench-run. Stdlib only.
+
+PhaseTimer accumulates wall-clock milliseconds per named phase (load_cases,
+provider, score, ...). It is cheap enough to wrap every case and safe to share
+between generation threads.
+
+Profiler wraps one bench-run invocation:
+- cpu: cProfile in the calling thread and in every thread started while it is
+  active (the generation pool), merged into one report;
+- mem: tracemalloc, reporting peak traced memory and the top allocation sites.
+Scoring worker processes are not profiled; use --score-workers 1 to include
+scoring in the report.
+"""
+from __future__ import annotations
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+PROFILE_MODES = ("cpu", "mem")
+# Rows per report section
+REPORT_TOP = 40
+
+
+class PhaseTimer:
+    """Milliseconds per phase, summed over every time the phase was entered."""
+
+    def __init__(self) -> None:
+        self._ms: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000.0)
+
+    def add(self, name: str, ms: float) -> None:
+        with self._lock:
+            self._ms[name] = self._ms.get(name, 0.0) + ms
+
+    def update(self, phases: Dict[str, float]) -> None:
+        for name, ms in phases.items():
+            self.add(name, float(ms))
+
+    def as_dict(self, digits: int = 3) -> Dict[str, float]:
+        """Phases in the order they were first entered."""
+        with self._lock:
+            return {name: round(ms, digits) for name, ms in self._ms.items()}
+
+
+class Profiler:
+    """Optional cProfile / tracemalloc session around one invocation."""
+
+    def __init__(self, mode: Optional[str]) -> None:
+        if mode is not None and mode not in PROFILE_MODES:
+            raise ValueError(f"unknown profile mode {mode!r} (expected one of {', '.join(PROFILE_MODES)})")
+        self.mode = mode
+        # Report path prefix, set once the results file is known
+        self.base: Optional[str] = None
+        self._profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def _thread_hook(self, frame: Any, event: str, arg: Any) -> None:
+        # Runs once as the first profile event of each new thread; the thread's
+        # own profiler then replaces this hook
+        prof = cProfile.Profile()
+        with self._lock:
+            self._profiles.append(prof)
+        prof.enable()
+
+    def start(self) -> None:
+        if self.mode == "cpu":
+            prof = cProfile.Profile()
+            self._profiles.append(prof)
+            threading.setprofile(self._thread_hook)
+            prof.enable()
+        elif self.mode == "mem":
+            tracemalloc.start(25)
+
+    def stop(self, base: Optional[str]) -> List[str]:
+        """Stop profiling and write the report(s) as <base>.<mode>.*; returns their paths.
+        With no base the session is discarded."""
+        if base is not None:
+            os.makedirs(os.path.dirname(base) or ".", exist_ok=True)
+        if self.mode == "cpu":
+            threading.setprofile(None)  # type: ignore[arg-type]
+            # The calling thread's profiler first: disable() detaches the current thread
+            for prof in self._profiles:
+                prof.disable()
+            if base is None:
+                return []
+            stats = pstats.Stats(*self._profiles)
+            prof_path = f"{base}.cpu.prof"
+            stats.dump_stats(prof_path)
+            out = io.StringIO()
+            pstats.Stats(prof_path, stream=out).sort_stats("cumulative").print_stats(REPORT_TOP)
+            txt_path = f"{base}.cpu.txt"
+            with open(txt_path, "w", encoding="utf-8") as f:
+                f.write(f"cProfile of {len(self._profiles)} thread(s); load {prof_path} with pstats or snakeviz\n")
+                f.write(out.getvalue())
+            return [prof_path, txt_path]
+        if self.mode == "mem":
+            if base is None:
+                tracemalloc.stop()
+                return []
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            snapshot = snapshot.filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            ))
+            txt_path = f"{base}.mem.txt"
+            with open(txt_path, "w", encoding="utf-8") as f:
+                f.write(f"tracemalloc: current {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB\n\n")
+                f.write(f"Top {REPORT_TOP} allocation sites by size:\n")
+                for stat in snapshot.statistics("lineno")[:REPORT_TOP]:
+                    f.write(f"{stat}\n")
+                f.write(f"\nTop {REPORT_TOP // 4} allocation tracebacks:\n")
+                for stat in snapshot.statistics("traceback")[:REPORT_TOP // 4]:
+                    f.write(f"\n{stat.size / 1024:.1f} KiB in {stat.count} block(s)\n")
+                    f.write("\n".join(stat.traceback.format(limit=8)) + "\n")
+            return [txt_path]
+        return []
@@ -0,0 +1,112 @@
+"""
+prompt_assembly: Build provider prompts from a recipe and a case. Stdlib only.
+
+A prompt is a static prefix plus the case text. The prefix is everything the
+recipe contributes: its role body, task, output format, constraints, tool
+declarations and the selected prompt variant. It is rendered once per
+(recipe content, variant) and memoized, so every case (and every worker
+thread) reuses the same PromptPrefix object. Adapters send it as the system
+instruction and mark it for provider prompt caching; its content hash is the
+cache key.
+
+Sections are ordered from most to least shared: the variant line comes last,
+so the variants of one recipe share the longest possible common prefix.
+
+Token counts are local estimates (adapters/tokens.py), not provider counts.
+"""
+from __future__ import annotations
+import hashlib
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from adapters.base import PromptPrefix
+from adapters.tokens import estimate_tokens
+from recipe_loader import CompiledRecipe, load_recipe
+
+# Part of every prefix key: bump when the rendering below changes
+ASSEMBLY_VERSION = 1
+
+
+@dataclass(frozen=True)
+class Prompt:
+    """One case's prompt: the shared recipe prefix (if any) plus the case text."""
+    prefix: Optional[PromptPrefix]
+    user: str
+    user_tokens: int
+
+    @property
+    def prefix_tokens(self) -> int:
+        return self.prefix.tokens if self.prefix is not None else 0
+
+    @property
+    def tokens(self) -> int:
+        return self.prefix_tokens + self.user_tokens
+
+
+def _section(title: str, body: str) -> str:
+    return f"## {title}\n{body.strip()}"
+
+
+def render_prefix_text(recipe: CompiledRecipe, variant: Optional[str] = None) -> str:
+    """Static prompt text for a recipe and prompt variant; empty if the recipe has no prompt content."""
+    header = recipe.header
+    parts: List[str] = []
+    role = recipe.role or recipe.body
+    if role.strip():
+        parts.append(role.strip())
+    if recipe.task.strip():
+        parts.append(_section("Task", recipe.task))
+    if recipe.output_format.strip():
+        parts.append(_section("Output format", recipe.output_format))
+    constraints = header.get("constraints") if isinstance(header.get("constraints"), list) else []
+    if constraints:
+        parts.append(_section("Constraints", "\n".join(f"- {c}" for c in constraints)))
+    tools = header.get("tools") if isinstance(header.get("tools"), list) else []
+    if tools:
+        mode = header.get("tool_mode") if isinstance(header.get("tool_mode"), str) else "auto"
+        parts.append(_section(f"Tools (mode: {mode})", "\n".join(f"- {t}" for t in tools)))
+    if variant and parts:
+        desc = ""
+        pvs = header.get("prompt_variants") if isinstance(header.get("prompt_variants"), list) else []
+        for pv in pvs:
+            if isinstance(pv, dict) and pv.get("id") == variant and pv.get("desc"):
+                desc = f" ({pv['desc']})"
+        parts.append(_section("Variant", f"{variant}{desc}"))
+    return "\n\n".join(parts)
+
+
+_PREFIXES: Dict[Tuple[str, Optional[str]], Optional[PromptPrefix]] = {}
+_LOCK = threading.Lock()
+
+
+def get_prefix(recipe_path: Optional[str], variant: Optional[str] = None) -> Optional[PromptPrefix]:
+    """Memoized prefix for a recipe file and variant; None without a recipe or prompt content.
+    load_recipe is itself memoized, so repeated calls cost a stat and a dict lookup."""
+    if not recipe_path or not os.path.isfile(recipe_path):
+        return None
+    recipe = load_recipe(recipe_path)
+    memo_key = (recipe.sha, variant)
+    with _LOCK:
+        if memo_key in _PREFIXES:
+            return _PREFIXES[memo_key]
+    text = render_prefix_text(recipe, variant)
+    prefix = None
+    if text:
+        digest = hashlib.sha256(f"{ASSEMBLY_VERSION}\0{text}".encode("utf-8")).hexdigest()
+        prefix = PromptPrefix(text=text, key=digest[:32], tokens=estimate_tokens(text))
+    with _LOCK:
+        _PREFIXES[memo_key] = prefix
+    return prefix
+
+
+def assemble(prefix: Optional[PromptPrefix], user: str) -> Prompt:
+    return Prompt(prefix=prefix, user=user, user_tokens=estimate_tokens(user))
+
+
+def describe(prefix: Optional[PromptPrefix]) -> Optional[Dict[str, Any]]:
+    """Results-file summary of a prefix (its key and size, not its text)."""
+    if prefix is None:
+        return None
+    return {"key": prefix.key, "tokens": prefix.tokens, "chars": len(prefix.text)}
@@ -0,0 +1,230 @@
+"""
+recipe_loader: Shared loading of POML and legacy Markdown recipes.
+Standard library only; optional PyYAML for Markdown frontmatter.
+
+load_recipe(path) returns a CompiledRecipe with the raw header values
+(`lets`: POML <let> blocks or Markdown frontmatter), the normalized bench
+header (`header`: topology, bench_id, tool_mode, tools, roles,
+prompt_variants) and the prompt sections (role, task, output_format, body).
+
+POML is parsed in a single linear pass by poml_parser (mmap for large
+files); read_header_lets() stops at the first body section for callers that
+only need the header.
+
+Compiled recipes are memoized in-process by (path, mtime, size) and cached on
+disk under .cache/recipes/ keyed by content hash, so unchanged recipes skip
+parsing across runs and across bench-run, check_poml_headers and
+convert_md_to_poml.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import textwrap
+import threading
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import poml_parser
+
+try:
+    import yaml  # type: ignore
+except Exception:  # pragma: no cover
+    yaml = None  # type: ignore
+
+# Bump whenever parsing/normalization changes so stale disk entries are ignored
+LOADER_VERSION = 3
+CACHE_DIR = os.path.join(".cache", "recipes")
+
+# CompiledRecipe attribute -> POML element
+SECTIONS = {"role": "role", "task": "task", "output_format": "output-format"}
+
+
+@dataclass
+class CompiledRecipe:
+    path: str
+    sha: str
+    format: str  # "poml" | "md"
+    lets: Dict[str, Any] = field(default_factory=dict)
+    header: Dict[str, Any] = field(default_factory=dict)
+    role: str = ""
+    task: str = ""
+    output_format: str = ""
+    # Markdown: text after the frontmatter. POML: empty.
+    body: str = ""
+
+
+def _section(text: str) -> str:
+    return textwrap.dedent(text.strip("\n")).strip()
+
+
+def decode_lets(raw_lets: Dict[str, str]) -> Dict[str, Any]:
+    """JSON let values are decoded; others are kept as stripped text."""
+    lets: Dict[str, Any] = {}
+    for key, raw in raw_lets.items():
+        try:
+            val: Any = json.loads(raw)
+        except Exception:
+            val = raw
+        lets[key] = val
+    return lets
+
+
+def parse_poml_text(text: str) -> Dict[str, Any]:
+    """Return {let name: value}; the last occurrence of a name wins."""
+    return decode_lets(poml_parser.lets(poml_parser.parse_poml(text.encode("utf-8"))))
+
+
+def read_header_lets(path: str) -> Tuple[str, Dict[str, Any]]:
+    """(sha256, decoded lets) of a POML file, parsing only up to the first body section."""
+    with poml_parser.open_source(path) as data:
+        sha = hashlib.sha256(data).hexdigest()
+        root = poml_parser.parse_poml(data, header_only=True)
+    return sha, decode_lets(poml_parser.lets(root))
+
+
+def poml_header(lets: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize POML lets into a recipe header (schema/recipe.schema.yaml shape).
+    Providers dict becomes roles[] of {name, provider, model, temperature},
+    unless a `roles` let (JSON list of role objects, e.g. with depends_on for
+    topology multi) declares them explicitly;
+    variant/variants/prompt_variants lets become prompt_variants[] of {id}."""
+    header: Dict[str, Any] = {}
+    if isinstance(lets.get("topology"), str):
+        header["topology"] = lets["topology"]
+    if isinstance(lets.get("bench_id"), str):
+        header["bench_id"] = lets["bench_id"]
+    if isinstance(lets.get("tool_mode"), str):
+        header["tool_mode"] = lets["tool_mode"]
+    # tools can be list or comma string
+    tools = lets.get("tools")
+    if isinstance(tools, list):
+        header["tools"] = tools
+    elif isinstance(tools, str) and tools:
+        header["tools"] = [t.strip() for t in tools.split(",") if t.strip()]
+    # providers -> roles
+    providers = lets.get("providers")
+    roles: List[Dict[str, Any]] = []
+    if isinstance(providers, dict):
+        for prov, cfg in providers.items():
+            model = cfg.get("model") if isinstance(cfg, dict) else None
+            role: Dict[str, Any] = {
+                "name": prov,
+                "provider": prov,
+                "model": model,
+            }
+            if isinstance(cfg, dict) and isinstance(cfg.get("temperature"), (int, float)):
+                role["temperature"] = cfg["temperature"]
+            roles.append(role)
+    declared = lets.get("roles")
+    if isinstance(declared, list) and declared:
+        roles = [r for r in declared if isinstance(r, dict)]
+    if roles:
+        header["roles"] = roles
+    pvs = lets.get("prompt_variants", lets.get("variants", lets.get("variant")))
+    if isinstance(pvs, str):
+        pvs = [v.strip() for v in pvs.split(",") if v.strip()]
+    if isinstance(pvs, list):
+        items = [{"id": p} if isinstance(p, str) else p for p in pvs]
+        items = [p for p in items if isinstance(p, dict) and p.get("id")]
+        if items:
+            header["prompt_variants"] = items
+    return header
+
+
+def split_frontmatter(text: str) -> Tuple[Optional[str], str]:
+    """Return (frontmatter text or None, body) for text starting with a '---' line."""
+    lines = text.split("\n")
+    if not lines or lines[0].strip() != "---":
+        return None, text
+    for i in range(1, len(lines)):
+        if lines[i].strip() == "---":
+            return "\n".join(lines[1:i]), "\n".join(lines[i + 1:])
+    return None, text
+
+
+def parse_frontmatter(header_text: Optional[str]) -> Dict[str, Any]:
+    """YAML frontmatter as a dict; {} if missing, invalid or PyYAML is unavailable."""
+    if header_text is None or yaml is None:
+        return {}
+    try:
+        data = yaml.safe_load(header_text)
+    except Exception:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def compile_source(path: str, data: poml_parser.Buffer, sha: str) -> CompiledRecipe:
+    """Compile raw recipe bytes (or an mmap); POML is parsed without decoding the whole file."""
+    if path.lower().endswith(".md"):
+        text = bytes(data).decode("utf-8-sig").replace("\r\n", "\n")
+        header_text, body = split_frontmatter(text)
+        front = parse_frontmatter(header_text)
+        return CompiledRecipe(path=path, sha=sha, format="md", lets=front, header=front, body=body.strip())
+    root = poml_parser.parse_poml(data)
+    lets = decode_lets(poml_parser.lets(root))
+    recipe = CompiledRecipe(path=path, sha=sha, format="poml", lets=lets, header=poml_header(lets))
+    for name, tag in SECTIONS.items():
+        text = poml_parser.section(root, tag)
+        if text is not None:
+            setattr(recipe, name, _section(text))
+    return recipe
+
+
+def compile_text(path: str, text: str, sha: str) -> CompiledRecipe:
+    return compile_source(path, text.encode("utf-8"), sha)
+
+
+_MEMO: Dict[Tuple[str, int, int], CompiledRecipe] = {}
+_MEMO_LOCK = threading.Lock()
+
+
+def _disk_path(sha: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, sha[:2], f"{sha}.json")
+
+
+def _disk_key(path: str, data: poml_parser.Buffer) -> str:
+    # Markdown parses differently with and without PyYAML; keep those apart
+    fmt = "md" if path.lower().endswith(".md") else "poml"
+    h = hashlib.sha256(f"{LOADER_VERSION}:{fmt}:{yaml is not None}\n".encode("utf-8"))
+    h.update(data)
+    return h.hexdigest()
+
+
+def load_recipe(path: str, cache_dir: Optional[str] = CACHE_DIR) -> CompiledRecipe:
+    """Load and compile a recipe, using the in-process memo and the on-disk cache.
+    Pass cache_dir=None to skip the disk cache. Raises OSError if path is unreadable."""
+    st = os.stat(path)
+    memo_key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    with _MEMO_LOCK:
+        hit = _MEMO.get(memo_key)
+    if hit is not None:
+        return hit
+
+    recipe: Optional[CompiledRecipe] = None
+    with poml_parser.open_source(path) as data:
+        sha = hashlib.sha256(data).hexdigest()
+        disk_file = _disk_path(_disk_key(path, data), cache_dir) if cache_dir else None
+        if disk_file and os.path.isfile(disk_file):
+            try:
+                with open(disk_file, "r", encoding="utf-8") as f:
+                    recipe = CompiledRecipe(**json.load(f))
+                recipe.path = path
+            except Exception:
+                recipe = None
+        compiled = recipe is None
+        if compiled:
+            recipe = compile_source(path, data, sha)
+    if compiled and disk_file:
+        try:
+            os.makedirs(os.path.dirname(disk_file), exist_ok=True)
+            tmp = f"{disk_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(asdict(recipe), f, ensure_ascii=False)
+            os.replace(tmp, disk_file)
+        except OSError:
+            pass
+
+    with _MEMO_LOCK:
+        _MEMO[memo_key] = recipe
+    return recipe
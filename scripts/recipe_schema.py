@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+recipe_schema: Compiled validation of recipe headers against schema/recipe.schema.yaml.
+Standard library only; jsonschema is used only as a fallback for schemas that
+go beyond the supported subset.
+
+The schema is compiled once into nested Python checks (type, enum, properties,
+required, additionalProperties, items, min/maxItems, min/maxLength,
+minimum/maximum, pattern) and memoized by file mtime. The parsed schema is
+cached as JSON under .cache/schema/ by content hash, so PyYAML is only needed
+the first time a schema version is seen. Every error is reported, not just the
+first. Applies to Markdown frontmatter and POML headers alike.
+
+Usage (whole catalog): python scripts/recipe_schema.py --all
+Usage (some files):    python scripts/recipe_schema.py poml/engineering/ai-engineer.poml engineering/ai-engineer.md
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from recipe_loader import load_recipe
+
+try:
+    import yaml  # type: ignore
+except Exception:  # pragma: no cover
+    yaml = None  # type: ignore
+
+SCHEMA_PATH = os.path.join("schema", "recipe.schema.yaml")
+CACHE_DIR = os.path.join(".cache", "schema")
+
+# Keywords that never affect validity
+ANNOTATIONS = {"$schema", "$id", "$comment", "title", "description", "default", "examples"}
+SUPPORTED = {
+    "type", "enum", "properties", "required", "additionalProperties", "items",
+    "minItems", "maxItems", "minLength", "maxLength", "minimum", "maximum", "pattern",
+}
+TYPES: Dict[str, Callable[[Any], bool]] = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "null": lambda v: v is None,
+}
+
+# (instance, path, errors) -> None; appends "path: message" strings
+Check = Callable[[Any, str, List[str]], None]
+Validator = Callable[[Any], List[str]]
+
+
+class SchemaError(Exception):
+    """The schema could not be loaded or compiled."""
+
+
+def _is_number(v: Any) -> bool:
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+def _compile(node: Any) -> Check:
+    if node is True or node == {}:
+        return lambda v, path, errors: None
+    if node is False:
+        return lambda v, path, errors: errors.append(f"{path}: not allowed")
+    if not isinstance(node, dict):
+        raise SchemaError(f"schema node must be an object, got {type(node).__name__}")
+    unsupported = set(node) - SUPPORTED - ANNOTATIONS
+    if unsupported:
+        raise SchemaError(f"unsupported schema keywords: {', '.join(sorted(unsupported))}")
+
+    checks: List[Check] = []
+
+    if "type" in node:
+        names = [node["type"]] if isinstance(node["type"], str) else list(node["type"])
+        unknown = [t for t in names if t not in TYPES]
+        if unknown:
+            raise SchemaError(f"unknown schema types: {', '.join(unknown)}")
+        preds = [TYPES[t] for t in names]
+        expected = " or ".join(names)
+
+        def check_type(v: Any, path: str, errors: List[str]) -> None:
+            if not any(p(v) for p in preds):
+                errors.append(f"{path}: must be {expected}")
+        checks.append(check_type)
+
+    if "enum" in node:
+        allowed = list(node["enum"])
+        shown = "[" + ",".join(repr(a) for a in allowed) + "]"
+
+        def check_enum(v: Any, path: str, errors: List[str]) -> None:
+            if not any(v == a and type(v) is type(a) for a in allowed):
+                errors.append(f"{path}: must be one of {shown}")
+        checks.append(check_enum)
+
+    if "required" in node:
+        required = list(node["required"])
+
+        def check_required(v: Any, path: str, errors: List[str]) -> None:
+            if isinstance(v, dict):
+                for k in required:
+                    if k not in v:
+                        errors.append(f"{path}.{k}: missing")
+        checks.append(check_required)
+
+    props = {k: _compile(sub) for k, sub in (node.get("properties") or {}).items()}
+    extra = node.get("additionalProperties", True)
+    extra_check = None if extra is True else _compile(extra)
+    if props or extra_check is not None:
+        def check_properties(v: Any, path: str, errors: List[str]) -> None:
+            if not isinstance(v, dict):
+                return
+            for k, item in v.items():
+                sub = props.get(k)
+                if sub is not None:
+                    sub(item, f"{path}.{k}", errors)
+                elif extra is False:
+                    errors.append(f"{path}.{k}: not allowed")
+                elif extra_check is not None:
+                    extra_check(item, f"{path}.{k}", errors)
+        checks.append(check_properties)
+
+    if "items" in node:
+        item_check = _compile(node["items"])
+
+        def check_items(v: Any, path: str, errors: List[str]) -> None:
+            if isinstance(v, list):
+                for i, item in enumerate(v):
+                    item_check(item, f"{path}[{i}]", errors)
+        checks.append(check_items)
+
+    for key, kind, op, word in (
+        ("minItems", list, lambda n, lim: n >= lim, "at least {} item(s)"),
+        ("maxItems", list, lambda n, lim: n <= lim, "at most {} item(s)"),
+        ("minLength", str, lambda n, lim: n >= lim, "at least {} character(s)"),
+        ("maxLength", str, lambda n, lim: n <= lim, "at most {} character(s)"),
+    ):
+        if key in node:
+            checks.append(_size_check(kind, node[key], op, word))
+
+    if "minimum" in node or "maximum" in node:
+        lo, hi = node.get("minimum"), node.get("maximum")
+
+        def check_range(v: Any, path: str, errors: List[str]) -> None:
+            if not _is_number(v):
+                return
+            if lo is not None and v < lo:
+                errors.append(f"{path}: must be >= {lo}")
+            if hi is not None and v > hi:
+                errors.append(f"{path}: must be <= {hi}")
+        checks.append(check_range)
+
+    if "pattern" in node:
+        rx = re.compile(node["pattern"])
+
+        def check_pattern(v: Any, path: str, errors: List[str]) -> None:
+            if isinstance(v, str) and not rx.search(v):
+                errors.append(f"{path}: must match {rx.pattern!r}")
+        checks.append(check_pattern)
+
+    def check(v: Any, path: str, errors: List[str]) -> None:
+        for c in checks:
+            c(v, path, errors)
+    return check
+
+
+def _size_check(kind: type, limit: int, op: Callable[[int, int], bool], word: str) -> Check:
+    def check_size(v: Any, path: str, errors: List[str]) -> None:
+        if isinstance(v, kind) and not op(len(v), limit):
+            errors.append(f"{path}: must have {word.format(limit)}")
+    return check_size
+
+
+def compile_schema(schema: Dict[str, Any], root: str = "header") -> Validator:
+    """Compile a schema into validate(instance) -> [error, ...] (empty when valid).
+    Raises SchemaError for keywords outside the supported subset."""
+    check = _compile(schema)
+
+    def validate(instance: Any) -> List[str]:
+        errors: List[str] = []
+        check(instance, root, errors)
+        return errors
+    return validate
+
+
+def _jsonschema_validator(schema: Dict[str, Any], root: str = "header") -> Validator:
+    try:
+        import jsonschema  # type: ignore
+    except Exception:
+        raise SchemaError("schema needs jsonschema, which is not installed") from None
+    compiled = jsonschema.validators.validator_for(schema)(schema)
+
+    def validate(instance: Any) -> List[str]:
+        out = []
+        for e in compiled.iter_errors(instance):
+            where = "".join(f"[{p}]" if isinstance(p, int) else f".{p}" for p in e.absolute_path)
+            out.append(f"{root}{where}: {e.message}")
+        return out
+    return validate
+
+
+def load_schema(path: str = SCHEMA_PATH, cache_dir: str = CACHE_DIR) -> Dict[str, Any]:
+    """Parsed schema; YAML is parsed once per content hash and then read back as JSON."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError as e:
+        raise SchemaError(f"not found at {path}") from e
+    if path.lower().endswith(".json"):
+        return json.loads(data.decode("utf-8"))
+    cached = os.path.join(cache_dir, f"{hashlib.sha256(data).hexdigest()}.json")
+    try:
+        with open(cached, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+    if yaml is None:
+        raise SchemaError("PyYAML not installed and no cached copy of the schema")
+    schema = yaml.safe_load(data.decode("utf-8"))
+    if not isinstance(schema, dict):
+        raise SchemaError(f"{path} is not a schema object")
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f"{cached}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(schema, f)
+        os.replace(tmp, cached)
+    except OSError:
+        pass
+    return schema
+
+
+_VALIDATORS: Dict[Tuple[str, int, int], Validator] = {}
+
+
+def get_validator(path: str = SCHEMA_PATH) -> Validator:
+    """Compiled validator for the schema at path, memoized until the file changes."""
+    try:
+        st = os.stat(path)
+    except OSError as e:
+        raise SchemaError(f"not found at {path}") from e
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    validator = _VALIDATORS.get(key)
+    if validator is None:
+        schema = load_schema(path)
+        try:
+            validator = compile_schema(schema)
+        except SchemaError:
+            validator = _jsonschema_validator(schema)
+        _VALIDATORS[key] = validator
+    return validator
+
+
+def validate_recipe(path: str, schema_path: str = SCHEMA_PATH) -> List[str]:
+    """Schema errors for a .poml or .md recipe's header."""
+    return get_validator(schema_path)(load_recipe(path).header)
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Validate recipe headers against the recipe schema")
+    parser.add_argument("files", nargs="*", help=".poml or .md recipes")
+    parser.add_argument("--all", action="store_true", help="Validate every poml/**/*.poml recipe")
+    parser.add_argument("--schema", default=SCHEMA_PATH, help=f"Schema file (default: {SCHEMA_PATH})")
+    parser.add_argument("--json", action="store_true", help="Print {file: [errors]} as JSON instead of text")
+    args = parser.parse_args(argv)
+
+    files = list(args.files)
+    if args.all:
+        files += [str(p) for p in sorted(Path("poml").rglob("*.poml"))]
+    paths = list(dict.fromkeys(f for f in files if Path(f).suffix.lower() in (".poml", ".md")))
+    if not paths:
+        return 0
+
+    try:
+        validator = get_validator(args.schema)
+    except SchemaError as e:
+        sys.stderr.write(f"[recipe_schema] {args.schema}: {e}\n")
+        return 2
+    report: Dict[str, List[str]] = {}
+    for p in paths:
+        try:
+            errors = validator(load_recipe(p).header)
+        except OSError as e:
+            errors = [f"unreadable: {e}"]
+        if errors:
+            report[p] = errors
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        for p, errors in report.items():
+            for e in errors:
+                sys.stderr.write(f"[recipe_schema] {p}: {e}\n")
+        sys.stderr.write(f"[recipe_schema] {len(paths)} recipes checked, {len(report)} with errors\n")
+    return 1 if report else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,214 @@
+"""
+regression: Bootstrap comparison of bench runs against a baseline. Stdlib only.
+
+For each run (bench_id, provider, model, variant) in a candidate results file,
+compares accuracy, mean latency and p95 latency with the matching baseline:
+- baseline results with per-case data: bootstrap over cases. When most case
+  ids appear on both sides, cases are resampled in pairs (same ids on both
+  sides), which cancels per-case difficulty. Otherwise each side is resampled
+  independently;
+- baseline lockfile entry (summary values only): the candidate is resampled
+  against the fixed baseline value.
+
+A metric is a regression when its change is statistically significant (the
+confidence interval of the delta excludes zero in the bad direction) and
+larger than the configured threshold. Latency thresholds are relative
+(e.g. 0.10 = 10% slower) with an absolute floor in milliseconds, so
+sub-millisecond noise in dry runs never gates. The accuracy threshold is an
+absolute drop.
+"""
+from __future__ import annotations
+import math
+import random
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+METRICS = ("accuracy", "latency_mean", "latency_p95")
+# Share of case ids both runs must have for a paired bootstrap
+PAIRED_MIN_OVERLAP = 0.5
+
+# (latency_ms or None, passed) for one case
+CaseSample = Tuple[Optional[float], bool]
+
+
+@dataclass
+class RunSample:
+    """One run's per-case samples, or only its summary values (lockfile baselines)."""
+    cases: Dict[str, CaseSample] = field(default_factory=dict)
+    summary: Dict[str, Optional[float]] = field(default_factory=dict)
+    # "batch" runs carry no latency
+    mode: Optional[str] = None
+
+    def value(self, metric: str) -> Optional[float]:
+        if self.cases:
+            return stat(metric, list(self.cases.values()))
+        return self.summary.get(metric)
+
+
+@dataclass
+class Thresholds:
+    max_latency_regression: float = 0.10
+    min_latency_delta_ms: float = 5.0
+    max_accuracy_drop: float = 0.02
+
+
+def _quantile(sorted_xs: List[float], q: float) -> float:
+    """Nearest-rank quantile of a sorted, non-empty list."""
+    rank = max(0, min(len(sorted_xs) - 1, math.ceil(q * len(sorted_xs)) - 1))
+    return sorted_xs[rank]
+
+
+def stat(metric: str, rows: List[CaseSample]) -> Optional[float]:
+    """Metric over case samples; None when there is nothing to measure."""
+    if not rows:
+        return None
+    if metric == "accuracy":
+        return sum(1 for _, passed in rows if passed) / len(rows)
+    lat = [ms for ms, _ in rows if ms is not None]
+    if not lat:
+        return None
+    if metric == "latency_mean":
+        return sum(lat) / len(lat)
+    return _quantile(sorted(lat), 0.95)
+
+
+def _interval(values: List[float], confidence: float) -> Tuple[float, float]:
+    values = sorted(values)
+    alpha = (1.0 - confidence) / 2.0
+    lo = values[max(0, int(math.floor(alpha * len(values))))]
+    hi = values[min(len(values) - 1, int(math.ceil((1.0 - alpha) * len(values))) - 1)]
+    return lo, hi
+
+
+def _paired_ids(cand: RunSample, base: RunSample) -> List[str]:
+    if not cand.cases or not base.cases:
+        return []
+    common = sorted(set(cand.cases) & set(base.cases))
+    if len(common) < PAIRED_MIN_OVERLAP * max(len(cand.cases), len(base.cases)):
+        return []
+    return common
+
+
+def compare_metric(
+    metric: str,
+    cand: RunSample,
+    base: RunSample,
+    thresholds: Thresholds,
+    resamples: int,
+    confidence: float,
+    rng: random.Random,
+) -> Optional[Dict[str, Any]]:
+    """Bootstrap the candidate-minus-baseline delta of one metric; None if either side lacks it."""
+    ids = _paired_ids(cand, base)
+    if ids:
+        cand_rows = [cand.cases[i] for i in ids]
+        base_rows: Optional[List[CaseSample]] = [base.cases[i] for i in ids]
+        c_point, b_point = stat(metric, cand_rows), stat(metric, base_rows)
+    else:
+        cand_rows = list(cand.cases.values())
+        base_rows = list(base.cases.values()) or None
+        c_point, b_point = cand.value(metric), base.value(metric)
+    if c_point is None or b_point is None or not cand_rows:
+        return None
+
+    deltas: List[float] = []
+    rels: List[float] = []
+    n = len(cand_rows)
+    for _ in range(resamples):
+        if ids:
+            picks = rng.choices(range(n), k=n)
+            c = stat(metric, [cand_rows[j] for j in picks])
+            b = stat(metric, [base_rows[j] for j in picks])  # type: ignore[index]
+        else:
+            c = stat(metric, rng.choices(cand_rows, k=n))
+            b = stat(metric, rng.choices(base_rows, k=len(base_rows))) if base_rows else b_point
+        if c is None or b is None:
+            continue
+        deltas.append(c - b)
+        if b > 0:
+            rels.append((c - b) / b)
+    if not deltas:
+        return None
+
+    delta = c_point - b_point
+    lo, hi = _interval(deltas, confidence)
+    relative = delta / b_point if b_point > 0 else None
+    out: Dict[str, Any] = {
+        "metric": metric,
+        "baseline": round(b_point, 4),
+        "candidate": round(c_point, 4),
+        "delta": round(delta, 4),
+        "delta_ci": [round(lo, 4), round(hi, 4)],
+        "relative": round(relative, 4) if relative is not None else None,
+        "relative_ci": [round(v, 4) for v in _interval(rels, confidence)] if rels and relative is not None else None,
+    }
+    if metric == "accuracy":
+        worse, better = hi < 0, lo > 0
+        regression = worse and -delta > thresholds.max_accuracy_drop
+        out["threshold"] = {"max_drop": thresholds.max_accuracy_drop}
+    else:
+        worse, better = lo > 0, hi < 0
+        regression = (
+            worse
+            and delta > thresholds.min_latency_delta_ms
+            and (relative is None or relative > thresholds.max_latency_regression)
+        )
+        out["threshold"] = {
+            "max_relative": thresholds.max_latency_regression,
+            "min_delta_ms": thresholds.min_latency_delta_ms,
+        }
+    out["significant"] = worse or better
+    out["direction"] = "worse" if worse else "better" if better else "unchanged"
+    out["regression"] = regression
+    return out
+
+
+def compare_runs(
+    candidates: Dict[Tuple[str, str, str, str], RunSample],
+    baselines: Dict[Tuple[str, str, str, str], RunSample],
+    thresholds: Optional[Thresholds] = None,
+    resamples: int = 2000,
+    confidence: float = 0.95,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """Diff report of every candidate run against its baseline (same bench/provider/model/variant)."""
+    thresholds = thresholds or Thresholds()
+    rng = random.Random(seed)
+    runs: List[Dict[str, Any]] = []
+    for key in sorted(candidates):
+        cand = candidates[key]
+        bench_id, provider, model, variant = key
+        entry: Dict[str, Any] = {
+            "bench_id": bench_id, "provider": provider, "model": model, "variant": variant,
+            "cases": len(cand.cases),
+        }
+        base = baselines.get(key)
+        if base is None:
+            entry["status"] = "no_baseline"
+            runs.append(entry)
+            continue
+        entry["baseline_cases"] = len(base.cases) if base.cases else None
+        entry["paired"] = bool(_paired_ids(cand, base))
+        metrics = []
+        for metric in METRICS:
+            if metric != "accuracy" and "batch" in (cand.mode, base.mode):
+                continue
+            result = compare_metric(metric, cand, base, thresholds, resamples, confidence, rng)
+            if result is not None:
+                metrics.append(result)
+        entry["metrics"] = metrics
+        entry["status"] = "regression" if any(m["regression"] for m in metrics) else "ok"
+        runs.append(entry)
+    return {
+        "confidence": confidence,
+        "resamples": resamples,
+        "seed": seed,
+        "thresholds": {
+            "max_latency_regression": thresholds.max_latency_regression,
+            "min_latency_delta_ms": thresholds.min_latency_delta_ms,
+            "max_accuracy_drop": thresholds.max_accuracy_drop,
+        },
+        "runs": runs,
+        "regressions": sum(1 for r in runs if r["status"] == "regression"),
+        "compared": sum(1 for r in runs if r["status"] != "no_baseline"),
+    }
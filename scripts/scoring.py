@@ -0,0 +1,266 @@
+"""
+scoring: Batched scoring of bench responses against case expectations. Stdlib only.
+
+A ScoringEngine is compiled once per suite:
+- every `expected.contains` string of every case goes into one Aho-Corasick
+  automaton, so each response is lowercased once and scanned once no matter
+  how many patterns the suite has;
+- `expected.regex` patterns and `expected.json_shape` schemas are compiled
+  once per case (JSON shapes use recipe_schema's compiled validator);
+- `expected.criteria` is scored as a rubric by a judge. The default judge is a
+  local, deterministic keyword-overlap stub; pass another judge to use a model.
+
+Scorers are pluggable: @scorer("name") registers a function that runs when a
+case's `expected` has that key. score_batch() scores many responses at once and
+fans out to a process pool (spawned once per engine, built once per worker)
+when a batch is large enough to pay for it.
+"""
+from __future__ import annotations
+import json
+import multiprocessing
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from recipe_schema import SchemaError, compile_schema
+
+# Responses per batch below which scoring in-process beats shipping to workers
+PARALLEL_MIN_BATCH = 64
+# Fraction of a criterion's keywords the stub judge needs to see in the response
+JUDGE_KEYWORD_RATIO = 0.5
+
+# (criteria, response) -> one bool per criterion
+Judge = Callable[[List[str], str], List[bool]]
+# (engine, case id, response, lowered response) -> check dict with at least "ok"
+ScorerFn = Callable[["ScoringEngine", str, str, str], Dict[str, Any]]
+
+SCORERS: Dict[str, ScorerFn] = {}
+
+
+def scorer(name: str) -> Callable[[ScorerFn], ScorerFn]:
+    """Register a scorer for cases whose `expected` carries `name`."""
+    def register(fn: ScorerFn) -> ScorerFn:
+        SCORERS[name] = fn
+        return fn
+    return register
+
+
+class AhoCorasick:
+    """Multi-pattern substring matcher: one pass over the text finds every pattern."""
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        self.patterns: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Set[int]] = [set()]
+        for p in patterns:
+            self._add(p)
+        self._link()
+
+    def _add(self, pattern: str) -> None:
+        idx = len(self.patterns)
+        self.patterns.append(pattern)
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(set())
+                self._goto[state][ch] = nxt
+            state = nxt
+        self._out[state].add(idx)
+
+    def _link(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] |= self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> Set[int]:
+        """Indices of the patterns occurring in text."""
+        goto, fail, out = self._goto, self._fail, self._out
+        found: Set[int] = set(out[0])  # empty patterns match everywhere
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found |= out[state]
+        return found
+
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it no not of on one or the to with without least".split()
+)
+
+
+def keyword_judge(criteria: List[str], response: str) -> List[bool]:
+    """Local stub judge: a criterion is met when at least JUDGE_KEYWORD_RATIO of its
+    keywords appear in the response. Deterministic and offline; swap in a model judge
+    through ScoringEngine(judge=...) for real grading."""
+    words = set(_WORD_RE.findall(response.lower()))
+    met = []
+    for criterion in criteria:
+        keys = [w for w in _WORD_RE.findall(criterion.lower()) if len(w) > 2 and w not in _STOPWORDS]
+        met.append(bool(keys) and sum(k in words for k in keys) >= JUDGE_KEYWORD_RATIO * len(keys))
+    return met
+
+
+def extract_json(response: str) -> Any:
+    """Parse a response as JSON, else its first ```json fenced block, else its first {...}/[...] span."""
+    text = response.strip()
+    candidates = [text]
+    fence = re.search(r"```(?:json)?\s*([\s\S]*?)```", text)
+    if fence:
+        candidates.append(fence.group(1))
+    for open_ch, close_ch in (("{", "}"), ("[", "]")):
+        start, end = text.find(open_ch), text.rfind(close_ch)
+        if 0 <= start < end:
+            candidates.append(text[start:end + 1])
+    for c in candidates:
+        try:
+            return json.loads(c)
+        except ValueError:
+            continue
+    raise ValueError("no JSON found in response")
+
+
+def _as_list(value: Any) -> List[str]:
+    if isinstance(value, str):
+        return [value]
+    return [str(v) for v in value] if isinstance(value, list) else []
+
+
+class ScoringEngine:
+    """Compiled expectations for a suite of cases, keyed by case id."""
+
+    def __init__(
+        self, cases: Iterable[Dict[str, Any]], judge: Judge = keyword_judge, workers: Optional[int] = None
+    ) -> None:
+        # Only ids and expectations are kept (and shipped to pool workers)
+        self._specs = [{"id": c.get("id"), "expected": c.get("expected")} for c in cases if isinstance(c, dict)]
+        self.judge = judge
+        # Pool size for large batches (None: one per CPU; 1: always score in-process)
+        self.workers = workers
+        self.expected: Dict[str, Dict[str, Any]] = {}
+        self.contains: Dict[str, List[int]] = {}
+        self.regex: Dict[str, List["re.Pattern[str]"]] = {}
+        self.json_shape: Dict[str, Callable[[Any], List[str]]] = {}
+        pattern_ids: Dict[str, int] = {}
+        for case in self._specs:
+            cid = str(case.get("id"))
+            exp = case.get("expected") if isinstance(case.get("expected"), dict) else {}
+            self.expected[cid] = exp
+            ids = []
+            for token in _as_list(exp.get("contains")):
+                ids.append(pattern_ids.setdefault(token.lower(), len(pattern_ids)))
+            self.contains[cid] = ids
+            if "regex" in exp:
+                self.regex[cid] = [re.compile(p) for p in _as_list(exp["regex"])]
+            if isinstance(exp.get("json_shape"), dict):
+                try:
+                    self.json_shape[cid] = compile_schema(exp["json_shape"], root="response")
+                except SchemaError as e:
+                    raise ValueError(f"case {cid}: expected.json_shape: {e}") from None
+        self.automaton = AhoCorasick(pattern_ids)
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def score(self, case_id: Any, response: str) -> Tuple[bool, Dict[str, Any]]:
+        """(passed, checks) for one response; passes when every applicable scorer passes."""
+        cid = str(case_id)
+        exp = self.expected.get(cid, {})
+        lowered = response.lower()
+        checks: Dict[str, Any] = {"contains": SCORERS["contains"](self, cid, response, lowered)}
+        for name, fn in SCORERS.items():
+            if name != "contains" and name in exp:
+                checks[name] = fn(self, cid, response, lowered)
+        return all(c.get("ok") for c in checks.values()), checks
+
+    def score_timed(self, case_id: Any, response: str) -> Tuple[bool, Dict[str, Any], float]:
+        """score() plus the milliseconds it took."""
+        start = time.perf_counter()
+        passed, checks = self.score(case_id, response)
+        return passed, checks, (time.perf_counter() - start) * 1000.0
+
+    def score_batch(self, items: List[Tuple[Any, str]]) -> List[Tuple[bool, Dict[str, Any], float]]:
+        """Score [(case id, response), ...] in order, on the process pool for large batches.
+        Returns (passed, checks, scoring ms) per item."""
+        if self.workers == 1 or len(items) < PARALLEL_MIN_BATCH:
+            return [self.score_timed(cid, resp) for cid, resp in items]
+        if self._pool is None:
+            # spawn: generation threads may be running, which fork does not survive safely
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self._specs, self.judge),
+            )
+        return list(self._pool.map(_score_in_worker, items, chunksize=64))
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+@scorer("contains")
+def score_contains(engine: ScoringEngine, cid: str, response: str, lowered: str) -> Dict[str, Any]:
+    wanted = engine.contains.get(cid, [])
+    found = engine.automaton.find(lowered) if wanted else set()
+    return {"expected": _as_list(engine.expected.get(cid, {}).get("contains")), "ok": all(i in found for i in wanted)}
+
+
+@scorer("regex")
+def score_regex(engine: ScoringEngine, cid: str, response: str, lowered: str) -> Dict[str, Any]:
+    patterns = engine.regex.get(cid, [])
+    missing = [p.pattern for p in patterns if not p.search(response)]
+    return {"expected": [p.pattern for p in patterns], "missing": missing, "ok": not missing}
+
+
+@scorer("json_shape")
+def score_json_shape(engine: ScoringEngine, cid: str, response: str, lowered: str) -> Dict[str, Any]:
+    validate = engine.json_shape.get(cid)
+    if validate is None:
+        return {"ok": False, "errors": ["expected.json_shape must be an object schema"]}
+    try:
+        data = extract_json(response)
+    except ValueError as e:
+        return {"ok": False, "errors": [str(e)]}
+    errors = validate(data)
+    return {"ok": not errors, "errors": errors}
+
+
+@scorer("criteria")
+def score_criteria(engine: ScoringEngine, cid: str, response: str, lowered: str) -> Dict[str, Any]:
+    exp = engine.expected.get(cid, {})
+    criteria = _as_list(exp.get("criteria"))
+    met = engine.judge(criteria, response) if criteria else []
+    score = sum(met) / len(met) if met else 1.0
+    threshold = float(exp.get("criteria_threshold", 1.0))
+    return {"expected": criteria, "met": met, "score": round(score, 4), "ok": score >= threshold}
+
+
+_WORKER_ENGINE: Optional[ScoringEngine] = None
+
+
+def _init_worker(cases: List[Dict[str, Any]], judge: Judge) -> None:
+    global _WORKER_ENGINE
+    _WORKER_ENGINE = ScoringEngine(cases, judge=judge)
+
+
+def _score_in_worker(item: Tuple[Any, str]) -> Tuple[bool, Dict[str, Any], float]:
+    assert _WORKER_ENGINE is not None
+    return _WORKER_ENGINE.score_timed(*item)
@@ -0,0 +1,270 @@
+"""
+topology: Executor for multi-role recipes (`topology: multi`). Stdlib only.
+
+A multi-role recipe declares several roles, each with its own provider and
+model; `depends_on` names the roles whose outputs a role needs. The roles form
+a dependency DAG that is validated once (unknown dependencies, duplicate names
+and cycles are errors) and then run per case on one asyncio event loop:
+
+- every role starts as soon as all of its dependencies have finished, so
+  independent roles call their providers concurrently;
+- a role's prompt is the case text, then its `instructions`, then the output
+  of each dependency under a "## <role> output" heading;
+- the case response is the output of the sink role (the role nothing depends
+  on), or the sink outputs joined in role order when there are several.
+
+Each case records per-role start/end offsets, latency and time to first chunk,
+plus the critical path: walking back from the sink that finished last through
+the dependency that finished last, i.e. the chain of roles that bounded the
+case's latency. If a role fails, the roles still running are cancelled and
+the case fails with RoleFailed (provider errors after retries, deadlines).
+
+Adapters without a base URL echo their prompt (dry run), so a dry-run multi
+response contains the case text and every upstream output.
+"""
+from __future__ import annotations
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from adapters.base import PromptPrefix
+from adapters.resilience import REQUEST_ERRORS
+from prompt_assembly import assemble
+
+
+class RoleFailed(Exception):
+    """A role's provider call failed; `role` names it and `__cause__` holds the error."""
+
+    def __init__(self, role: str, err: BaseException) -> None:
+        super().__init__(f"role {role}: {type(err).__name__}: {err}")
+        self.role = role
+
+
+@dataclass(frozen=True)
+class Role:
+    name: str
+    provider: str
+    model: str
+    temperature: Optional[float] = None
+    depends_on: Tuple[str, ...] = ()
+    instructions: str = ""
+
+
+def parse_roles(header: Dict[str, Any]) -> List[Role]:
+    """Roles of a recipe header, validated as a DAG and returned in topological
+    order (declaration order among roles that are ready together).
+    Raises ValueError on malformed roles, unknown dependencies or cycles."""
+    raw = header.get("roles") if isinstance(header.get("roles"), list) else []
+    roles: List[Role] = []
+    seen = set()
+    for idx, r in enumerate(raw):
+        if not isinstance(r, dict) or not r.get("name") or not r.get("provider"):
+            raise ValueError(f"roles[{idx}]: needs a name and a provider")
+        name = str(r["name"])
+        if name in seen:
+            raise ValueError(f"roles[{idx}]: duplicate role name {name!r}")
+        seen.add(name)
+        deps = r.get("depends_on") or []
+        if isinstance(deps, str):
+            deps = [deps]
+        temp = r.get("temperature")
+        roles.append(Role(
+            name=name,
+            provider=str(r["provider"]),
+            model=str(r.get("model") or ""),
+            temperature=float(temp) if isinstance(temp, (int, float)) else None,
+            depends_on=tuple(str(d) for d in deps),
+            instructions=str(r.get("instructions") or "").strip(),
+        ))
+    for role in roles:
+        for dep in role.depends_on:
+            if dep not in seen:
+                raise ValueError(f"role {role.name}: depends on unknown role {dep!r}")
+            if dep == role.name:
+                raise ValueError(f"role {role.name}: depends on itself")
+
+    # Kahn's algorithm, keeping declaration order stable
+    order: List[Role] = []
+    done: set = set()
+    pending = list(roles)
+    while pending:
+        ready = [r for r in pending if all(d in done for d in r.depends_on)]
+        if not ready:
+            raise ValueError("roles: dependency cycle among " + ", ".join(r.name for r in pending))
+        for r in ready:
+            order.append(r)
+            done.add(r.name)
+        pending = [r for r in pending if r.name not in done]
+    return order
+
+
+@dataclass
+class RoleRun:
+    """Timing of one role within a case; offsets are ms since the case started."""
+    role: Role
+    start_ms: float = 0.0
+    end_ms: float = 0.0
+    ttft_ms: Optional[float] = None
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    report: Dict[str, Any] = field(default_factory=dict)
+    output: str = ""
+
+    @property
+    def latency_ms(self) -> float:
+        return self.end_ms - self.start_ms
+
+    def as_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "provider": self.role.provider,
+            "model": self.role.model,
+            "start_ms": round(self.start_ms, 3),
+            "end_ms": round(self.end_ms, 3),
+            "latency_ms": round(self.latency_ms, 3),
+            "ttft_ms": round(self.ttft_ms, 3) if self.ttft_ms is not None else None,
+            "prompt_tokens": self.prompt_tokens,
+            "output_tokens": self.output_tokens,
+        }
+        if self.report:
+            out["retries"] = self.report.get("retries", 0)
+            out["hedged"] = bool(self.report.get("hedged"))
+        return out
+
+
+@dataclass
+class TopologyRun:
+    """Outcome of one case: the response, per-role timings and the critical path."""
+    output: str
+    roles: Dict[str, RoleRun]
+    critical_path: List[str]
+    # perf_counter() at the first chunk of a sink role's output
+    first_chunk_at: Optional[float] = None
+
+    @property
+    def critical_path_ms(self) -> float:
+        return self.roles[self.critical_path[-1]].end_ms if self.critical_path else 0.0
+
+    @property
+    def prompt_tokens(self) -> int:
+        return sum(r.prompt_tokens for r in self.roles.values())
+
+    @property
+    def output_tokens(self) -> int:
+        return sum(r.output_tokens for r in self.roles.values())
+
+    def roles_dict(self) -> Dict[str, Dict[str, Any]]:
+        return {name: run.as_dict() for name, run in self.roles.items()}
+
+
+class TopologyExecutor:
+    """Runs a validated role DAG per case. `adapters` maps role name to the
+    role's adapter; roles share the recipe's prompt prefix."""
+
+    def __init__(self, roles: List[Role], adapters: Dict[str, Any], prefix: Optional[PromptPrefix] = None) -> None:
+        self.roles = roles
+        self.adapters = adapters
+        self.prefix = prefix
+        needed = {d for r in roles for d in r.depends_on}
+        self.sinks = [r.name for r in roles if r.name not in needed]
+        self._by_name = {r.name: r for r in roles}
+
+    @staticmethod
+    def role_prompt(role: Role, case_text: str, upstream: List[Tuple[str, str]]) -> str:
+        parts = [case_text]
+        if role.instructions:
+            parts.append(f"## {role.name} instructions\n{role.instructions}")
+        for name, output in upstream:
+            parts.append(f"## {name} output\n{output}")
+        return "\n\n".join(parts)
+
+    def critical_path(self, runs: Dict[str, RoleRun]) -> List[str]:
+        """Sink that finished last, back through the dependency that finished last at each step."""
+        node = max(self.sinks, key=lambda n: runs[n].end_ms)
+        path = [node]
+        while self._by_name[node].depends_on:
+            node = max(self._by_name[node].depends_on, key=lambda d: runs[d].end_ms)
+            path.append(node)
+        path.reverse()
+        return path
+
+    async def arun(self, case_text: str) -> TopologyRun:
+        t0 = time.perf_counter()
+        runs: Dict[str, RoleRun] = {}
+        firsts: Dict[str, float] = {}
+        tasks: Dict[str, "asyncio.Task[None]"] = {}
+
+        async def run_role(role: Role) -> None:
+            if role.depends_on:
+                await asyncio.gather(*(tasks[d] for d in role.depends_on))
+            run = RoleRun(role=role, start_ms=(time.perf_counter() - t0) * 1000.0)
+            prompt = assemble(self.prefix, self.role_prompt(
+                role, case_text, [(d, runs[d].output) for d in role.depends_on],
+            ))
+            run.prompt_tokens = prompt.tokens
+            adapter = self.adapters[role.name]
+            report: Optional[Dict[str, Any]] = {} if adapter.base_url else None
+            parts: List[str] = []
+            try:
+                async for chunk in adapter.astream(prompt.user, prompt.prefix, report):
+                    if not parts:
+                        firsts[role.name] = time.perf_counter()
+                        run.ttft_ms = (firsts[role.name] - t0) * 1000.0 - run.start_ms
+                    parts.append(chunk)
+            except REQUEST_ERRORS as e:
+                raise RoleFailed(role.name, e) from e
+            run.end_ms = (time.perf_counter() - t0) * 1000.0
+            run.output = "".join(parts)
+            run.output_tokens = len(parts)
+            run.report = report or {}
+            runs[role.name] = run
+
+        # Topological order: a role's dependencies already have tasks when it is scheduled
+        for role in self.roles:
+            tasks[role.name] = asyncio.ensure_future(run_role(role))
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+
+        sink_firsts = [firsts[n] for n in self.sinks if n in firsts]
+        return TopologyRun(
+            output="\n\n".join(runs[n].output for n in self.sinks),
+            roles={r.name: runs[r.name] for r in self.roles},
+            critical_path=self.critical_path(runs),
+            first_chunk_at=min(sink_firsts) if sink_firsts else None,
+        )
+
+    def run(self, case_text: str) -> TopologyRun:
+        return asyncio.run(self.arun(case_text))
+
+    def describe(self) -> Dict[str, Any]:
+        """Static shape of the DAG, for results blocks."""
+        return {
+            "roles": [
+                {"name": r.name, "provider": r.provider, "model": r.model, "depends_on": list(r.depends_on)}
+                for r in self.roles
+            ],
+            "sinks": list(self.sinks),
+        }
+
+
+def role_summary(totals: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Per-role mean latency and share of cases on the critical path, from run
+    totals (bench-run's RunTotals.as_dict: sum_role_latency_ms, role_cases,
+    critical_path_cases)."""
+    sums = totals.get("sum_role_latency_ms") or {}
+    counts = totals.get("role_cases") or {}
+    critical = totals.get("critical_path_cases") or {}
+    cases = int(totals.get("cases", 0))
+    return {
+        name: {
+            "cases": int(counts.get(name, 0)),
+            "avg_latency_ms": round(float(ms) / counts[name], 2) if counts.get(name) else 0.0,
+            "critical_path_share": round(int(critical.get(name, 0)) / cases, 4) if cases else 0.0,
+        }
+        for name, ms in sums.items()
+    }
@@ -0,0 +1,69 @@
+"""Provider adapters against the local stub server: connection reuse, pool bounds, timeouts."""
+import asyncio
+import os
+import sys
+import threading
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+from adapters import GeminiAdapter, OpenAIAdapter, QwenCoderAdapter  # noqa: E402
+from adapters.resilience import REQUEST_ERRORS, RequestPolicy  # noqa: E402
+from adapters.stub_server import StubServer  # noqa: E402
+from adapters.transport import close_pools  # noqa: E402
+
+ADAPTERS = (OpenAIAdapter, GeminiAdapter, QwenCoderAdapter)
+
+
+async def collect(adapter, prompt):
+    return "".join([chunk async for chunk in adapter.astream(prompt)])
+
+
+class StubAdapterTest(unittest.TestCase):
+    def tearDown(self):
+        close_pools()
+
+    def test_requests_reuse_connections(self):
+        for cls in ADAPTERS:
+            with self.subTest(adapter=cls.__name__), StubServer() as srv:
+                adapter = cls("stub-model", base_url=srv.url, pool_size=2)
+                for i in range(5):
+                    self.assertEqual(adapter.run(f"hello {i}"), f"hello {i}")
+                    self.assertEqual(asyncio.run(collect(adapter, f"stream {i}")), f"stream {i}")
+                stats = srv.stats()
+                self.assertEqual(stats["requests"], 10)
+                self.assertLess(stats["connections"], stats["requests"])
+                self.assertEqual(stats["connections"], 1)
+
+    def test_pool_size_bounds_connections(self):
+        for cls in ADAPTERS:
+            with self.subTest(adapter=cls.__name__), StubServer(stall_every=1, stall_s=0.05) as srv:
+                adapter = cls("stub-model", base_url=srv.url, pool_size=2)
+                outputs = []
+                threads = [
+                    threading.Thread(target=lambda i=i: outputs.append(adapter.run(f"hello {i}")))
+                    for i in range(8)
+                ]
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    t.join()
+                self.assertEqual(sorted(outputs), sorted(f"hello {i}" for i in range(8)))
+                self.assertEqual(srv.stats()["requests"], 8)
+                self.assertLessEqual(srv.stats()["connections"], 2)
+                self.assertLessEqual(adapter.pool.created, 2)
+
+    def test_timeouts_surface_as_request_errors(self):
+        for cls in ADAPTERS:
+            with self.subTest(adapter=cls.__name__), StubServer(stall_every=1, stall_s=0.5) as srv:
+                adapter = cls("stub-model", base_url=srv.url, timeout=0.1, policy=RequestPolicy(max_retries=0))
+                with self.assertRaises(REQUEST_ERRORS):
+                    adapter.run("hello")
+                with self.assertRaises(REQUEST_ERRORS):
+                    asyncio.run(collect(adapter, "hello"))
+                self.assertEqual(adapter.request_stats.as_dict()["failed"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
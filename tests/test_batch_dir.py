@@ -0,0 +1,79 @@
+"""bench-run --batch / --ingest round trip through the local directory batch endpoint."""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = os.path.join(ROOT, "scripts")
+sys.path.insert(0, SCRIPTS)
+
+from adapters.batch_dir import BatchDirectory  # noqa: E402
+
+CASES = {f"case-{i:03d}": f"hello {i}" for i in range(4)}
+FAILED = "case-002"
+
+
+class BatchRoundTripTest(unittest.TestCase):
+    def bench_run(self, cwd, *args):
+        out = subprocess.run(
+            [sys.executable, os.path.join(SCRIPTS, "bench-run.py"), *args],
+            cwd=cwd, check=True, capture_output=True, encoding="utf-8",
+        )
+        return json.loads(out.stdout)
+
+    def test_submit_process_ingest(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cases_dir = os.path.join(tmp, "bench", "batch", "cases")
+            os.makedirs(cases_dir)
+            for cid, text in CASES.items():
+                with open(os.path.join(cases_dir, f"{cid}.json"), "w", encoding="utf-8") as f:
+                    json.dump({"id": cid, "input": text, "expected": {"contains": [text]}}, f)
+            endpoint_root = os.path.join(tmp, "endpoint")
+
+            submitted = self.bench_run(
+                tmp, "--task", "batch", "--provider", "openai", "--model", "gpt-5",
+                "--batch", "--batch-dir", endpoint_root,
+            )
+            self.assertEqual(submitted["requests"], len(CASES))
+            (batch_id,) = submitted["batches"]
+
+            endpoint = BatchDirectory(endpoint_root)
+            self.assertEqual(endpoint.pending(), [batch_id])
+            endpoint.process(batch_id)
+
+            # Providers return results in any order, and fail single lines
+            out_path = endpoint.output_path(batch_id)
+            with open(out_path, encoding="utf-8") as f:
+                lines = [json.loads(line) for line in f if line.strip()]
+            lines.reverse()
+            for line in lines:
+                if line["custom_id"] == FAILED:
+                    line.update(response=None, error={"message": "model overloaded"})
+            with open(out_path, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(line) + "\n" for line in lines)
+
+            results = os.path.join(tmp, "results.json")
+            self.bench_run(tmp, "--ingest", submitted["manifest"], "--output", results)
+            with open(results, encoding="utf-8") as f:
+                block = json.load(f)
+
+            self.assertEqual(block["mode"], "batch")
+            self.assertEqual(block["batch"]["errors"], 1)
+            by_id = {c["id"]: c for c in block["cases"]}
+            self.assertEqual(list(by_id), list(CASES))
+            for cid, text in CASES.items():
+                case = by_id[cid]
+                if cid == FAILED:
+                    self.assertEqual(case["batch_error"], "model overloaded")
+                    self.assertFalse(case["passed"])
+                else:
+                    self.assertNotIn("batch_error", case)
+                    self.assertEqual(case["response_preview"], text)
+                    self.assertTrue(case["passed"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+"""Indexed case packs: index round trip, selectors, rebuild on change, and load_cases parity."""
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = os.path.join(ROOT, "scripts")
+sys.path.insert(0, SCRIPTS)
+
+from case_store import CaseStore, import_cases  # noqa: E402
+
+_spec = importlib.util.spec_from_file_location("bench_run", os.path.join(SCRIPTS, "bench-run.py"))
+bench_run = sys.modules["bench_run"] = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(bench_run)
+
+CASES = [
+    {"id": "auth-001", "input": "login", "tags": ["smoke", "auth"]},
+    {"id": "auth-002", "input": "logout", "tags": ["auth"]},
+    {"id": "pay-001", "input": "charge", "tags": ["smoke"]},
+    {"id": "pay-002", "input": "refund ✓"},
+]
+
+
+class CaseStoreTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.pack = os.path.join(self._tmp.name, "cases.jsonl")
+        self.index = os.path.join(self._tmp.name, "index.sqlite")
+        self.write_pack(CASES)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def write_pack(self, cases, blank_lines=False):
+        with open(self.pack, "w", encoding="utf-8", newline="\n") as f:
+            for case in cases:
+                f.write(json.dumps(case, ensure_ascii=False) + "\n")
+                if blank_lines:
+                    f.write("\n")
+
+    def store(self):
+        return CaseStore(self.pack, index_path=self.index)
+
+    def test_index_round_trip(self):
+        self.write_pack(CASES, blank_lines=True)
+        with self.store() as store:
+            self.assertEqual(len(store), len(CASES))
+            self.assertEqual(list(store.iter_cases()), CASES)
+            for case in CASES:
+                self.assertEqual(store.get(case["id"]), case)
+            self.assertIsNone(store.get("missing"))
+            self.assertIn("pay-002", store)
+        # A second open reuses the index as is
+        with self.store() as store:
+            self.assertEqual(list(store.iter_cases("all")), CASES)
+
+    def test_selectors(self):
+        with self.store() as store:
+            self.assertEqual(store.ids("tag:smoke"), ["auth-001", "pay-001"])
+            self.assertEqual(store.ids("re:^pay-"), ["pay-001", "pay-002"])
+            self.assertEqual(store.ids("pay-002,tag:auth"), ["auth-001", "auth-002", "pay-002"])
+            self.assertEqual(store.ids("missing"), [])
+
+    def test_changed_pack_is_reindexed(self):
+        with self.store() as store:
+            self.assertEqual(len(store), 4)
+        changed = [dict(CASES[0], input="login again", tags=["auth"])] + CASES[1:] + [{"id": "new-001", "tags": ["smoke"]}]
+        self.write_pack(changed)
+        with self.store() as store:
+            self.assertEqual(list(store.iter_cases()), changed)
+            self.assertEqual(store.ids("tag:smoke"), ["pay-001", "new-001"])
+
+    def test_repeated_id_keeps_last_occurrence(self):
+        self.write_pack(CASES + [dict(CASES[0], input="override", tags=[])])
+        with self.store() as store:
+            self.assertEqual(len(store), 4)
+            self.assertEqual(store.get("auth-001")["input"], "override")
+            self.assertEqual(store.ids("tag:smoke"), ["pay-001"])
+
+    def test_invalid_lines_are_reported(self):
+        with open(self.pack, "a", encoding="utf-8") as f:
+            f.write('{"input": "no id"}\n')
+        with self.assertRaisesRegex(ValueError, r"cases.jsonl:5: case without an id"):
+            self.store()
+
+
+class LoadCasesTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._cwd = os.getcwd()
+        os.chdir(self._tmp.name)
+        cases_dir = os.path.join("bench", "t", "cases")
+        os.makedirs(cases_dir)
+        for case in CASES:
+            with open(os.path.join(cases_dir, f"{case['id']}.json"), "w", encoding="utf-8") as f:
+                json.dump(case, f, ensure_ascii=False)
+        # No id: identified by its file stem
+        self.anonymous = os.path.join(cases_dir, "zz-anon.json")
+        with open(self.anonymous, "w", encoding="utf-8") as f:
+            json.dump({"input": "anon", "tags": ["smoke"]}, f)
+
+    def tearDown(self):
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def test_stem_ids_leave_the_shared_memo_untouched(self):
+        cases = bench_run.load_cases("t", "all")
+        self.assertEqual(cases[-1], {"id": "zz-anon", "input": "anon", "tags": ["smoke"]})
+        self.assertNotIn("id", bench_run.read_json_cached(self.anonymous))
+        self.assertEqual(bench_run.load_cases("t", "zz-anon"), [cases[-1]])
+
+    def test_pack_gives_the_same_cases_as_files(self):
+        from_files = bench_run.load_cases("t", "all")
+        self.assertEqual(import_cases("t")[1], len(from_files))
+        self.assertEqual(bench_run.load_cases("t", "all"), from_files)
+        self.assertEqual(bench_run.load_cases("t", "tag:smoke"), [c for c in from_files if "smoke" in c.get("tags", [])])
+
+
+if __name__ == "__main__":
+    unittest.main()
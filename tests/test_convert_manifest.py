@@ -0,0 +1,106 @@
+"""Incremental Markdown->POML conversion: hand-written POML is never overwritten or deleted."""
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+import convert_md_to_poml  # noqa: E402
+
+RECIPE = "---\nname: {name}\n---\nYou are the {name} agent.\n"
+HAND_WRITTEN = "<poml>\n  <role>Written by hand</role>\n</poml>\n"
+
+
+class ConvertManifestTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.src = Path(self._tmp.name) / "src"
+        self.dst = Path(self._tmp.name) / "poml"
+        for dept in ("design", "testing"):
+            (self.src / dept).mkdir(parents=True)
+        self.write_source("design", "alpha")
+        self.write_source("design", "beta")
+        self.write_source("testing", "gamma")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def write_source(self, dept, name, text=None):
+        (self.src / dept / f"{name}.md").write_text(text or RECIPE.format(name=name), encoding="utf-8")
+
+    def output(self, dept, name):
+        return self.dst / dept / f"{name}.poml"
+
+    def convert(self, *departments):
+        out, err = io.StringIO(), io.StringIO()
+        with redirect_stdout(out), redirect_stderr(err):
+            convert_md_to_poml.main([
+                "--src-root", str(self.src), "--dst-root", str(self.dst),
+                "--departments", *(departments or ("design", "testing")),
+            ])
+        self.stderr = err.getvalue()
+        return json.loads(out.getvalue().splitlines()[-1])
+
+    def test_second_run_converts_only_changed_sources(self):
+        self.assertEqual(self.convert()["created"], 3)
+        self.assertEqual(self.convert()["created"], 0)
+        self.write_source("design", "beta", RECIPE.format(name="beta v2"))
+        self.assertEqual(self.convert()["created"], 1)
+        self.assertIn("beta v2", self.output("design", "beta").read_text(encoding="utf-8"))
+
+    def test_never_overwrites_poml_it_did_not_generate(self):
+        self.output("design", "alpha").parent.mkdir(parents=True)
+        self.output("design", "alpha").write_text(HAND_WRITTEN, encoding="utf-8")
+        summary = self.convert()
+        self.assertEqual((summary["created"], summary["skipped"]), (2, 1))
+        self.assertEqual(self.output("design", "alpha").read_text(encoding="utf-8"), HAND_WRITTEN)
+
+        # Nor after its source changes
+        self.write_source("design", "alpha", RECIPE.format(name="alpha v2"))
+        self.convert()
+        self.assertEqual(self.output("design", "alpha").read_text(encoding="utf-8"), HAND_WRITTEN)
+
+    def test_never_overwrites_generated_poml_edited_by_hand(self):
+        self.convert()
+        self.output("design", "alpha").write_text(HAND_WRITTEN, encoding="utf-8")
+        self.write_source("design", "alpha", RECIPE.format(name="alpha v2"))
+        self.assertEqual(self.convert()["created"], 0)
+        self.assertEqual(self.output("design", "alpha").read_text(encoding="utf-8"), HAND_WRITTEN)
+
+    def test_clean_stale_removes_only_outputs_of_deleted_sources(self):
+        self.convert()
+        hand = self.output("design", "notes")
+        hand.write_text(HAND_WRITTEN, encoding="utf-8")
+        (self.src / "design" / "alpha.md").unlink()
+        (self.src / "testing" / "gamma.md").unlink()
+
+        # testing is not being converted this time, so its outputs are left alone
+        summary = self.convert("design")
+        self.assertEqual(summary["removed"], 1)
+        self.assertFalse(self.output("design", "alpha").exists())
+        self.assertTrue(self.output("design", "beta").exists())
+        self.assertTrue(self.output("testing", "gamma").exists())
+        self.assertEqual(hand.read_text(encoding="utf-8"), HAND_WRITTEN)
+
+        self.assertEqual(self.convert()["removed"], 1)
+        self.assertFalse(self.output("testing", "gamma").exists())
+        manifest = json.loads((self.dst / convert_md_to_poml.MANIFEST_NAME).read_text(encoding="utf-8"))
+        self.assertEqual(list(manifest["files"]), ["design/beta.poml"])
+
+    def test_clean_stale_keeps_edited_outputs_of_deleted_sources(self):
+        self.convert()
+        self.output("design", "alpha").write_text(HAND_WRITTEN, encoding="utf-8")
+        (self.src / "design" / "alpha.md").unlink()
+        self.assertEqual(self.convert()["removed"], 0)
+        self.assertEqual(self.output("design", "alpha").read_text(encoding="utf-8"), HAND_WRITTEN)
+        self.assertIn("keeping", self.stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
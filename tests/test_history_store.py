@@ -0,0 +1,109 @@
+"""History store: a run is recorded once, whatever HEAD is at aggregate time."""
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = os.path.join(ROOT, "scripts")
+sys.path.insert(0, SCRIPTS)
+
+from history_store import HistoryStore  # noqa: E402
+
+# A results block written before bench-run recorded git_sha
+LEGACY_RUN = {
+    "bench_id": "sample-task",
+    "provider": "openai",
+    "model": "gpt-5",
+    "variants": None,
+    "started_at": "2025-01-01T00:00:00+00:00",
+    "ended_at": "2025-01-01T00:00:01+00:00",
+    "totals": {"cases": 3, "passed": 2, "accuracy": 0.6667, "avg_latency_ms": 20.0, "tool_calls": 0},
+    "cases": [
+        {"id": "case-001", "passed": True, "latency_ms": 10.0},
+        {"id": "case-002", "passed": True, "latency_ms": 20.0},
+        {"id": "case-003", "passed": False, "latency_ms": 30.0},
+    ],
+}
+
+
+def git(cwd, *args):
+    subprocess.run(
+        ["git", "-c", "user.name=bench", "-c", "user.email=bench@example.com", *args],
+        cwd=cwd, check=True, capture_output=True,
+    )
+
+
+class ReaggregateTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.dir = self._tmp.name
+        results = os.path.join(self.dir, "bench", "sample-task", "results")
+        os.makedirs(results)
+        with open(os.path.join(results, "results_legacy.json"), "w", encoding="utf-8") as f:
+            json.dump(LEGACY_RUN, f)
+        git(self.dir, "init", "-q")
+        git(self.dir, "commit", "-q", "--allow-empty", "-m", "first")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def aggregate(self):
+        out = subprocess.run(
+            [sys.executable, os.path.join(SCRIPTS, "bench-aggregate.py")],
+            cwd=self.dir, check=True, capture_output=True, encoding="utf-8",
+        )
+        return json.loads(out.stdout)
+
+    def test_commit_between_aggregations_records_nothing(self):
+        self.assertEqual(self.aggregate()["recorded"], 1)
+        git(self.dir, "commit", "-q", "--allow-empty", "-m", "second")
+        self.assertEqual(self.aggregate()["recorded"], 0)
+
+        store = HistoryStore(os.path.join(self.dir, "bench", "history.sqlite"))
+        try:
+            self.assertEqual(len(store.commits()), 1)
+            self.assertEqual(len(list(store.rows())), 1)
+        finally:
+            store.close()
+        with open(os.path.join(self.dir, "recipes.lock.json"), encoding="utf-8") as f:
+            lock = json.load(f)
+        entry = lock["metrics"]["sample-task"]["openai"]["gpt-5"]["variants"]["default"]
+        self.assertEqual(entry["latency_ms"]["n"], 3)
+
+
+class RekeyTest(unittest.TestCase):
+    def test_version_1_store_drops_copies_recorded_under_later_heads(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "history.sqlite")
+            metric = {"accuracy": 0.5, "avg_latency_ms": 12.0, "tool_calls": 0, "ended_at": 1700000000.0}
+            store = HistoryStore(path)
+            store.append([("b", "openai", "gpt-5", "default", "a" * 40, metric)])
+            store.close()
+            # What version 1 did after a commit: the same run again under the new HEAD
+            db = sqlite3.connect(path)
+            with db:
+                db.execute(
+                    "INSERT INTO runs (run_key, git_sha, ended_at, recorded_at, bench_id, provider, model, variant, metric)"
+                    " VALUES ('old-key', ?, ?, 0, 'b', 'openai', 'gpt-5', 'default', ?)",
+                    ("b" * 40, metric["ended_at"], json.dumps(metric)),
+                )
+                db.execute("UPDATE meta SET value = '1' WHERE key = 'version'")
+            db.close()
+
+            store = HistoryStore(path)
+            try:
+                self.assertEqual([c["git_sha"] for c in store.commits()], ["a" * 40])
+                self.assertEqual(store.append([("b", "openai", "gpt-5", "default", "c" * 40, metric)]), 0)
+                with self.assertRaises(sqlite3.DatabaseError):
+                    with store.db:
+                        store.db.execute("DELETE FROM runs")
+            finally:
+                store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+"""JSONL results: one line per case as it finishes, and --resume after a crash."""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = os.path.join(ROOT, "scripts")
+sys.path.insert(0, SCRIPTS)
+
+from adapters.stub_server import StubServer  # noqa: E402
+
+
+def bench_run(*args, env=None):
+    subprocess.run(
+        [sys.executable, os.path.join(SCRIPTS, "bench-run.py"), "--task", "sample-task", "--cases", "all",
+         "--provider", "openai", "--model", "gpt-5", *args],
+        cwd=ROOT, env=env, check=True, capture_output=True,
+    )
+
+
+def read_lines(path):
+    if not os.path.isfile(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.endswith("\n")]
+
+
+class StreamingTest(unittest.TestCase):
+    def test_finished_cases_are_written_before_the_run_ends(self):
+        # The third request stalls; the first two cases must already be on disk by then
+        with tempfile.TemporaryDirectory() as tmp, StubServer(stall_every=3, stall_s=2.0) as srv:
+            out = os.path.join(tmp, "run.jsonl")
+            env = dict(os.environ, OPENAI_BASE_URL=srv.url)
+            proc = subprocess.Popen(
+                [sys.executable, os.path.join(SCRIPTS, "bench-run.py"), "--task", "sample-task", "--cases", "all",
+                 "--provider", "openai", "--model", "gpt-5", "--output", out],
+                cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                deadline = time.monotonic() + 10.0
+                while time.monotonic() < deadline and proc.poll() is None:
+                    if sum(rec["type"] == "case" for rec in read_lines(out)) >= 2:
+                        break
+                    time.sleep(0.05)
+                self.assertIsNone(proc.poll(), "run finished before any case line was written")
+                self.assertEqual([rec["id"] for rec in read_lines(out) if rec["type"] == "case"], ["case-001", "case-002"])
+            finally:
+                self.assertEqual(proc.wait(timeout=30), 0)
+            self.assertEqual([rec["type"] for rec in read_lines(out)], ["run", "case", "case", "case", "summary"])
+
+
+class ResumeTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.out = os.path.join(self._tmp.name, "run.jsonl")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_resume_after_half_written_line(self):
+        bench_run("--output", self.out)
+        with open(self.out, "rb") as f:
+            lines = f.read().splitlines(keepends=True)
+        # Crash while writing the second case line
+        with open(self.out, "wb") as f:
+            f.writelines(lines[:2])
+            f.write(lines[2][: len(lines[2]) // 2])
+
+        bench_run("--resume", self.out)
+        with open(self.out, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([rec["type"] for rec in records], ["run", "case", "run", "case", "case", "summary"])
+        self.assertEqual(records[2]["resumed_cases"], 1)
+        self.assertEqual([rec["id"] for rec in records if rec["type"] == "case"], ["case-001", "case-002", "case-003"])
+
+    def test_killed_run_resumes_to_the_same_totals(self):
+        with StubServer() as srv:
+            env = dict(os.environ, OPENAI_BASE_URL=srv.url)
+            reference = os.path.join(self._tmp.name, "reference.jsonl")
+            bench_run("--output", reference, env=env)
+        expected = read_lines(reference)[-1]["totals"]
+
+        # Kill the run while the third request hangs, then resume against a healthy endpoint
+        with StubServer(stall_every=3, stall_s=30.0) as srv:
+            proc = subprocess.Popen(
+                [sys.executable, os.path.join(SCRIPTS, "bench-run.py"), "--task", "sample-task", "--cases", "all",
+                 "--provider", "openai", "--model", "gpt-5", "--output", self.out],
+                cwd=ROOT, env=dict(os.environ, OPENAI_BASE_URL=srv.url),
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                deadline = time.monotonic() + 10.0
+                while time.monotonic() < deadline and len(read_lines(self.out)) < 3:
+                    time.sleep(0.05)
+            finally:
+                proc.kill()
+                proc.wait()
+        self.assertEqual([rec["type"] for rec in read_lines(self.out)], ["run", "case", "case"])
+
+        with StubServer() as srv:
+            bench_run("--resume", self.out, env=dict(os.environ, OPENAI_BASE_URL=srv.url))
+            self.assertEqual(srv.stats()["requests"], 1)
+        records = read_lines(self.out)
+        cases = [rec for rec in records if rec["type"] == "case"]
+        totals = records[-1]["totals"]
+        self.assertEqual([rec["id"] for rec in cases], ["case-001", "case-002", "case-003"])
+        for key in ("cases", "passed", "accuracy", "prompt_tokens", "output_tokens", "tool_calls", "errors"):
+            self.assertEqual(totals[key], expected[key], key)
+        self.assertAlmostEqual(totals["sum_latency_ms"], sum(rec["latency_ms"] for rec in cases), places=1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+"""LatencySketch: quantiles stay within the relative-accuracy bound of exact percentiles, merged or not."""
+import json
+import math
+import os
+import random
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+from latency_sketch import LatencySketch  # noqa: E402
+
+QUANTILES = (0.0, 0.01, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99, 0.999)
+
+
+def samples(n, seed=7):
+    rng = random.Random(seed)
+    # Long-tailed like real latencies: ~20 ms median, tail into the seconds
+    return [rng.lognormvariate(3.0, 1.2) for _ in range(n)]
+
+
+def exact(values, q):
+    """The sample the sketch's rank q * (n - 1) falls on."""
+    ordered = sorted(values)
+    return ordered[math.floor(q * (len(ordered) - 1))]
+
+
+class QuantileBoundTest(unittest.TestCase):
+    def assert_within_bound(self, sketch, values, quantiles=QUANTILES):
+        for q in quantiles:
+            with self.subTest(q=q):
+                want = exact(values, q)
+                self.assertLessEqual(abs(sketch.quantile(q) - want), sketch.relative_accuracy * want * (1 + 1e-9))
+
+    def test_quantiles_within_relative_accuracy(self):
+        values = samples(20000)
+        for accuracy in (0.01, 0.05):
+            with self.subTest(accuracy=accuracy):
+                sketch = LatencySketch(relative_accuracy=accuracy).extend(values)
+                self.assert_within_bound(sketch, values)
+                self.assertEqual(sketch.quantile(1.0), max(values))
+                self.assertEqual(sketch.count, len(values))
+
+    def test_merged_sketch_matches_one_built_from_all_samples(self):
+        values = samples(9000)
+        whole = LatencySketch().extend(values)
+        merged = LatencySketch()
+        for i in range(0, len(values), 1000):
+            merged.merge(LatencySketch().extend(values[i:i + 1000]))
+        self.assertEqual(merged.to_dict(), whole.to_dict())
+        self.assert_within_bound(merged, values)
+
+    def test_serialized_round_trip(self):
+        sketch = LatencySketch().extend(samples(500) + [0.0])
+        restored = LatencySketch.from_dict(json.loads(json.dumps(sketch.to_dict())))
+        self.assertEqual(restored.to_dict(), sketch.to_dict())
+        self.assertEqual(restored.summary(), sketch.summary())
+        self.assertEqual(restored.quantile(0.0), 0.0)
+
+    def test_collapsing_keeps_the_tail_accurate(self):
+        values = samples(20000)
+        self.assertGreater(len(LatencySketch().extend(values).bins), 256)
+        sketch = LatencySketch(max_bins=256).extend(values)
+        self.assertLessEqual(len(sketch.bins), 256)
+        self.assert_within_bound(sketch, values, quantiles=(0.9, 0.95, 0.99, 0.999))
+        merged = LatencySketch(max_bins=256).merge(LatencySketch(max_bins=256).extend(values[:5000]))
+        merged.merge(LatencySketch(max_bins=256).extend(values[5000:]))
+        self.assertLessEqual(len(merged.bins), 256)
+        self.assert_within_bound(merged, values, quantiles=(0.9, 0.95, 0.99, 0.999))
+
+    def test_empty_and_mismatched_sketches(self):
+        self.assertIsNone(LatencySketch().quantile(0.5))
+        with self.assertRaises(ValueError):
+            LatencySketch(relative_accuracy=0.01).merge(LatencySketch(relative_accuracy=0.02))
+
+
+if __name__ == "__main__":
+    unittest.main()
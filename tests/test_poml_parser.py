@@ -0,0 +1,106 @@
+"""Single-pass POML parser: same results as the regex parser it replaced, mmap input, header-only stop."""
+import glob
+import mmap
+import os
+import re
+import sys
+import tempfile
+import textwrap
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+import poml_parser  # noqa: E402
+from recipe_loader import SECTIONS, compile_source, decode_lets, read_header_lets  # noqa: E402
+
+CATALOG = sorted(glob.glob(os.path.join(ROOT, "poml", "**", "*.poml"), recursive=True))
+
+# The regex parser recipe_loader used before poml_parser
+LET_RE = re.compile(r"<let\s+name=\"([^\"]+)\"[^>]*>([\s\S]*?)</let>", re.MULTILINE)
+SECTION_RES = {
+    "role": re.compile(r"<role>([\s\S]*?)</role>"),
+    "task": re.compile(r"<task>([\s\S]*?)</task>"),
+    "output_format": re.compile(r"<output-format>([\s\S]*?)</output-format>"),
+}
+
+
+def legacy_parse(text):
+    """(lets, {section: text}) the way the regex parser read a POML file."""
+    text = text.replace("\r\n", "\n")
+    lets = decode_lets({m.group(1).strip(): m.group(2).strip() for m in LET_RE.finditer(text)})
+    sections = {}
+    for name, rx in SECTION_RES.items():
+        m = rx.search(text)
+        if m:
+            sections[name] = textwrap.dedent(m.group(1).strip("\n")).strip()
+    return lets, sections
+
+
+def parse(path, data):
+    recipe = compile_source(path, data, "")
+    return recipe.lets, {name: getattr(recipe, name) for name in SECTIONS if getattr(recipe, name)}
+
+
+class CatalogParityTest(unittest.TestCase):
+    def test_catalog_parses_as_before(self):
+        self.assertTrue(CATALOG)
+        for path in CATALOG:
+            with self.subTest(path=os.path.relpath(path, ROOT)):
+                with open(path, "rb") as f:
+                    data = f.read()
+                self.assertEqual(parse(path, data), legacy_parse(data.decode("utf-8-sig")))
+
+    def test_header_only_stops_at_the_body_with_the_same_lets(self):
+        for path in CATALOG:
+            with self.subTest(path=os.path.relpath(path, ROOT)):
+                with open(path, "rb") as f:
+                    data = f.read()
+                root = poml_parser.parse_poml(data, header_only=True)
+                self.assertEqual({n.tag for n in root.iter()} & poml_parser.BODY_TAGS, set())
+                self.assertEqual(read_header_lets(path)[1], legacy_parse(data.decode("utf-8-sig"))[0])
+
+
+class LargeFileTest(unittest.TestCase):
+    def test_file_above_mmap_threshold(self):
+        for path in CATALOG:
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+            if "<task>" in text:
+                break
+        filler = "\n".join(f"- step {i}: check List<String> and a < b before {i + 1}" for i in range(2000))
+        text = text.replace("<task>", f"<task>\n{filler}\n", 1)
+        text = text.replace("<role>", '<let name="notes">{"lines": ["a", "b"]}</let>\n<role>', 1)
+        self.assertGreater(len(text.encode("utf-8")), poml_parser.MMAP_MIN_BYTES)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "large.poml")
+            with open(path, "w", encoding="utf-8", newline="\r\n") as f:
+                f.write(text)
+            with poml_parser.open_source(path) as data:
+                self.assertIsInstance(data, mmap.mmap)
+                got = parse(path, data)
+            with open(path, encoding="utf-8", newline="") as f:
+                expected = legacy_parse(f.read())
+            self.assertEqual(got, expected)
+            self.assertIn("step 1999", got[1]["task"])
+            self.assertEqual(got[0]["notes"], {"lines": ["a", "b"]})
+            self.assertEqual(read_header_lets(path)[1], expected[0])
+
+
+class MarkupTest(unittest.TestCase):
+    def test_unbalanced_markup_comments_and_raw_lets(self):
+        root = poml_parser.parse_poml(
+            b'\xef\xbb\xbf<poml>\n<!-- <task>not this</task> -->\n'
+            b'<let name="json">{"x": "<b>"}</let>\n'
+            b'<role>Uses Map<K, V> and <b>bold</role>\n'
+            b'<task>Do it</task>\n<output-format/>\n</poml>'
+        )
+        self.assertEqual(poml_parser.lets(root), {"json": '{"x": "<b>"}'})
+        self.assertEqual(poml_parser.section(root, "role"), "Uses Map<K, V> and <b>bold")
+        self.assertEqual(poml_parser.section(root, "task"), "Do it")
+        self.assertEqual(poml_parser.section(root, "output-format"), "")
+        self.assertIsNone(poml_parser.section(root, "constraints"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+"""bench-run against a rate-limited stub: 429s shrink the AIMD window and every case still completes."""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = os.path.join(ROOT, "scripts")
+sys.path.insert(0, SCRIPTS)
+
+from adapters.stub_server import StubServer  # noqa: E402
+
+CASES = 12
+
+
+class RateLimitTest(unittest.TestCase):
+    def test_throttled_run_completes_with_throttle_counts(self):
+        with tempfile.TemporaryDirectory() as tmp, StubServer(rps=3, retry_after="0.3") as srv:
+            cases_dir = os.path.join(tmp, "bench", "throttle", "cases")
+            os.makedirs(cases_dir)
+            for i in range(CASES):
+                with open(os.path.join(cases_dir, f"case-{i:03d}.json"), "w", encoding="utf-8") as f:
+                    json.dump({"id": f"case-{i:03d}", "input": f"hello {i}", "expected": {"contains": [f"hello {i}"]}}, f)
+            out = os.path.join(tmp, "results.json")
+            env = dict(os.environ, OPENAI_BASE_URL=srv.url)
+            subprocess.run(
+                [sys.executable, os.path.join(SCRIPTS, "bench-run.py"), "--task", "throttle",
+                 "--provider", "openai", "--model", "gpt-5", "--concurrency", "4", "--output", out],
+                cwd=tmp, env=env, check=True, capture_output=True,
+            )
+            with open(out, encoding="utf-8") as f:
+                block = json.load(f)
+
+            self.assertGreater(srv.stats()["throttled"], 0)
+            rate = block["rate_limit"]
+            self.assertGreater(rate["throttle_events"], 0)
+            self.assertLess(rate["min_concurrency_limit"], 4)
+            self.assertEqual(rate["completed"], CASES)
+
+            cases = block["cases"]
+            self.assertEqual(len(cases), CASES)
+            self.assertTrue(all(c["passed"] and "error" not in c for c in cases))
+            self.assertEqual(block["totals"]["throttled"], sum(c["throttled"] for c in cases))
+            self.assertEqual(block["totals"]["throttled"], rate["throttle_events"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+"""bench-aggregate --compare exit codes: pass, regression, and nothing to compare."""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = os.path.join(ROOT, "scripts")
+
+
+def results(model, latency_ms):
+    cases = [{"id": f"case-{i:03d}", "passed": True, "latency_ms": latency_ms + i % 3} for i in range(40)]
+    return {
+        "bench_id": "sample-task",
+        "provider": "openai",
+        "model": model,
+        "variants": None,
+        "started_at": "2025-01-01T00:00:00+00:00",
+        "ended_at": "2025-01-01T00:00:01+00:00",
+        "totals": {"cases": len(cases), "passed": len(cases), "accuracy": 1.0},
+        "cases": cases,
+    }
+
+
+class CompareTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.dir = self._tmp.name
+        self.baseline = self.write("baseline.json", results("gpt-5", 100.0))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def write(self, name, data):
+        path = os.path.join(self.dir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        return path
+
+    def compare(self, candidate):
+        proc = subprocess.run(
+            [sys.executable, os.path.join(SCRIPTS, "bench-aggregate.py"),
+             "--compare", self.baseline, "--candidate", candidate, "--bootstrap", "300"],
+            cwd=self.dir, capture_output=True, encoding="utf-8",
+        )
+        return proc.returncode, json.loads(proc.stdout) if proc.stdout else None
+
+    def test_unchanged_run_passes(self):
+        rc, out = self.compare(self.write("same.json", results("gpt-5", 100.0)))
+        self.assertEqual((rc, out["compared"]), (0, 1))
+
+    def test_slower_run_fails(self):
+        rc, out = self.compare(self.write("slow.json", results("gpt-5", 200.0)))
+        self.assertEqual((rc, out["regressions"]), (1, 1))
+
+    def test_no_matching_baseline_fails(self):
+        rc, out = self.compare(self.write("other.json", results("gpt-4o", 100.0)))
+        self.assertEqual((rc, out["compared"]), (2, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+"""Request policy against the stub server: retries, deadlines and hedging."""
+import asyncio
+import os
+import sys
+import time
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+from adapters import OpenAIAdapter  # noqa: E402
+from adapters.ratelimit import RateLimiter  # noqa: E402
+from adapters.resilience import DeadlineExceeded, RequestPolicy, get_window  # noqa: E402
+from adapters.stub_server import StubServer  # noqa: E402
+from adapters.transport import TransportError, close_pools  # noqa: E402
+
+HEDGE = RequestPolicy(max_retries=0, hedge=True, hedge_min_samples=20, hedge_min_delay_s=0.05)
+
+
+def fast_window(model):
+    """A time-to-first-chunk window that hedges after hedge_min_delay_s."""
+    window = get_window("openai", model)
+    for _ in range(20):
+        window.add(0.001)
+    return window
+
+
+async def collect(adapter, prompt, report, during=None):
+    if during is not None:
+        asyncio.get_running_loop().call_later(*during)
+    return "".join([chunk async for chunk in adapter.astream(prompt, report=report)])
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return predicate()
+
+
+class RetryTest(unittest.TestCase):
+    def tearDown(self):
+        close_pools()
+
+    def test_retries_recover_from_every_other_request_failing(self):
+        policy = RequestPolicy(max_retries=2, backoff_base_s=0.01)
+        with StubServer(fail_every=2) as srv:
+            adapter = OpenAIAdapter("retry", base_url=srv.url, policy=policy)
+            reports = [{} for _ in range(4)]
+            for i, report in enumerate(reports):
+                self.assertEqual(adapter.run(f"hello {i}", report=report), f"hello {i}")
+            stats = srv.stats()
+        # Requests 2, 4 and 6 fail; each is resent once
+        self.assertEqual([r["retries"] for r in reports], [0, 1, 1, 1])
+        self.assertEqual((stats["requests"], stats["failed"]), (7, 3))
+        self.assertEqual(adapter.request_stats.as_dict()["retries"], 3)
+
+    def test_retries_are_bounded(self):
+        policy = RequestPolicy(max_retries=2, backoff_base_s=0.01)
+        with StubServer(fail_every=1) as srv:
+            adapter = OpenAIAdapter("retry-bounded", base_url=srv.url, policy=policy)
+            report = {}
+            with self.assertRaises(TransportError):
+                asyncio.run(collect(adapter, "hello", report))
+            self.assertEqual(srv.stats()["requests"], 3)
+        self.assertEqual(report["retries"], 2)
+        self.assertEqual(adapter.request_stats.as_dict()["failed"], 1)
+
+
+class DeadlineTest(unittest.TestCase):
+    def tearDown(self):
+        close_pools()
+
+    def test_deadline_cuts_retries_short(self):
+        policy = RequestPolicy(deadline_s=0.5, max_retries=100, backoff_base_s=0.05)
+        with StubServer(fail_every=1) as srv:
+            for call in ("run", "astream"):
+                with self.subTest(call=call):
+                    adapter = OpenAIAdapter(f"deadline-{call}", base_url=srv.url, policy=policy)
+                    report = {}
+                    began = time.monotonic()
+                    with self.assertRaises(DeadlineExceeded):
+                        if call == "run":
+                            adapter.run("hello", report=report)
+                        else:
+                            asyncio.run(collect(adapter, "hello", report))
+                    self.assertLess(time.monotonic() - began, 1.0)
+                    self.assertGreater(report["retries"], 0)
+                    self.assertLess(report["retries"], 100)
+                    self.assertEqual(adapter.request_stats.as_dict()["deadline_exceeded"], 1)
+
+    def test_deadline_bounds_a_stalled_stream(self):
+        policy = RequestPolicy(deadline_s=0.3, max_retries=2)
+        with StubServer(stall_every=1, stall_s=2.0) as srv:
+            adapter = OpenAIAdapter("deadline-stall", base_url=srv.url, policy=policy)
+            began = time.monotonic()
+            with self.assertRaises(DeadlineExceeded):
+                asyncio.run(collect(adapter, "hello", {}))
+            self.assertLess(time.monotonic() - began, 1.0)
+
+
+class HedgeTest(unittest.TestCase):
+    def tearDown(self):
+        close_pools()
+
+    def test_hedge_wins_over_a_stalled_primary(self):
+        window = fast_window("hedge")
+        prompt = "one two three four five six"
+        # Requests 2, 4, ... stall: request 1 warms the pool, 2 is the primary, 3 the hedge
+        with StubServer(stall_every=2, stall_s=0.5) as srv:
+            adapter = OpenAIAdapter("hedge", base_url=srv.url, policy=HEDGE)
+            self.assertEqual(adapter.run("warm up"), "warm up")
+            report = {}
+            began = time.monotonic()
+            self.assertEqual(asyncio.run(collect(adapter, prompt, report)), prompt)
+            self.assertLess(time.monotonic() - began, 0.4)
+            self.assertTrue(report["hedged"] and report["hedge_won"])
+            self.assertEqual(adapter.request_stats.as_dict()["hedge_wins"], 1)
+            # The slow primary is counted too, not just the winner
+            self.assertEqual(len(window), 22)
+
+            # The cancelled primary's connection was aborted; the hedge's is reused
+            self.assertTrue(wait_for(lambda: srv.stats().get("client_aborts", 0) == 1))
+            self.assertEqual(adapter.run("after"), "after")
+            self.assertEqual(srv.stats()["connections"], 2)
+
+
+class HedgeLimiterTest(unittest.TestCase):
+    def tearDown(self):
+        close_pools()
+
+    def test_limiter_queue_time_neither_hedges_nor_counts_as_latency(self):
+        window = fast_window("queued")
+        limiter = RateLimiter()
+        limiter.throttled(0.4)
+        with StubServer() as srv:
+            adapter = OpenAIAdapter("queued", base_url=srv.url, limiter=limiter, policy=HEDGE)
+            report = {}
+            self.assertEqual(asyncio.run(collect(adapter, "hello", report)), "hello")
+            self.assertEqual(srv.stats()["requests"], 1)
+        self.assertFalse(report["hedged"])
+        self.assertLess(window.quantile(1.0), 0.3)
+
+    def test_no_hedge_while_the_limiter_cools_down(self):
+        fast_window("cooling")
+        limiter = RateLimiter()
+        with StubServer(stall_every=1, stall_s=0.3) as srv:
+            adapter = OpenAIAdapter("cooling", base_url=srv.url, limiter=limiter, policy=HEDGE)
+            report = {}
+            # Another caller is throttled while this request is in flight
+            self.assertEqual(asyncio.run(collect(adapter, "hello", report, (0.01, limiter.throttled, 1.0))), "hello")
+            self.assertEqual(srv.stats()["requests"], 1)
+        self.assertFalse(report["hedged"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+"""Response cache: entries are keyed by endpoint, so dry-run echoes never answer real runs."""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = os.path.join(ROOT, "scripts")
+sys.path.insert(0, SCRIPTS)
+
+from adapters.stub_server import StubServer  # noqa: E402
+
+
+class DryRunCacheTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.cache = os.path.join(self._tmp.name, "responses.sqlite")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def run_bench(self, name, base_url=None):
+        env = {k: v for k, v in os.environ.items() if not k.endswith("_BASE_URL")}
+        if base_url is not None:
+            env["OPENAI_BASE_URL"] = base_url
+        out = os.path.join(self._tmp.name, name)
+        subprocess.run(
+            [sys.executable, os.path.join(SCRIPTS, "bench-run.py"), "--task", "sample-task", "--cases", "all",
+             "--provider", "openai", "--model", "gpt-5", "--retries", "0",
+             "--cache", "readwrite", "--cache-path", self.cache, "--output", out],
+            cwd=ROOT, env=env, check=True, capture_output=True,
+        )
+        with open(out, encoding="utf-8") as f:
+            return json.load(f)["totals"]
+
+    def test_dry_run_entries_do_not_answer_a_real_endpoint(self):
+        self.assertEqual(self.run_bench("dry.json")["cache_misses"], 3)
+        self.assertEqual(self.run_bench("dry-again.json")["cache_hits"], 3)
+        with StubServer(fail_every=1) as srv:
+            totals = self.run_bench("real.json", srv.url)
+            self.assertEqual(srv.stats()["requests"], 3)
+        self.assertEqual(totals["cache_hits"], 0)
+        self.assertEqual(totals["errors"], 3)
+
+    def test_real_responses_are_cached_per_endpoint(self):
+        with StubServer() as srv:
+            self.run_bench("first.json", srv.url)
+            totals = self.run_bench("second.json", srv.url)
+            self.assertEqual(srv.stats()["requests"], 3)
+        self.assertEqual(totals["cache_hits"], 3)
+        self.assertEqual(self.run_bench("dry.json")["cache_hits"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+"""bench-aggregate ResultsIndex: only new or changed results files are parsed; deleted ones drop their rows."""
+import importlib.util
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = os.path.join(ROOT, "scripts")
+sys.path.insert(0, SCRIPTS)
+
+_spec = importlib.util.spec_from_file_location("bench_aggregate", os.path.join(SCRIPTS, "bench-aggregate.py"))
+bench_aggregate = sys.modules["bench_aggregate"] = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(bench_aggregate)
+
+
+def results(bench_id, accuracy, latencies=(100.0, 200.0)):
+    return {
+        "bench_id": bench_id, "provider": "openai", "model": "gpt-5",
+        "ended_at": "2026-01-01T00:00:00Z",
+        "totals": {"accuracy": accuracy, "avg_latency_ms": sum(latencies) / len(latencies), "tool_calls": 0},
+        "cases": [{"id": f"case-{i}", "latency_ms": ms} for i, ms in enumerate(latencies)],
+    }
+
+
+class ResultsIndexTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.index_path = os.path.join(self._tmp.name, "index", "aggregate-index.sqlite")
+        self.a = self.write("a.json", results("alpha", 0.5))
+        self.b = self.write("b.json", results("beta", 0.75))
+        self.index = bench_aggregate.ResultsIndex(self.index_path)
+
+    def tearDown(self):
+        self.index.close()
+        self._tmp.cleanup()
+
+    def write(self, name, data, mtime=None):
+        path = os.path.join(self._tmp.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def refresh(self, *paths):
+        return self.index.refresh(list(paths or (self.a, self.b)), workers=1)
+
+    def accuracies(self):
+        return {bench_id: m.accuracy for bench_id, _, _, _, m in self.index.rows()}
+
+    def test_unchanged_files_are_not_reparsed(self):
+        self.assertEqual(self.refresh(), {"parsed": 2, "unchanged": 0, "removed": 0})
+        self.assertEqual(self.accuracies(), {"alpha": 0.5, "beta": 0.75})
+        self.assertEqual(self.refresh(), {"parsed": 0, "unchanged": 2, "removed": 0})
+        # Rewritten with the same content: only its mtime is updated
+        self.write("a.json", results("alpha", 0.5), mtime=os.stat(self.a).st_mtime + 10)
+        self.assertEqual(self.refresh(), {"parsed": 0, "unchanged": 2, "removed": 0})
+        self.assertEqual(self.accuracies(), {"alpha": 0.5, "beta": 0.75})
+
+    def test_changed_file_is_reparsed_and_its_rows_replaced(self):
+        self.refresh()
+        self.write("b.json", results("beta", 1.0, latencies=(50.0, 60.0, 70.0)), mtime=os.stat(self.b).st_mtime + 10)
+        self.assertEqual(self.refresh(), {"parsed": 1, "unchanged": 1, "removed": 0})
+        self.assertEqual(self.accuracies(), {"alpha": 0.5, "beta": 1.0})
+        beta = [m for bench_id, _, _, _, m in self.index.rows() if bench_id == "beta"]
+        self.assertEqual(len(beta), 1)
+        self.assertEqual(beta[0].latency_sketch["count"], 3)
+
+    def test_deleted_file_drops_its_rows(self):
+        self.refresh()
+        os.remove(self.a)
+        self.assertEqual(self.refresh(self.b), {"parsed": 0, "unchanged": 1, "removed": 1})
+        self.assertEqual(self.accuracies(), {"beta": 0.75})
+        # Recreated under the same path, it is parsed again
+        self.write("a.json", results("alpha", 0.25))
+        self.assertEqual(self.refresh(), {"parsed": 1, "unchanged": 1, "removed": 0})
+        self.assertEqual(self.accuracies(), {"alpha": 0.25, "beta": 0.75})
+
+    def test_index_persists_and_version_change_rebuilds(self):
+        self.refresh()
+        self.index.close()
+        self.index = bench_aggregate.ResultsIndex(self.index_path)
+        self.assertEqual(self.refresh(), {"parsed": 0, "unchanged": 2, "removed": 0})
+        self.index.close()
+
+        with sqlite3.connect(self.index_path) as db:
+            db.execute("UPDATE meta SET value = ? WHERE key = 'version'", (str(bench_aggregate.INDEX_VERSION - 1),))
+        db.close()
+        self.index = bench_aggregate.ResultsIndex(self.index_path)
+        self.assertEqual(list(self.index.rows()), [])
+        self.assertEqual(self.refresh(), {"parsed": 2, "unchanged": 0, "removed": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
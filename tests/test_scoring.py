@@ -0,0 +1,118 @@
+"""Scoring engine: the multi-pattern matcher, the scorer registry and batch/pool parity."""
+import os
+import random
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+import scoring  # noqa: E402
+from scoring import PARALLEL_MIN_BATCH, AhoCorasick, ScoringEngine, scorer  # noqa: E402
+
+WORDS = ["alpha", "beta", "gamma", "delta", "alphabet", "bet", "a", "ma"]
+
+
+def suite(n):
+    """n cases mixing every built-in scorer, and responses that pass some of them."""
+    rng = random.Random(7)
+    cases, items = [], []
+    for i in range(n):
+        words = rng.sample(WORDS, 3)
+        expected = {"contains": words[:2]}
+        if i % 3 == 0:
+            expected["regex"] = [r"\d{3}", words[2]]
+        if i % 4 == 0:
+            expected["json_shape"] = {"type": "object", "required": ["id"], "properties": {"id": {"type": "integer"}}}
+        if i % 5 == 0:
+            expected["criteria"] = [f"mentions {words[0]} and {words[1]}", "explains the gamma rays"]
+            expected["criteria_threshold"] = 0.5
+        cases.append({"id": f"case-{i:03d}", "expected": expected})
+        said = rng.sample(WORDS, 4)
+        response = " ".join(said).upper() if i % 2 else " ".join(said)
+        if i % 7 == 0:
+            response += f' {{"id": {i}}} 123'
+        items.append((f"case-{i:03d}", response))
+    return cases, items
+
+
+class AhoCorasickTest(unittest.TestCase):
+    def test_overlapping_and_suffix_patterns(self):
+        ac = AhoCorasick(["he", "she", "his", "hers"])
+        self.assertEqual({ac.patterns[i] for i in ac.find("ushers")}, {"he", "she", "hers"})
+        ac = AhoCorasick(["abcd", "bcd", "cd", "d", "bce"])
+        self.assertEqual({ac.patterns[i] for i in ac.find("xabcdx")}, {"abcd", "bcd", "cd", "d"})
+        ac = AhoCorasick(["aaa", "aa", "a"])
+        self.assertEqual({ac.patterns[i] for i in ac.find("aa")}, {"aa", "a"})
+        self.assertEqual(ac.find("bbb"), set())
+
+    def test_empty_pattern_matches_everywhere(self):
+        ac = AhoCorasick(["", "x"])
+        self.assertEqual(ac.find(""), {0})
+
+    def test_agrees_with_substring_search(self):
+        rng = random.Random(1)
+        for _ in range(200):
+            patterns = list({"".join(rng.choices("ab", k=rng.randint(1, 4))) for _ in range(6)})
+            text = "".join(rng.choices("abc", k=rng.randint(0, 20)))
+            ac = AhoCorasick(patterns)
+            self.assertEqual({ac.patterns[i] for i in ac.find(text)}, {p for p in patterns if p in text}, (patterns, text))
+
+
+class ScorerTest(unittest.TestCase):
+    def test_each_builtin_scorer_reports_its_check(self):
+        engine = ScoringEngine([{"id": "c", "expected": {
+            "contains": ["Hello"],
+            "regex": [r"\d+"],
+            "json_shape": {"type": "object", "required": ["ok"]},
+            "criteria": ["greets the world"],
+        }}])
+        passed, checks = engine.score("c", 'hello world, greets you 42 times: {"ok": true}')
+        self.assertTrue(passed)
+        self.assertEqual(set(checks), {"contains", "regex", "json_shape", "criteria"})
+
+        passed, checks = engine.score("c", "HELLO")
+        self.assertFalse(passed)
+        self.assertTrue(checks["contains"]["ok"])
+        self.assertEqual(checks["regex"]["missing"], [r"\d+"])
+        self.assertFalse(checks["json_shape"]["ok"])
+        self.assertEqual(checks["criteria"]["met"], [False])
+
+    def test_registered_scorer_runs_for_its_key(self):
+        @scorer("max_length")
+        def score_max_length(engine, cid, response, lowered):
+            return {"ok": len(response) <= engine.expected[cid]["max_length"]}
+
+        try:
+            engine = ScoringEngine([{"id": "c", "expected": {"max_length": 5}}, {"id": "d", "expected": {}}])
+            self.assertEqual(engine.score("c", "short"), (True, {"contains": {"expected": [], "ok": True}, "max_length": {"ok": True}}))
+            self.assertFalse(engine.score("c", "too long")[0])
+            self.assertNotIn("max_length", engine.score("d", "too long")[1])
+        finally:
+            del scoring.SCORERS["max_length"]
+
+
+class BatchParityTest(unittest.TestCase):
+    def check(self, n, workers):
+        cases, items = suite(n)
+        engine = ScoringEngine(cases, workers=workers)
+        try:
+            batch = engine.score_batch(items)
+            self.assertEqual(engine._pool is not None, n >= PARALLEL_MIN_BATCH)
+        finally:
+            engine.close()
+        single = ScoringEngine(cases, workers=1)
+        self.assertEqual([(passed, checks) for passed, checks, _ in batch], [single.score(cid, resp) for cid, resp in items])
+        verdicts = [passed for passed, _, _ in batch]
+        self.assertIn(True, verdicts)
+        self.assertIn(False, verdicts)
+
+    def test_small_batch_matches_per_case_scoring(self):
+        self.check(PARALLEL_MIN_BATCH - 1, workers=2)
+
+    def test_pooled_batch_matches_per_case_scoring(self):
+        self.check(PARALLEL_MIN_BATCH * 2, workers=2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+"""bench-run serve: consecutive requests to one daemon each run with their own cwd and endpoint env."""
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = os.path.join(ROOT, "scripts")
+sys.path.insert(0, SCRIPTS)
+
+from adapters.stub_server import StubServer  # noqa: E402
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "needs Unix domain sockets")
+class ServeTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.dir = self._tmp.name
+        self.sock = os.path.join(self.dir, "bench.sock")
+        self.env = {k: v for k, v in os.environ.items() if not k.endswith(("_BASE_URL", "_API_KEY"))}
+        self.daemon = subprocess.Popen(
+            [sys.executable, os.path.join(SCRIPTS, "bench-run.py"), "serve", "--socket", self.sock],
+            cwd=self.dir, env=self.env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + 10.0
+        while not os.path.exists(self.sock):
+            self.assertIsNone(self.daemon.poll(), "server exited")
+            self.assertLess(time.monotonic(), deadline, "server did not start")
+            time.sleep(0.05)
+        # A task that only exists under this directory
+        cases_dir = os.path.join(self.dir, "bench", "local", "cases")
+        os.makedirs(cases_dir)
+        for i in range(2):
+            with open(os.path.join(cases_dir, f"case-{i}.json"), "w", encoding="utf-8") as f:
+                json.dump({"id": f"case-{i}", "input": f"hi {i}", "expected": {"contains": [f"hi {i}"]}}, f)
+
+    def tearDown(self):
+        self.daemon.terminate()
+        self.daemon.wait(timeout=10)
+        self._tmp.cleanup()
+
+    def client(self, cwd, task, name, **env):
+        out = os.path.join(self.dir, name)
+        proc = subprocess.run(
+            [sys.executable, os.path.join(SCRIPTS, "bench-run.py"), "--task", task, "--provider", "openai",
+             "--model", "gpt-5", "--output", out],
+            cwd=cwd, env=dict(self.env, BENCH_RUN_SOCKET=self.sock, **env), check=True, capture_output=True,
+            encoding="utf-8",
+        )
+        self.assertNotIn("running locally", proc.stderr)
+        with open(out, encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_consecutive_requests_get_their_own_cwd_and_env(self):
+        self.assertEqual(self.client(self.dir, "local", "first.json")["totals"]["cases"], 2)
+        with StubServer() as srv:
+            for name in ("second.json", "third.json"):
+                block = self.client(ROOT, "sample-task", name, OPENAI_BASE_URL=srv.url)
+                self.assertEqual(block["totals"]["cases"], 3)
+                self.assertIn("requests", block)
+            # One warm pool across both requests: the same daemon served them
+            self.assertEqual(srv.stats()["connections"], 1)
+            self.assertEqual(srv.stats()["requests"], 6)
+            # The endpoint env did not leak into the next request
+            block = self.client(self.dir, "local", "fourth.json")
+            self.assertNotIn("requests", block)
+            self.assertEqual(srv.stats()["requests"], 6)
+        self.assertIsNone(self.daemon.poll())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+"""bench-run --shard and bench-aggregate --merge: shards partition the cases and merge back to one run."""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = os.path.join(ROOT, "scripts")
+
+CASES = 30
+SHARDS = 3
+# Totals that do not depend on timing
+COUNTS = ("cases", "passed", "accuracy", "prompt_tokens", "output_tokens", "tool_calls", "errors", "cache_hits")
+
+
+class ShardTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.dir = self._tmp.name
+        cases_dir = os.path.join(self.dir, "bench", "shard", "cases")
+        os.makedirs(cases_dir)
+        for i in range(CASES):
+            with open(os.path.join(cases_dir, f"case-{i:03d}.json"), "w", encoding="utf-8") as f:
+                json.dump({"id": f"case-{i:03d}", "input": f"hello {i}", "expected": {"contains": [f"hello {i % 4}"]}}, f)
+        self.full = self.bench_run("full.json")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def script(self, name, *args, check=True):
+        return subprocess.run(
+            [sys.executable, os.path.join(SCRIPTS, name), *args],
+            cwd=self.dir, check=check, capture_output=True, encoding="utf-8",
+        )
+
+    def bench_run(self, name, *args):
+        self.script("bench-run.py", "--task", "shard", "--provider", "openai", "--model", "gpt-5",
+                    "--output", self.path(name), *args)
+        with open(self.path(name), encoding="utf-8") as f:
+            return json.load(f)
+
+    def run_shards(self, *args):
+        return [
+            self.bench_run(f"shard{i}.json", "--shard", f"{i}/{SHARDS}", "--shard-group", "g", *args)
+            for i in range(1, SHARDS + 1)
+        ]
+
+    def check_partition(self, shards):
+        ids = [[c["id"] for c in block["cases"]] for block in shards]
+        flat = [cid for shard in ids for cid in shard]
+        self.assertEqual(sorted(flat), [c["id"] for c in self.full["cases"]])
+        self.assertEqual(len(flat), len(set(flat)))
+        self.assertTrue(all(ids))
+
+    def check_merge(self, shards):
+        self.script("bench-aggregate.py", "--merge", *(self.path(f"shard{i}.json") for i in range(1, SHARDS + 1)),
+                    "--output", self.path("merged.json"))
+        with open(self.path("merged.json"), encoding="utf-8") as f:
+            merged = json.load(f)
+        for key in COUNTS:
+            self.assertEqual(merged["totals"][key], self.full["totals"][key], key)
+        self.assertAlmostEqual(
+            merged["totals"]["sum_latency_ms"], sum(b["totals"]["sum_latency_ms"] for b in shards), places=1,
+        )
+        self.assertEqual(merged["totals"]["wall_clock_ms"], max(b["totals"]["wall_clock_ms"] for b in shards))
+        self.assertEqual(merged["shard"]["merged"], list(range(1, SHARDS + 1)))
+        self.assertEqual(sorted(c["id"] for c in merged["cases"]), [c["id"] for c in self.full["cases"]])
+
+    def test_hash_shards_partition_and_merge(self):
+        shards = self.run_shards()
+        self.check_partition(shards)
+        self.check_merge(shards)
+
+    def test_weighted_shards_partition_and_merge(self):
+        shards = self.run_shards("--shard-weights", self.path("full.json"))
+        self.assertEqual({b["shard"]["strategy"] for b in shards}, {"latency"})
+        self.check_partition(shards)
+        self.check_merge(shards)
+
+    def test_merge_refuses_missing_shards(self):
+        self.run_shards()
+        proc = self.script("bench-aggregate.py", "--merge", self.path("shard1.json"), self.path("shard2.json"),
+                           "--output", self.path("merged.json"), check=False)
+        self.assertNotEqual(proc.returncode, 0)
+        self.assertIn("missing shard", proc.stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+"""Multi-role executor: DAG validation, and independent roles overlapping behind one endpoint."""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = os.path.join(ROOT, "scripts")
+sys.path.insert(0, SCRIPTS)
+
+from adapters.stub_server import StubServer  # noqa: E402
+from topology import parse_roles  # noqa: E402
+
+RECIPE = os.path.join(ROOT, "bench", "sample-task", "recipes", "multi-role.md")
+
+
+class ParseRolesTest(unittest.TestCase):
+    def test_topological_order(self):
+        roles = parse_roles({"roles": [
+            {"name": "writer", "provider": "qwen", "depends_on": ["planner"]},
+            {"name": "planner", "provider": "openai"},
+        ]})
+        self.assertEqual([r.name for r in roles], ["planner", "writer"])
+
+    def test_invalid_dags(self):
+        for roles in (
+            [{"name": "a", "provider": "openai", "depends_on": ["b"]},
+             {"name": "b", "provider": "openai", "depends_on": ["a"]}],
+            [{"name": "a", "provider": "openai", "depends_on": ["missing"]}],
+            [{"name": "a", "provider": "openai"}, {"name": "a", "provider": "gemini"}],
+        ):
+            with self.subTest(roles=roles), self.assertRaises(ValueError):
+                parse_roles({"roles": roles})
+
+
+class SharedEndpointTest(unittest.TestCase):
+    def test_independent_roles_overlap_on_one_base_url(self):
+        # Every provider behind the same stub; each request takes at least 200ms
+        with tempfile.TemporaryDirectory() as tmp, StubServer(stall_every=1, stall_s=0.2) as srv:
+            out = os.path.join(tmp, "results.json")
+            env = dict(os.environ, OPENAI_BASE_URL=srv.url, GEMINI_BASE_URL=srv.url, QWEN_BASE_URL=srv.url)
+            subprocess.run(
+                [sys.executable, os.path.join(SCRIPTS, "bench-run.py"), "--task", "sample-task", "--cases", "case-001",
+                 "--recipe", RECIPE, "--output", out],
+                cwd=ROOT, env=env, check=True, capture_output=True,
+            )
+            with open(out, encoding="utf-8") as f:
+                case = json.load(f)["cases"][0]
+            roles = case["roles"]
+            self.assertNotIn("error", case)
+            self.assertLess(roles["researcher"]["start_ms"], roles["planner"]["end_ms"])
+            self.assertLess(roles["planner"]["start_ms"], roles["researcher"]["end_ms"])
+            self.assertGreaterEqual(roles["writer"]["start_ms"], max(roles["planner"]["end_ms"], roles["researcher"]["end_ms"]))
+            # Roots ran side by side: two stalls, not three, bound the case
+            self.assertLess(case["critical_path_ms"], 3 * 200.0)
+            self.assertEqual(srv.stats()["connections"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()